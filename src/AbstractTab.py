@@ -25,11 +25,16 @@ from PySide import QtCore, QtGui
 import ast
 from multiprocessing.pool import Pool
 
+import Globals
 import Strings
 import CANData
 import Packet
 from Logger import Logger
 import PacketTableModel
+from PacketStore import PacketStore
+from PacketArchive import PacketArchive
+from SocketCANLog import SocketCANLog
+from LogView import LogView
 import Toolbox
 
 
@@ -56,7 +61,9 @@ class AbstractTab():
                  saveAsPacketSetContextMenu=True,
                  allowTableCopy=True,
                  allowTablePaste=True,
-                 allowTableDelete=True):
+                 allowTableDelete=True,
+                 useColumnarStore=False,
+                 sanitizeHex=True):
 
         #: The specific GUI tab
         self.tabWidget = tabWidget
@@ -64,10 +71,19 @@ class AbstractTab():
         self.readOnlyCols = readOnlyCols
         # Whether we hide the timestamp column or not
         self.hideTimestampCol = hideTimestampCol
+        #: Whether ``rawData`` is a :class:`~src.PacketStore.PacketStore` that is also used by the table model.
+        #: This saves a lot of memory for tabs that display many packets.
+        self.useColumnarStore = useColumnarStore
+        #: Whether edited cells of the GUI table only keep hex characters (see :class:`~src.PacketTableModel.PacketTableModel`)
+        self.sanitizeHex = sanitizeHex
         #: Raw packet data that corresponds to the data displayed in the GUI table
         self.rawData = []
         #: Custom packet model of the GUI table
         self.packetTableModel = None
+        #: The :class:`~src.LogView.LogView` that is displayed instead of the packets (if any)
+        self.logView = None
+        #: Timer to index the log view in the background
+        self.logViewTimer = None
         #: The tab specific CANData instance
         self.CANData = CANData
         #: Whether the tab is currently active (using ``CANData``)
@@ -111,15 +127,23 @@ class AbstractTab():
 
         header = ["ID", "Data", "Length", "Timestamp", "Description"]
 
+        # Columnar tabs add packets at the front, so store them newest first
+        if self.useColumnarStore:
+            self.rawData = PacketStore(newestFirst=True)
+            dataList = self.rawData
+        else:
+            dataList = []
+
         self.packetTableModel = PacketTableModel.PacketTableModel(
-            self.packetTableView, [],
+            self.packetTableView, dataList,
             header,
             self.readOnlyCols,
             IDColIndex=self.IDColIndex,
             dataColIndex=self.dataColIndex,
             lengthColIndex=self.lengthColIndex,
             timestampColIndex=self.timestampColIndex,
-            descriptionColIndex=self.descriptionColIndex)
+            descriptionColIndex=self.descriptionColIndex,
+            sanitizeHex=self.sanitizeHex)
         self.packetTableView.setModel(self.packetTableModel)
 
         if self.hideTimestampCol:
@@ -178,8 +202,12 @@ class AbstractTab():
         CANID = valueList[self.IDColIndex]
         data = valueList[self.dataColIndex]
 
-        # Try to get a description for a potential known packet
-        descr = Toolbox.Toolbox.getKnownPacketDescription(CANID, data)
+        # Try to get a description for a potential known packet.
+        # Packet stores resolve descriptions on access
+        if self.isRawDataSharedWithModel() and not addToRawDataOnly:
+            descr = ""
+        else:
+            descr = Toolbox.Toolbox.getKnownPacketDescription(CANID, data)
 
         if len(valueList) == self.packetTableModel.columnCount():
             valueList[-1] = descr
@@ -198,8 +226,9 @@ class AbstractTab():
         valueList[self.lengthColIndex] = Packet.Packet.getDisplayDataLength(
             CANID, data)
 
-        # Also add the data to the objects rawData element
-        if append:
+        # Also add the data to the objects rawData element.
+        # If the table model uses rawData itself, it takes care of this
+        if append and (addToRawDataOnly or not self.isRawDataSharedWithModel()):
             if addAtFront:
                 self.rawData.insert(0, valueList)
             else:
@@ -209,15 +238,49 @@ class AbstractTab():
             self.packetTableModel.appendRow(valueList, addAtFront, emit=emit)
         return descr
 
+    def isRawDataSharedWithModel(self):
+        """
+        :return: A boolean value indicating whether ``rawData`` is the data list of the table model.
+                 This is the case if a :class:`~src.PacketStore.PacketStore` is used.
+        """
+
+        return self.packetTableModel is not None and self.rawData is self.packetTableModel.dataList
+
+    def addPackets(self, valueLists):
+        """
+        Add a batch of packets to the GUI table, e.g. received from an :class:`~src.ItemAdderThread.ItemAdderThread`.
+        Every packet is passed to :func:`addPacket` so overriding methods are being used.
+
+        :param valueLists: List of packets as raw value lists
+        """
+
+        for valueList in valueLists:
+            self.addPacket(valueList)
+
+    def addRecords(self, records):
+        """
+        Add a batch of frame records (see :class:`~src.FrameBatch.FrameBatch`), e.g. received from an
+        :class:`~src.ItemAdderThread.ItemAdderThread`. This needs a :class:`~src.PacketStore.PacketStore`
+        as ``rawData``: The records are stored without formatting them, descriptions are resolved on access.
+
+        :param records: List of frame records
+        """
+
+        self.packetTableModel.appendRecords(records)
+
     def manualAddPacket(self):
         """
         Manually add an empty packet row to the GUI table. This also updates ``rawData``.
         """
 
+        # New rows are appended after all rows of the row source
+        self.packetTableModel.fetchAll()
+
         # Also add the data to the objects rawData element
-        self.rawData.append([])
-        for colIndex in range(self.packetTableModel.columnCount()):
-            self.rawData[-1].append("")
+        if not self.isRawDataSharedWithModel():
+            self.rawData.append([])
+            for colIndex in range(self.packetTableModel.columnCount()):
+                self.rawData[-1].append("")
 
         # Lists are passed by ref so no need to copy the entire list
         self.packetTableModel.appendRow([])
@@ -228,9 +291,11 @@ class AbstractTab():
         :return: A list of indexes of the removed rows. None if no rows have been selected
         """
 
-        # We return the indexes of the removed rows
-        removedRows = []
         tableModel = self.packetTableModel
+        if tableModel.isReadOnly():
+            return
+        # Display queued rows first so the selected indexes match rawData
+        tableModel.flushQueuedRows()
         selectionModel = self.packetTableView.selectionModel()
         selectedRows = selectionModel.selectedRows()
 
@@ -240,15 +305,12 @@ class AbstractTab():
                 Strings.rowSelectionHint, QtGui.QMessageBox.Ok)
             return
 
-        # Pass the QModelIndex to the method
-        # --> persistent indexes
-        tableModel.removeRows(selectedRows)
-        # Reverse the delete order --> no need to worry about shifting indexes <:
-        for row in sorted(selectedRows, reverse=True):
-            rowIndex = row.row()
-            # Also delete the row in rawData
-            del self.rawData[rowIndex]
-            removedRows.append(row.row())
+        rawDataShared = self.isRawDataSharedWithModel()
+        removedRows = tableModel.removeRows(selectedRows)
+        # Also delete the rows in rawData
+        if not rawDataShared:
+            PacketTableModel.PacketTableModel.removeIndexes(
+                self.rawData, removedRows)
 
         return removedRows
 
@@ -261,15 +323,27 @@ class AbstractTab():
         :return: Previously displayed packets as raw data list (if returnOldPackets is True), else an empty list
         """
 
+        # Log views aren't packets of the tab
+        if self.logView is not None:
+            self.closeLogView()
+            return []
+
+        rawDataShared = self.isRawDataSharedWithModel()
+        if returnOldPackets:
+            self.packetTableModel.fetchAll()
         self.packetTableModel.clear()
         # Provides the old values for applying new known packets
         savedPackets = []
         if returnOldPackets:
-            # This creates a copy of the list (fastest way)
-            savedPackets = self.rawData[:]
+            if rawDataShared:
+                # The model uses a new store now, so no copy is needed
+                savedPackets = self.rawData
+            else:
+                # This creates a copy of the list (fastest way)
+                savedPackets = self.rawData[:]
 
         # Reset the sniffed packets
-        self.rawData = []
+        self.rawData = self.packetTableModel.dataList if rawDataShared else []
 
         return savedPackets
 
@@ -278,6 +352,13 @@ class AbstractTab():
         Apply new known packets which have been saved in the mean time. This reloads the packets into the GUI table.
         """
 
+        # PacketStores resolve descriptions on access --> only redraw the table
+        if self.isRawDataSharedWithModel():
+            if isinstance(self.rawData, PacketStore):
+                self.rawData.invalidateDescriptions()
+            self.packetTableModel.emit(QtCore.SIGNAL("layoutChanged()"))
+            return
+
         progressDialog = Toolbox.Toolbox.getWorkingDialog(
             Strings.applyingKnownPackets)
         progressDialog.open()
@@ -320,6 +401,9 @@ class AbstractTab():
 
         QtCore.QCoreApplication.processEvents()
 
+        # Pasted rows are appended after all rows of the row source
+        self.packetTableModel.fetchAll()
+
         try:
             # Extract the data from the clipboard and iterate over it
             clipboard = QtGui.QApplication.clipboard()
@@ -351,41 +435,20 @@ class AbstractTab():
                 self.packetTableModel.appendRows(rawPackets)
                 refreshCounter = 0
                 # Also update rawData
-                for row in rawPackets:
-                    if refreshCounter % 10000 == 0:
-                        QtCore.QCoreApplication.processEvents()
-                        refreshCounter += 1
-                    self.rawData.append(row)
-                    refreshCounter = 0
+                if not self.isRawDataSharedWithModel():
+                    for row in rawPackets:
+                        if refreshCounter % 10000 == 0:
+                            QtCore.QCoreApplication.processEvents()
+                            refreshCounter += 1
+                        self.rawData.append(row)
+                        refreshCounter = 0
 
             # Last try: try parsing in SocketCAN format
             else:
-                socketCANPackets = CANData.CANData.parseSocketCANLines(
+                records = SocketCANLog.parseLines(
                     clipboard.text().split("\n"))
-                if len(socketCANPackets) > 0:
-                    for socketCANPacketIndex in range(len(socketCANPackets)):
-
-                        if socketCANPacketIndex % 700 == 0:
-                            QtCore.QCoreApplication.processEvents()
-
-                        socketCANPacket = socketCANPackets[
-                            socketCANPacketIndex]
-                        CANID = socketCANPacket.id
-                        data = socketCANPacket.data
-                        timestamp = socketCANPacket.timestamp
-
-                        dataList = []
-
-                        # Append the data to the GUI table and to the rawData list
-                        # Prepare the datalist
-                        for colIdx in range(
-                                self.packetTableModel.columnCount()):
-                            dataList.append("")
-                        dataList[self.IDColIndex] = CANID
-                        dataList[self.dataColIndex] = data
-                        dataList[self.timestampColIndex] = timestamp
-                        self.packetTableModel.appendRow(dataList)
-                        self.rawData.append(dataList)
+                if len(records) > 0:
+                    self.appendRecordGroups([records])
 
         except Exception as e:
             self.logger.exception(str(e))
@@ -413,8 +476,28 @@ class AbstractTab():
             saveAsPacketSet = menu.addAction(
                 Strings.contextMenuSaveAsPacketSet)
 
+        saveAsArchive = menu.addAction(Strings.contextMenuSaveAsArchive)
+
+        # Tables with a packet store can load captures without pasting
+        loadArchive = None
+        loadSocketCANLog = None
+        if (self.allowTablePaste or self.isRawDataSharedWithModel()
+            ) and self.logView is None:
+            loadArchive = menu.addAction(Strings.contextMenuLoadArchive)
+            loadSocketCANLog = menu.addAction(
+                Strings.contextMenuLoadSocketCANLog)
+
+        openLogView = None
+        if self.useColumnarStore and not self.active:
+            openLogView = menu.addAction(Strings.contextMenuOpenLogView)
+
         # Get the users input
         action = menu.exec_(QtGui.QCursor.pos())
+        if action is None:
+            return
+
+        # All actions need all packets
+        self.packetTableModel.fetchAll()
 
         # Execute accordingly
         if action == sendToSender:
@@ -429,6 +512,217 @@ class AbstractTab():
                 return
             Globals.managerTabInstance.createDump(rawPackets=self.rawData)
 
+        elif action == saveAsArchive:
+            self.saveArchive()
+
+        elif action == loadArchive:
+            self.loadArchive()
+
+        elif action == loadSocketCANLog:
+            self.loadSocketCANLog()
+
+        elif action == openLogView:
+            self.openLogView()
+
+    def saveArchive(self, filePath=None):
+        """
+        Save all packets to a :class:`~src.PacketArchive.PacketArchive`. Packets of a
+        :class:`~src.PacketStore.PacketStore` are saved without formatting them.
+
+        :param filePath: Optional: The path of the archive. If this is None, the user will be asked
+        """
+
+        if self.rawData is None or len(self.rawData) == 0:
+            return
+
+        if filePath is None:
+            filePath = Toolbox.Toolbox.getSaveFileName(Strings.saveDialogTitle)
+            if not filePath:
+                self.logger.info(Strings.dataNotWritten)
+                return
+            if not filePath.endswith(PacketArchive.fileSuffix):
+                filePath += PacketArchive.fileSuffix
+
+        if isinstance(self.rawData, PacketStore):
+            records = self.rawData.iterRecords()
+        else:
+            records = (record
+                       for record in map(PacketArchive.rowToRecord,
+                                         self.rawData) if record is not None)
+
+        recordCount = PacketArchive.write(filePath, records)
+        self.logger.info(Strings.dataWritten + " " + str(recordCount))
+
+        # Rows that can't be converted to frame records (e.g. invalid IDs) are skipped
+        skippedCount = len(self.rawData) - recordCount
+        if skippedCount > 0:
+            self.logger.warn(Strings.dataSkipped + " " + str(skippedCount))
+
+    def loadArchive(self, filePath=None):
+        """
+        Add all packets of a :class:`~src.PacketArchive.PacketArchive` to the GUI table. This also updates ``rawData``.
+        If a :class:`~src.PacketStore.PacketStore` is used, the packets are stored without any text parsing.
+
+        :param filePath: Optional: The path of the archive. If this is None, the user will be asked
+        """
+
+        if filePath is None:
+            filePath = QtGui.QFileDialog.getOpenFileName(
+                self.packetTableView, Strings.openDialogTitle,
+                QtCore.QDir.homePath(),
+                "*" + PacketArchive.fileSuffix)[0]
+            if not filePath:
+                return
+
+        try:
+            packetArchive = PacketArchive(filePath)
+        except (OSError, ValueError):
+            self.logger.error(Strings.packetArchiveInvalid + " " + filePath)
+            return
+
+        progressDialog = Toolbox.Toolbox.getWorkingDialog(
+            Strings.packetArchiveLoading)
+        progressDialog.open()
+        try:
+            self.appendRecordGroups(packetArchive.iterRecordGroups())
+        finally:
+            packetArchive.close()
+            progressDialog.close()
+
+    def loadSocketCANLog(self, filePath=None):
+        """
+        Add all packets of a log file in SocketCAN format to the GUI table. This also updates ``rawData``.
+        The file is parsed in chunks (see :class:`~src.SocketCANLog.SocketCANLog`), so it is never read
+        into memory completely.
+
+        :param filePath: Optional: The path of the log file. If this is None, the user will be asked
+        """
+
+        if filePath is None:
+            filePath = QtGui.QFileDialog.getOpenFileName(
+                self.packetTableView, Strings.openDialogTitle,
+                QtCore.QDir.homePath())[0]
+            if not filePath:
+                return
+
+        progressDialog = Toolbox.Toolbox.getWorkingDialog(
+            Strings.socketCANLogLoading)
+        progressDialog.open()
+        try:
+            self.appendRecordGroups(SocketCANLog.iterRecordChunks(filePath))
+        except OSError as e:
+            self.logger.error(str(e))
+        finally:
+            progressDialog.close()
+
+    def openLogView(self, filePath=None):
+        """
+        Display a log file in SocketCAN format read-only without loading it (see :class:`~src.LogView.LogView`).
+        The file is indexed in the background and the table grows while the index is being built.
+        The log view is closed by clearing the tab.
+
+        :param filePath: Optional: The path of the log file. If this is None, the user will be asked
+        """
+
+        if self.active:
+            self.logger.error(Strings.logViewTabActive)
+            return
+
+        if filePath is None:
+            filePath = QtGui.QFileDialog.getOpenFileName(
+                self.packetTableView, Strings.openDialogTitle,
+                QtCore.QDir.homePath())[0]
+            if not filePath:
+                return
+
+        try:
+            logView = LogView(filePath)
+        except OSError as e:
+            self.logger.error(str(e))
+            return
+
+        self.closeLogView()
+        self.logView = logView
+        self.rawData = logView
+        self.packetTableModel.setDataList(logView)
+
+        if self.logViewTimer is None:
+            self.logViewTimer = QtCore.QTimer(self.packetTableView)
+            self.logViewTimer.setInterval(0)
+            self.logViewTimer.timeout.connect(self.indexLogView)
+        self.logViewTimer.start()
+        self.logger.info(Strings.logViewOpened + " " + filePath)
+
+    def indexLogView(self):
+        """
+        Index the next part of the current log view and display the new lines.
+        This is called by ``logViewTimer`` until the whole file has been indexed.
+        """
+
+        if self.logView is None:
+            self.logViewTimer.stop()
+            return
+
+        self.packetTableModel.appendStoredRows(self.logView.indexMore())
+        if self.logView.isComplete():
+            self.logViewTimer.stop()
+            self.logger.info(Strings.logViewIndexed + " " +
+                             str(len(self.logView)))
+
+    def closeLogView(self):
+        """
+        Close the current log view (if any) and display an empty packet list again.
+        """
+
+        if self.logView is None:
+            return
+
+        self.logViewTimer.stop()
+        self.rawData = PacketStore(
+            newestFirst=True) if self.useColumnarStore else []
+        self.packetTableModel.setDataList(
+            self.rawData if self.useColumnarStore else [])
+        # Close the file after the model stopped using it
+        self.logView.close()
+        self.logView = None
+
+    def appendRecordGroups(self, recordGroups):
+        """
+        Add lists of frame records (see :class:`~src.FrameBatch.FrameBatch`) to the GUI table and ``rawData``.
+        If a :class:`~src.PacketStore.PacketStore` is used, the records are stored without formatting them.
+        The GUI is refreshed after every list.
+
+        :param recordGroups: Iterable of lists of frame records
+        """
+
+        recordCount = 0
+        rawDataShared = self.isRawDataSharedWithModel()
+        columnCount = self.packetTableModel.columnCount()
+        for records in recordGroups:
+            if rawDataShared:
+                self.packetTableModel.appendRecords(records)
+            else:
+                # Prepare the rows using the column layout of this tab
+                descriptions = [""] * len(records)
+                if Globals.knownPacketMatcher is not None:
+                    descriptions = Globals.knownPacketMatcher.labelRecords(
+                        records)
+                rows = []
+                for record, description in zip(records, descriptions):
+                    row = [""] * columnCount
+                    (row[self.IDColIndex], row[self.dataColIndex],
+                     row[self.lengthColIndex], row[self.timestampColIndex]
+                     ) = PacketArchive.recordToRow(record)
+                    row[self.descriptionColIndex] = description
+                    rows.append(row)
+                self.packetTableModel.appendRows(
+                    rows, resolveDescriptions=False)
+                self.rawData.extend(rows)
+            recordCount += len(records)
+            QtCore.QCoreApplication.processEvents()
+
+        self.logger.info(Strings.dataLoaded + " " + str(recordCount))
+
     def handleCellChanged(self, rowIndex, colIndex):
         """
         To update the rawData element and
@@ -439,8 +733,9 @@ class AbstractTab():
         :return:
         """
 
+        rawDataShared = self.isRawDataSharedWithModel()
         item = self.packetTableModel.getValue(rowIndex, colIndex)
-        if item is not None:
+        if item is not None and not rawDataShared:
             self.rawData[rowIndex][colIndex] = self.packetTableModel.getValue(
                 rowIndex, colIndex)
 
@@ -468,7 +763,8 @@ class AbstractTab():
                 self.packetTableModel.setText(rowIndex, self.lengthColIndex,
                                               dataLengthRes)
                 # Update this value in rawData too
-                self.rawData[rowIndex][self.lengthColIndex] = 0
+                if not rawDataShared:
+                    self.rawData[rowIndex][self.lengthColIndex] = 0
 
             # Update the description
             descr = Toolbox.Toolbox.getKnownPacketDescription(CANID, data)
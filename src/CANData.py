@@ -26,15 +26,29 @@ import subprocess
 import os
 import socket
 import select
+import struct
+from collections import deque
 
 from Logger import Logger
+from FrameBatch import FrameBatch
+from RawCANSocket import RawCANSocket
 import Globals
+import Settings
 import Strings
 import Toolbox
 
 
 class CANData():
 
+    #: ``struct can_filter``: can_id and can_mask
+    kernelFilter = struct.Struct("=II")
+    #: Flag of a ``struct can_filter`` to invert the filter
+    CAN_INV_FILTER = 0x20000000
+    #: Maximum amount of filters that is passed to the kernel (``CAN_RAW_FILTER_MAX``)
+    maxKernelFilters = 512
+    #: The constant is not available in older Python versions
+    CAN_RAW_JOIN_FILTERS = getattr(socket, "CAN_RAW_JOIN_FILTERS", 6)
+
     #: This dictionary stores all currently available CANData instances. The key
     #: of the dictionary is the interface name
     CANDataInstances = {}
@@ -46,13 +60,16 @@ class CANData():
                  ifaceName,
                  bitrate=500000,
                  fdBitrate=2000000,
-                 isFD=False):
+                 isFD=False,
+                 backend=None):
         """
         This method initializes the can.Message CAN interface using the passed parameters and the start() method.
         Please note the active-flag which protects the object from being deleted while being in use.
 
         :param ifaceName: Name of the interface as displayed by ``ifconfig -a``
         :param bitrate: Desired bitrate of the interface
+        :param backend: Optional: "python-can" or "raw" (see :class:`~src.RawCANSocket.RawCANSocket`).
+                        Default: ``Settings.CAN_BACKEND``
         """
 
         self.ifaceName = ifaceName
@@ -62,11 +79,18 @@ class CANData():
         self.fdBitrate = fdBitrate if not self.VCAN else -1
         self.isFD = isFD
 
-        self.iface = can.Bus(
-            interface="socketcan",
-            channel=self.ifaceName,
-            receive_own_messages=False,
-            fd=isFD)
+        self.backend = backend if backend is not None else Settings.CAN_BACKEND
+        #: The can.Bus instance if the python-can backend is used
+        self.iface = None
+        #: The :class:`~src.RawCANSocket.RawCANSocket` instance if the raw backend is used
+        self.rawSocket = None
+        #: Frame records that have been received by the raw backend but not returned yet
+        self.pendingRecords = deque()
+        #: Acceptance filters that are applied by the kernel (see :func:`setFilters`)
+        self.includeFilters = None
+        self.excludeFilters = []
+
+        self.openInterface(isFD)
 
         self.updateBitrate(bitrate, fdBitrate, fd=isFD)
 
@@ -75,12 +99,128 @@ class CANData():
 
         self.active = False
 
+    def openInterface(self, fd):
+        """
+        (Re-)open the interface using the configured backend.
+
+        :param fd: Whether to enable CAN FD
+        """
+
+        if self.backend == "raw":
+            if self.rawSocket is not None:
+                self.rawSocket.close()
+            self.rawSocket = RawCANSocket(
+                self.ifaceName, fd=fd,
+                hardwareTimestamps=Settings.CAN_HARDWARE_TIMESTAMPS)
+            self.pendingRecords.clear()
+            CANData.logger.debug(Strings.CANDataUsingRawSocket +
+                                 self.ifaceName + " (" +
+                                 Strings.CANDataTimestampSource + " " +
+                                 self.rawSocket.timestampSource + ")")
+        else:
+            self.iface = can.Bus(
+                interface="socketcan",
+                channel=self.ifaceName,
+                receive_own_messages=False,
+                fd=fd)
+
+        # The new socket has to be configured again
+        if self.includeFilters is not None or len(self.excludeFilters) > 0:
+            self.applyFilters()
+
+    def getSocket(self):
+        """
+        :return: The socket object of the currently used backend
+        """
+
+        if self.rawSocket is not None:
+            return self.rawSocket.socket
+        return self.iface.socket
+
+    def setFilters(self, includeFilters=None, excludeFilters=None):
+        """
+        Set acceptance filters that are applied by the kernel using ``CAN_RAW_FILTER``, so unwanted
+        frames are dropped before they reach user space. Every filter is a tuple ``(CAN ID, mask)``:
+        A frame matches if ``frame ID & mask == CAN ID & mask``. Standard and extended IDs are handled alike.
+        Calling this without arguments removes all filters.
+
+        Frames are accepted if they match any include filter and no exclude filter. The kernel can't express
+        multiple include filters combined with exclude filters. In this case only the include filters are applied.
+
+        :param includeFilters: Optional: List of filters. None accepts all frames, an empty list no frames
+        :param excludeFilters: Optional: List of filters of frames to drop
+        :return: A boolean value indicating whether the filters are applied completely by the kernel
+        """
+
+        self.includeFilters = includeFilters
+        self.excludeFilters = excludeFilters if excludeFilters is not None else []
+        return self.applyFilters()
+
+    def clearFilters(self):
+        """
+        Remove all acceptance filters, see :func:`setFilters`.
+        """
+
+        self.setFilters()
+
+    def applyFilters(self):
+        """
+        Pass ``includeFilters`` and ``excludeFilters`` to the socket.
+
+        :return: A boolean value indicating whether the filters are applied completely by the kernel
+        """
+
+        includeFilters = self.includeFilters
+        excludeFilters = self.excludeFilters
+        complete = True
+
+        if includeFilters is not None and len(includeFilters) > CANData.maxKernelFilters:
+            includeFilters = None
+            complete = False
+        if len(excludeFilters) > CANData.maxKernelFilters or \
+                includeFilters is not None and len(includeFilters) > 1 and len(excludeFilters) > 0:
+            excludeFilters = []
+            complete = False
+
+        if includeFilters is None:
+            # Accept all frames if there are no exclude filters
+            includeFilters = [(0, 0)] if len(excludeFilters) == 0 else []
+
+        # Without joining, a frame is accepted if any filter matches.
+        # Joined filters have to match all, this is needed for exclude filters
+        packedFilters = b"".join(
+            [CANData.kernelFilter.pack(CANID, mask) for CANID, mask in includeFilters] +
+            [CANData.kernelFilter.pack(CANID | CANData.CAN_INV_FILTER, mask)
+             for CANID, mask in excludeFilters])
+        joinFilters = 1 if len(excludeFilters) > 0 else 0
+
+        sock = self.getSocket()
+        sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER, packedFilters)
+        try:
+            sock.setsockopt(socket.SOL_CAN_RAW, CANData.CAN_RAW_JOIN_FILTERS,
+                            joinFilters)
+        except OSError:
+            # Kernels older than 4.1 can't join filters
+            if joinFilters == 1:
+                sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER,
+                                CANData.kernelFilter.pack(0, 0))
+                complete = False
+
+        if not complete:
+            CANData.logger.debug(Strings.CANDataKernelFiltersIncomplete)
+        return complete
+
     def clearSocket(self):
         """
         Clear the socket by reading and discarding all contained data
         Fixes #4
         """
 
+        if self.rawSocket is not None:
+            self.pendingRecords.clear()
+            self.rawSocket.clear()
+            return
+
         sock = [self.iface.socket]
         while True:
             available, _, _ = select.select(sock, [], [], 0.0)
@@ -95,15 +235,31 @@ class CANData():
         :param packet: A packet as can.Message oject (see :func:`tryBuildPacket`)
         """
 
-        assert self.iface is not None
+        assert self.iface is not None or self.rawSocket is not None
         try:
-            self.iface.send(packet)
+            if self.rawSocket is not None:
+                self.rawSocket.sendMessage(packet)
+            else:
+                self.iface.send(packet)
         except Exception as e:
             if not self.isFD and len(packet.data) > 8:
                 CANData.logger.info(Strings.CANDataNeedFD)
             else:
                 raise e
 
+    def sendPackets(self, packets):
+        """
+        Sends a batch of packets. The raw backend packs all packets into the same preallocated buffer.
+
+        :param packets: List of packets as can.Message objects (see :func:`tryBuildPacket`)
+        """
+
+        if self.rawSocket is not None and (self.isFD or all(
+                len(packet.data) <= 8 for packet in packets)):
+            self.rawSocket.sendMessages(packets)
+        else:
+            for packet in packets:
+                self.sendPacket(packet)
 
     def readPacket(self):
         """
@@ -115,6 +271,11 @@ class CANData():
         :return: A packet as can.Message object
         """
 
+        if self.rawSocket is not None:
+            while len(self.pendingRecords) == 0:
+                self.pendingRecords.extend(self.rawSocket.receiveRecords(None))
+            return CANData.recordToMessage(self.pendingRecords.popleft())
+
         self.iface.socket.settimeout(0)
         return self.iface.recv()
 
@@ -131,12 +292,77 @@ class CANData():
         #  self.iface.socket.settimeout(self.timeout)
         # If no packet is received withing the timeout
         # return no data
+        if self.rawSocket is not None:
+            if len(self.pendingRecords) == 0:
+                self.pendingRecords.extend(
+                    self.rawSocket.receiveRecords(self.timeout))
+            if len(self.pendingRecords) == 0:
+                return None
+            return CANData.recordToMessage(self.pendingRecords.popleft())
+
         try:
             p = self.iface.recv(timeout=self.timeout)
             return p
         except TimeoutException:
             return None
 
+    def readRecords(self, maxFrames=None, timeout=None):
+        """
+        Read a batch of frames **with a timeout** and return them as frame records (see
+        :class:`~src.FrameBatch.FrameBatch`). After the first frame, all frames that are already queued are read
+        too. The raw backend does this without creating can.Message objects.
+
+        :param maxFrames: Optional: Maximum amount of frames to return. Default: ``RawCANSocket.receiveBatchSize``
+        :param timeout: Optional: Seconds to wait for the first frame. 0 only reads frames that are already
+                        queued, e.g. after ``select`` reported the socket as readable. Default: ``self.timeout``
+        :return: List of frame records, empty if no frame was received
+        """
+
+        if len(self.pendingRecords) > 0:
+            records = list(self.pendingRecords)
+            self.pendingRecords.clear()
+            return records
+
+        if maxFrames is None:
+            maxFrames = RawCANSocket.receiveBatchSize
+        if timeout is None:
+            timeout = self.timeout
+
+        if self.rawSocket is not None:
+            return self.rawSocket.receiveRecords(timeout, maxFrames=maxFrames)
+
+        records = []
+        try:
+            packet = self.iface.recv(timeout=timeout)
+            while packet is not None:
+                records.append(FrameBatch.messageToRecord(packet))
+                if len(records) >= maxFrames:
+                    break
+                packet = self.iface.recv(timeout=0)
+        except TimeoutException:
+            pass
+        return records
+
+    @staticmethod
+    def recordToMessage(record):
+        """
+        Converts a frame record to a can.Message object.
+
+        :param record: The frame record
+        :return: A packet as can.Message object
+        """
+
+        timestamp, arbitrationID, flags, dlc, data = record
+        return can.Message(
+            timestamp=timestamp,
+            arbitration_id=arbitrationID,
+            is_extended_id=bool(flags & FrameBatch.FLAG_EXTENDED),
+            is_remote_frame=bool(flags & FrameBatch.FLAG_REMOTE),
+            is_error_frame=bool(flags & FrameBatch.FLAG_ERROR),
+            is_fd=bool(flags & FrameBatch.FLAG_FD),
+            dlc=dlc,
+            data=data)
+
     def toString(self):
         """
         Return a string to display the currently used settings and interface name on the GUI
@@ -220,11 +446,7 @@ class CANData():
                 self.fdBitrate = fdBitrate
                 self.isFD = fd
 
-            self.iface = can.Bus(
-                interface="socketcan",
-                channel=self.ifaceName,
-                receive_own_messages=False,
-                fd=fd)
+            self.openInterface(fd)
 
             return True
 
@@ -296,12 +518,9 @@ class CANData():
         :return: A list of SocketCANPackets
         """
 
-        packets = []
+        # Read the file line by line instead of keeping a copy of all lines
         with open(filePath) as f:
-            lines = f.readlines()
-        # Remove \n at the end of each line
-        lines = [line.strip() for line in lines]
-        packets = CANData.parseSocketCANLines(lines)
+            packets = CANData.parseSocketCANLines(line.strip() for line in f)
 
         return packets
 
@@ -313,7 +532,9 @@ class CANData():
 
         ``(1493280437.565631) can0 1FD#0000000000000000``
 
-        :param lines: List of lines in SocketCAN format
+        To parse large logs, use :class:`~src.SocketCANLog.SocketCANLog` which creates frame records instead.
+
+        :param lines: Iterable of lines in SocketCAN format
         :return: List of SocketCANPacket objects
         """
 
@@ -321,35 +542,30 @@ class CANData():
 
         for line in lines:
             # Check for 3 columns (Timestamp, Iface, (ID#Data))
-            if len(line.split(" ")) < 3:
+            valueList = line.split(" ")
+            if len(valueList) < 3:
                 if line == "":
                     line = Strings.CANDataParseSocketCANEmptyLine
                 CANData.logger.warning(Strings.CANDataInvalidSocketCANLine +
                                        ": " + line)
-            else:
-                valueList = line.split(" ")
-                # Remove ( and )
-                curTimestamp = valueList[0].replace("(", "").replace(")", "")
-                curIface = valueList[1]
-
-                # CAN FD line
-                if "##" in valueList[2]:
-                    IDAndData = valueList[2].split("##")
-                    # remove the flag that's present at this index
-                    IDAndData[1] = IDAndData[1][1:]
-                # Regular line
-                else:
-                    IDAndData = valueList[2].split("#")
-
-                try:
-                    curID = IDAndData[0]
-                    curData = IDAndData[1]
-                    socketCANPacket = SocketCANPacket(curTimestamp, curIface,
-                                                      curID, curData)
-                    socketCANPackets.append(socketCANPacket)
-                except Exception as e:
-                    CANData.logger.warning(Strings.CANDataInvalidSocketCANLine
-                                           + ": %s (%s)" % (line, str(e)))
+                continue
+
+            # Remove ( and )
+            curTimestamp = valueList[0].strip("()")
+            curIface = valueList[1]
+            curID, separator, curData = valueList[2].partition("#")
+
+            if not separator:
+                CANData.logger.warning(Strings.CANDataInvalidSocketCANLine +
+                                       ": " + line)
+                continue
+
+            # CAN FD line: remove the flag that's present after "##"
+            if curData.startswith("#"):
+                curData = curData[2:]
+
+            socketCANPackets.append(
+                SocketCANPacket(curTimestamp, curIface, curID, curData))
 
         return socketCANPackets
 
@@ -21,6 +21,7 @@ Created on May 17, 2017
 @author: pschmied
 """
 
+import itertools
 import sqlite3
 import os
 from PySide.QtGui import QMessageBox, QInputDialog
@@ -28,6 +29,7 @@ from PySide import QtCore
 
 import Toolbox
 import Packet
+from FrameBatch import FrameBatch
 from Logger import Logger
 from Project import Project
 from PacketSet import PacketSet
@@ -69,6 +71,8 @@ class DatabaseStatements():
 	`Date`	TEXT NOT NULL
     );"""
 
+    #: Note: This is the initial format of the table,
+    #: packets are migrated to a binary format (see ``migrationStatementsList``)
     createPacketTableStatement = """CREATE TABLE `Packet` (
 	`ID`	INTEGER PRIMARY KEY,
 	`PacketSetID`	INTEGER NOT NULL,
@@ -106,9 +110,102 @@ class DatabaseStatements():
         createPacketSetTableStatement, createKnownPacketTableStatement
     ]
 
+    #: Names of the tables created by ``createTableStatementsList``
+    tableNamesList = [
+        projectTableName, packetTableName, packetSetTableName,
+        knownPacketTableName
+    ]
+
     #: The Amount of tables that must be present
     tableCount = len(createTableStatementsList)
 
+    schemaVersionTableName = "SchemaVersion"
+
+    #: Holds the version of the database schema (one row). Tables created by ``createTableStatementsList``
+    #: have the version 0, every migration increments the version
+    createSchemaVersionTableStatement = """CREATE TABLE IF NOT EXISTS `SchemaVersion` (
+	`Version`	INTEGER NOT NULL
+    );"""
+
+    selectSchemaVersionStatement = "SELECT Version FROM SchemaVersion"
+    insertSchemaVersionStatement = "INSERT INTO SchemaVersion (Version) VALUES (?)"
+    updateSchemaVersionStatement = "UPDATE SchemaVersion SET Version = ?"
+    deleteSchemaVersionStatement = "DELETE FROM SchemaVersion"
+
+    #: Migrations of the database schema: The statements at index ``i`` upgrade a database
+    #: from version ``i`` to version ``i + 1``. Only append new migrations to this list
+    migrationStatementsList = [
+        # 1: Indexes for the packet, PacketSet and known packet queries
+        [
+            "CREATE INDEX IF NOT EXISTS PacketPacketSetIDIndex ON Packet (PacketSetID)",
+            "CREATE INDEX IF NOT EXISTS PacketCANIDIndex ON Packet (CANID)",
+            "CREATE INDEX IF NOT EXISTS PacketSetProjectIDIndex ON PacketSet (ProjectID)",
+            "CREATE INDEX IF NOT EXISTS KnownPacketProjectIDCANIDIndex ON KnownPacket (ProjectID, CANID)"
+        ],
+        # 2: Store packets in a binary format (see Database.encodePacketValues).
+        # Drop a leftover copy in case the table has been created outside of a migration transaction
+        [
+            "DROP TABLE IF EXISTS PacketBinary",
+            """CREATE TABLE `PacketBinary` (
+	`ID`	INTEGER PRIMARY KEY,
+	`PacketSetID`	INTEGER NOT NULL,
+	`CANID`	INTEGER NOT NULL,
+	`Data`	BLOB,
+	`Timestamp`	REAL,
+	`Interface`	TEXT,
+	`Flags`	INTEGER NOT NULL DEFAULT 0,
+	FOREIGN KEY(PacketSetID) REFERENCES PacketSet(ID)
+    );""",
+            """INSERT INTO PacketBinary (ID, PacketSetID, CANID, Data, Timestamp, Interface, Flags)
+    SELECT ID, PacketSetID, encodeCANID(CANID), encodeData(Data), encodeTimestamp(Timestamp), Interface,
+    getPacketFlags(CANID, Data) FROM Packet""",
+            "DROP TABLE Packet",
+            "ALTER TABLE PacketBinary RENAME TO Packet",
+            "CREATE INDEX IF NOT EXISTS PacketPacketSetIDIndex ON Packet (PacketSetID)",
+            "CREATE INDEX IF NOT EXISTS PacketCANIDIndex ON Packet (CANID)"
+        ]
+    ]
+
+    #: The current version of the database schema
+    schemaVersion = len(migrationStatementsList)
+
+    #: Deletes the packets of all PacketSets of a project.
+    #: Parameters: ProjectID
+    deletePacketsOfProjectStatement = "DELETE FROM Packet WHERE PacketSetID IN (SELECT ID FROM PacketSet WHERE ProjectID = ?)"
+
+    #: Gets all packets of a PacketSet ordered by their ID.
+    #: Parameters: PacketSetID
+    selectPacketsOfPacketSetStatement = "SELECT * FROM Packet WHERE PacketSetID = ? ORDER BY ID"
+
+    #: Gets the next page of packets of a PacketSet after a packet ID (keyset pagination).
+    #: Parameters: PacketSetID, ID, limit
+    selectPacketsOfPacketSetPageStatement = "SELECT * FROM Packet WHERE PacketSetID = ? AND ID > ? ORDER BY ID LIMIT ?"
+
+    #: Gets the IDs of all packets of a PacketSet after a packet ID.
+    #: Parameters: PacketSetID, ID
+    selectPacketIDsOfPacketSetStatement = "SELECT ID FROM Packet WHERE PacketSetID = ? AND ID > ? ORDER BY ID"
+
+    #: Inserts a Packet using bound parameters: The statement is prepared only once for many rows.
+    #: Parameters: PacketSetID, CANID, Data, Timestamp, Interface, Flags
+    insertPacketStatement = "INSERT INTO Packet (PacketSetID, CANID, Data, Timestamp, Interface, Flags) " \
+                            "VALUES (?, ?, ?, ?, ?, ?)"
+
+    #: Updates the ID and data of a Packet.
+    #: Parameters: CANID, Data, Flags, ID
+    updatePacketStatement = "UPDATE Packet SET CANID = ?, Data = ?, Flags = ? WHERE ID = ?"
+
+    #: Parameters: ID
+    deletePacketStatement = "DELETE FROM Packet WHERE ID = ?"
+
+    #: Pragmas applied to every connection:
+    #: The write-ahead log allows reading while packets are being saved. With WAL, synchronous=NORMAL
+    #: only syncs at checkpoints and is still safe against corruption. Use 64 MiB of page cache
+    #: and keep temporary tables and indexes in memory
+    connectionPragmaStatementsList = [
+        "PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -65536", "PRAGMA temp_store = MEMORY"
+    ]
+
     @staticmethod
     def getInsertStatement(tableName, columnList, valuesList):
         """
@@ -194,24 +291,6 @@ class DatabaseStatements():
             DatabaseStatements.packetSetTableName,
             ["ProjectID", "Name", "Date"], [projectID, name, date])
 
-    @staticmethod
-    def getInsertPacketStatement(packetSetID, CANID, data, timestamp, iface):
-        """
-        Returns an SQL insert statement for a Packet using :func:`getInsertStatement`.
-
-        :param packetSetID: The PacketSet this Packet belongs to
-        :param CANID: CAN ID
-        :param data: Payload data
-        :param timestamp: Timestamp of the packet
-        :param iface: Interface name from which this packet was captured from
-        :return: The SQL insert statement with all Packet specific values set
-        """
-
-        return DatabaseStatements.getInsertStatement(
-            DatabaseStatements.packetTableName,
-            ["PacketSetID", "CANID", "Data", "Timestamp", "Interface"],
-            [packetSetID, CANID, data, timestamp, iface])
-
     @staticmethod
     def getInsertKnownPacketStatement(projectID, CANID, data, description):
         """
@@ -319,6 +398,11 @@ class Database():
     This class handles the database connection and is responsible for creating, deleting and updating values
     """
 
+    #: Amount of packets that are inserted between two GUI updates in :func:`savePacketsBatch`
+    savePacketsChunkSize = 50000
+    #: Amount of packets that are fetched at once by :func:`iterPacketsOfPacketSet`
+    fetchPacketsChunkSize = 10000
+
     def __init__(self):
         """
         This method does the following things:
@@ -338,6 +422,8 @@ class Database():
                                     Strings.databaseFirstRunMessageBoxText,
                                     QMessageBox.Ok)
 
+        self.migrateDB()
+
         self.logger.debug(Strings.databaseSetupOK)
 
     def connect(self):
@@ -359,6 +445,16 @@ class Database():
 
             connection = sqlite3.connect(
                 Settings.DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
+            for pragmaStatement in DatabaseStatements.connectionPragmaStatementsList:
+                connection.execute(pragmaStatement)
+
+            # Used to migrate packets to the binary format
+            connection.create_function("encodeCANID", 1, Database.encodeCANID)
+            connection.create_function("encodeData", 1, Database.encodeData)
+            connection.create_function("encodeTimestamp", 1,
+                                       Database.encodeTimestamp)
+            connection.create_function("getPacketFlags", 2,
+                                       Database.getPacketFlags)
             self.logger.info(Strings.databaseConnectionOK)
             return connection
 
@@ -379,7 +475,11 @@ class Database():
 
         cursor = self.connection.cursor()
         cursor.execute(DatabaseStatements.checkTablesPresentStatement)
-        data = cursor.fetchall()
+        # Only count the tables holding data, the SchemaVersion table is handled by migrateDB
+        data = [
+            row for row in cursor.fetchall()
+            if row[0] in DatabaseStatements.tableNamesList
+        ]
 
         # All tables present
         if len(data) == DatabaseStatements.tableCount:
@@ -410,8 +510,14 @@ class Database():
                 QMessageBox.Yes | QMessageBox.No)
             if (answer == QMessageBox.Yes):
                 self.logger.info(Strings.databaseCorruptAction)
-                # Delete sqlite file and create a fresh db in the next step
-                os.remove(Settings.DB_PATH)
+                # Close the connection before deleting the sqlite file and create a fresh db in the next step.
+                # The WAL files have to be deleted too, else they would be replayed into the new database
+                cursor.close()
+                self.connection.close()
+                for filePath in (Settings.DB_PATH, Settings.DB_PATH + "-wal",
+                                 Settings.DB_PATH + "-shm"):
+                    if os.path.exists(filePath):
+                        os.remove(filePath)
                 # Update the connection object
                 self.connection = self.connect()
                 return False
@@ -432,9 +538,171 @@ class Database():
 
         for createTableStatement in DatabaseStatements.createTableStatementsList:
             cursor.execute(createTableStatement)
+        # New tables have the version 0 --> migrateDB will upgrade them
+        cursor.execute(DatabaseStatements.createSchemaVersionTableStatement)
+        cursor.execute(DatabaseStatements.deleteSchemaVersionStatement)
         self.connection.commit()
         self.logger.debug(Strings.databaseCreatingTablesOK)
 
+    def migrateDB(self):
+        """
+        Upgrade the database schema in place to the current version
+        (see :attr:`~src.Database.DatabaseStatements.migrationStatementsList`).
+        Databases without a SchemaVersion table have the version 0.
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute(DatabaseStatements.createSchemaVersionTableStatement)
+        cursor.execute(DatabaseStatements.selectSchemaVersionStatement)
+        row = cursor.fetchone()
+        if row is None:
+            version = 0
+            cursor.execute(DatabaseStatements.insertSchemaVersionStatement,
+                           (version, ))
+        else:
+            version = row[0]
+        self.connection.commit()
+
+        if version >= DatabaseStatements.schemaVersion:
+            return
+
+        # The sqlite3 module doesn't wrap schema changes (e.g. CREATE TABLE, DROP TABLE) in its implicit
+        # transactions. So every migration runs in an explicit transaction: Either all of its statements
+        # and the version update are applied or none of them, even if the application crashes
+        isolationLevel = self.connection.isolation_level
+        self.connection.isolation_level = None
+        try:
+            for version in range(version, DatabaseStatements.schemaVersion):
+                self.logger.info(Strings.databaseMigrating + " " +
+                                 str(version + 1))
+                cursor.execute("BEGIN")
+                try:
+                    for statement in DatabaseStatements.migrationStatementsList[
+                            version]:
+                        cursor.execute(statement)
+                    cursor.execute(
+                        DatabaseStatements.updateSchemaVersionStatement,
+                        (version + 1, ))
+                    cursor.execute("COMMIT")
+                except Exception as e:
+                    # SQLite may have rolled back already, e.g. if the disk is full
+                    if self.connection.in_transaction:
+                        cursor.execute("ROLLBACK")
+                    raise e
+        finally:
+            self.connection.isolation_level = isolationLevel
+
+        # Give the space of migrated tables back to the file system
+        self.connection.execute("VACUUM")
+
+    @staticmethod
+    def encodeCANID(CANID):
+        """
+        Converts a CAN ID hex string to the storage format of the Packet table.
+
+        :param CANID: The CAN ID as hex string
+        :return: The CAN ID as integer. Values that aren't valid hex strings are returned unchanged
+        """
+
+        try:
+            return int(CANID, 16)
+        except (TypeError, ValueError):
+            return CANID
+
+    @staticmethod
+    def encodeData(data):
+        """
+        Converts a payload hex string to the storage format of the Packet table.
+
+        :param data: The payload as hex string
+        :return: The payload as bytes. Values that aren't valid hex strings are returned unchanged
+        """
+
+        try:
+            return bytes.fromhex(data)
+        except (TypeError, ValueError):
+            return data
+
+    @staticmethod
+    def encodeTimestamp(timestamp):
+        """
+        Converts a timestamp string to the storage format of the Packet table.
+
+        :param timestamp: The timestamp as string
+        :return: The timestamp as float, None for empty timestamps. Other values are returned unchanged
+        """
+
+        if timestamp is None or timestamp == "":
+            return None
+        try:
+            return float(timestamp)
+        except (TypeError, ValueError):
+            return timestamp
+
+    @staticmethod
+    def getPacketFlags(CANID, data):
+        """
+        Get the flags of a packet (see :class:`~src.FrameBatch.FrameBatch`) that are
+        stored along with the packet.
+
+        :param CANID: The CAN ID as hex string
+        :param data: The payload as hex string
+        :return: The flags as integer
+        """
+
+        flags = 0
+        encodedCANID = Database.encodeCANID(CANID)
+        if isinstance(encodedCANID, int) and (len(CANID) > 3
+                                              or encodedCANID > 0x7FF):
+            flags |= FrameBatch.FLAG_EXTENDED
+        encodedData = Database.encodeData(data)
+        if isinstance(encodedData, bytes) and len(encodedData) > 8:
+            flags |= FrameBatch.FLAG_FD
+        return flags
+
+    @staticmethod
+    def encodePacketValues(packetSetID, CANID, data, timestamp, iface):
+        """
+        Converts the values of a packet to the parameters of
+        :attr:`~src.Database.DatabaseStatements.insertPacketStatement`.
+
+        :return: Tuple: PacketSetID, CANID, Data, Timestamp, Interface, Flags
+        """
+
+        return (packetSetID, Database.encodeCANID(CANID),
+                Database.encodeData(data), Database.encodeTimestamp(timestamp),
+                iface, Database.getPacketFlags(CANID, data))
+
+    @staticmethod
+    def decodePacketRow(row):
+        """
+        Converts a row of the Packet table back to the displayed format: Hex strings for the
+        CAN ID and data, strings for the timestamp.
+
+        :param row: The row as returned by ``SELECT * FROM Packet``
+        :return: Raw data list: ID, PacketSetID, CANID, Data, Timestamp, Interface
+        """
+
+        ID, packetSetID, CANID, data, timestamp, iface, flags = row
+
+        if isinstance(CANID, int):
+            if flags & FrameBatch.FLAG_EXTENDED:
+                CANID = "%08X" % CANID
+            else:
+                CANID = "%03X" % CANID
+
+        if isinstance(data, bytes):
+            data = data.hex().upper()
+        elif data is None:
+            data = ""
+
+        if timestamp is None:
+            timestamp = ""
+        elif not isinstance(timestamp, str):
+            timestamp = str(timestamp)
+
+        return [ID, packetSetID, CANID, data, timestamp, iface]
+
     def getOverallTableCount(self, tableName):
         """
         Returns the count(*) of a table.
@@ -521,8 +789,9 @@ class Database():
 
     def getPacketsOfPacketSet(self, packetSet, raw=False):
         """
-        Get all packets of a specific packet set.
-        Note: Use raw=True for better performance.
+        Get all packets of a specific packet set as list.
+        Note: Use raw=True for better performance. To process big packet sets, use
+        :func:`iterPacketsOfPacketSet` instead.
 
         :param packetSet: All returned packets will belong to this packet set
         :param raw: Boolean value to indicate if the packets will be returned as raw data list (True)
@@ -532,29 +801,73 @@ class Database():
                   - False: List of Packet objects
         """
 
+        return list(self.iterPacketsOfPacketSet(packetSet, raw=raw))
+
+    def iterPacketsOfPacketSet(self, packetSet, raw=False):
+        """
+        Iterate over all packets of a specific packet set. Rows are fetched in chunks of
+        ``fetchPacketsChunkSize`` packets, so only one chunk is held in memory at once.
+
+        :param packetSet: All yielded packets will belong to this packet set
+        :param raw: Boolean value to indicate if the packets will be yielded as raw data lists (True)
+                    or as objects (False)
+        :return: A generator yielding raw data lists or Packet objects, depending on the value of raw
+        """
+
         cursor = self.connection.cursor()
-        cursor.execute(
-            DatabaseStatements.getSelectAllStatementWhereEquals(
-                DatabaseStatements.packetTableName, "PacketSetID",
-                packetSet.id))
-        rows = cursor.fetchall()
-        packets = []
-        for row in rows:
-            assert len(row) == 6
-            # Return as objects or as raw list
-            if raw:
-                packets.append([field for field in row])
-            else:
-                packets.append(
-                    Packet.Packet(
+        cursor.execute(DatabaseStatements.selectPacketsOfPacketSetStatement,
+                       (packetSet.id, ))
+        while True:
+            rows = cursor.fetchmany(Database.fetchPacketsChunkSize)
+            if len(rows) == 0:
+                break
+
+            for row in rows:
+                assert len(row) == 7
+                row = Database.decodePacketRow(row)
+                # Yield as objects or as raw list
+                if raw:
+                    yield row
+                else:
+                    yield Packet.Packet(
                         packetSet.id,
                         row[2],
                         row[3],
                         row[4],
                         row[5],
-                        id=row[0]))
+                        id=row[0])
+
+    def getPacketsOfPacketSetPage(self, packetSet, afterID, limit):
+        """
+        Get the next page of packets of a specific packet set as raw data lists, ordered by their ID.
+        Pages are selected using the last ID of the previous page, so every page is fetched
+        equally fast.
 
-        return packets
+        :param packetSet: All returned packets will belong to this packet set
+        :param afterID: Only packets with a greater database ID are returned. Use 0 for the first page
+        :param limit: The maximum amount of packets to return
+        :return: List of value lists (raw data), same format as :func:`getPacketsOfPacketSet`
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            DatabaseStatements.selectPacketsOfPacketSetPageStatement,
+            (packetSet.id, afterID, limit))
+        return [Database.decodePacketRow(row) for row in cursor.fetchall()]
+
+    def getPacketIDsOfPacketSet(self, packetSet, afterID=0):
+        """
+        Get the database IDs of the packets of a specific packet set.
+
+        :param packetSet: All returned IDs will belong to this packet set
+        :param afterID: Optional: Only IDs greater than this are returned. Default: 0 (all IDs)
+        :return: List of packet IDs
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute(DatabaseStatements.selectPacketIDsOfPacketSetStatement,
+                       (packetSet.id, afterID))
+        return [row[0] for row in cursor.fetchall()]
 
     def deleteFromTableByID(self, tableName, id):
         """
@@ -593,16 +906,10 @@ class Database():
         :param project: The Project object to delete
         """
 
-        # Get the IDs of all associated PacketSets
+        # Delete the packets of all associated PacketSets
         cursor = self.connection.cursor()
-        statement = DatabaseStatements.getSelectAllStatementWhereEquals(
-            DatabaseStatements.packetSetTableName, "ProjectID", project.id)
-        cursor.execute(statement)
-        rows = cursor.fetchall()
-        packetSetIDs = []
-        for row in rows:
-            assert len(row) == 4
-            packetSetIDs.append(row[0])
+        cursor.execute(DatabaseStatements.deletePacketsOfProjectStatement,
+                       (project.id, ))
 
         # Delete the associated PacketSets
         self.deleteFromTableByValue(DatabaseStatements.packetSetTableName,
@@ -612,11 +919,6 @@ class Database():
         self.deleteFromTableByValue(DatabaseStatements.knownPacketTableName,
                                     "ProjectID", project.id)
 
-        # Delete the packets
-        for packetSetID in packetSetIDs:
-            self.deleteFromTableByValue(DatabaseStatements.packetTableName,
-                                        "PacketSetID", packetSetID)
-
         # Delete the project
         self.deleteFromTableByID(DatabaseStatements.projectTableName,
                                  project.id)
@@ -785,28 +1087,25 @@ class Database():
             ID = row.pop()
             assert not isinstance(ID, list)
 
+            colValues = dict(row)
+            CANID = colValues[DatabaseStatements.packetTableCANIDColName]
+            data = colValues[DatabaseStatements.packetTableDataColName]
+
             # Check if it is a new created row --> create a new packet in the DB
-            # and set the ID accordingly
             if ID == -1:
-                for colValueTuple in row:
-                    if colValueTuple[
-                            0] == DatabaseStatements.packetTableCANIDColName:
-                        CANID = colValueTuple[1]
-                    elif colValueTuple[
-                            0] == DatabaseStatements.packetTableDataColName:
-                        data = colValueTuple[1]
-
                 newPacket = Packet.Packet(packetSet.id, CANID, data)
-                ID = self.savePacket(newPacket)
+                self.savePacket(newPacket, commit=False)
+                continue
+
+            cursor.execute(DatabaseStatements.updatePacketStatement,
+                           (Database.encodeCANID(CANID),
+                            Database.encodeData(data),
+                            Database.getPacketFlags(CANID, data), ID))
 
-            cursor.execute(
-                DatabaseStatements.getUpdateByIDStatement(
-                    DatabaseStatements.packetTableName, row, ID))
         # Remove all deleted packets
-        for packetIDToRemove in packetIDsToRemove:
-            cursor.execute(
-                DatabaseStatements.getDeleteByIDStatement(
-                    DatabaseStatements.packetTableName, packetIDToRemove))
+        cursor.executemany(DatabaseStatements.deletePacketStatement,
+                           ((packetIDToRemove, )
+                            for packetIDToRemove in packetIDsToRemove))
 
         # Everything worked --> commit
         self.connection.commit()
@@ -873,21 +1172,16 @@ class Database():
         :return: The database ID of the saved packet if commit is True. Else -1
         """
 
-        listVals = [packetSetID, CANID, data, timestamp, iface]
-
-        cursor = self.connection.cursor()
-
         if packet is not None:
-            cursor.execute(
-                DatabaseStatements.getInsertPacketStatement(
-                    packet.packetSetID, packet.CANID, packet.data,
-                    packet.timestamp, packet.iface))
+            values = Database.encodePacketValues(
+                packet.packetSetID, packet.CANID, packet.data,
+                packet.timestamp, packet.iface)
+        else:
+            values = Database.encodePacketValues(packetSetID, CANID, data,
+                                                 timestamp, iface)
 
-        elif listVals is not None and len(listVals) != 0:
-            cursor.execute(
-                DatabaseStatements.getInsertPacketStatement(
-                    listVals[0], listVals[1], listVals[2], listVals[3],
-                    listVals[4]))
+        cursor = self.connection.cursor()
+        cursor.execute(DatabaseStatements.insertPacketStatement, values)
 
         if commit:
             self.connection.commit()
@@ -896,47 +1190,54 @@ class Database():
 
         return -1
 
-    def savePacketsBatch(self, packetSetID, rawPackets=None, packets=None):
+    def savePacketsBatch(self,
+                         packetSetID,
+                         rawPackets=None,
+                         packets=None,
+                         packetValues=None):
         """
         Save many packets as a batch to the database.
-        Use this for improved speed: No objects, only 1 commit.
+        Use this for improved speed: The insert statement is prepared once and executed for chunks
+        of bound parameters (``executemany``) inside of one transaction.
 
         :param packetSetID: The PacketSet ID the packets belong to
         :param rawPackets: Optional: Packet data as raw data list (List of lists)
         :param packets: Optional: List of packet objects to save. If this is not None, this will be used instead of
                         ``rawPackets``
+        :param packetValues: Optional: Iterable of ``(CANID, data, timestamp, interface)`` tuples to save.
+                             If this is not None, this will be used instead of ``packets`` and ``rawPackets``
         """
 
-        cursor = self.connection.cursor()
-        counter = 0
-
-        # Try it with the packet object list first
-        if packets is not None:
-            for packet in packets:
-                if counter % 10000 == 0:
-                    counter = 0
-                    QtCore.QCoreApplication.processEvents()
-                    counter += 1
+        # Try it with the plain values first
+        encodePacketValues = Database.encodePacketValues
+        if packetValues is not None:
+            values = (encodePacketValues(packetSetID, CANID, data, timestamp,
+                                         iface)
+                      for CANID, data, timestamp, iface in packetValues)
 
-                cursor.execute(
-                    DatabaseStatements.getInsertPacketStatement(
-                        packetSetID, packet.CANID, packet.data,
-                        packet.timestamp, packet.iface))
+        elif packets is not None:
+            values = (encodePacketValues(packetSetID, packet.CANID, packet.data,
+                                         packet.timestamp, packet.iface)
+                      for packet in packets)
 
         # Use raw data as fallback
         else:
-            for rawPacket in rawPackets:
-
-                if counter % 10000 == 0:
-                    counter = 0
-                    QtCore.QCoreApplication.processEvents()
-                    counter += 1
-
-                cursor.execute(
-                    DatabaseStatements.getInsertPacketStatement(
-                        packetSetID, rawPacket[0], rawPacket[1], rawPacket[3],
-                        ""))
-        self.connection.commit()
+            values = (encodePacketValues(packetSetID, rawPacket[0],
+                                         rawPacket[1], rawPacket[3], "")
+                      for rawPacket in rawPackets)
+
+        # Commits on success and rolls back everything if an exception occurs
+        with self.connection:
+            cursor = self.connection.cursor()
+            while True:
+                chunk = list(
+                    itertools.islice(values, Database.savePacketsChunkSize))
+                if len(chunk) == 0:
+                    break
+                cursor.executemany(DatabaseStatements.insertPacketStatement,
+                                   chunk)
+                # Keep the GUI responsive
+                QtCore.QCoreApplication.processEvents()
 
     def saveKnownPacket(self, knownPacket):
         """
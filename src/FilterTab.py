@@ -21,7 +21,7 @@ Created on Jun 02, 2017
 @author: pschmied
 """
 
-from multiprocessing import Pipe, Value
+from multiprocessing import Value
 from operator import itemgetter
 import time
 
@@ -30,9 +30,11 @@ from PySide.QtGui import QMessageBox, QProgressDialog
 from PySide import QtCore, QtGui
 import Globals
 import Strings
-import Toolbox
 from SnifferProcess import SnifferProcess
-from Packet import Packet
+from FrameTransport import FrameTransport
+from FrameBatch import FrameBatch
+from PacketFilter import PacketFilter
+import PacketsDialog
 
 
 class FilterTab(AbstractTab):
@@ -40,6 +42,25 @@ class FilterTab(AbstractTab):
     This class handles the logic of the filter tab
     """
 
+    @staticmethod
+    def recordKey(record):
+        """
+        :param record: A frame record (see :class:`~src.FrameBatch.FrameBatch`)
+        :return: The key that is used to compare packets: (ID, extended flag, data).
+                 The flag keeps standard and extended frames with the same ID apart
+        """
+
+        return (record[1], record[2] & FrameBatch.FLAG_EXTENDED, record[4])
+
+    @staticmethod
+    def recordID(record):
+        """
+        :param record: A frame record
+        :return: The key that is used to compare IDs only: (ID, extended flag)
+        """
+
+        return (record[1], record[2] & FrameBatch.FLAG_EXTENDED)
+
     def __init__(self, tabWidget):
         AbstractTab.__init__(
             self,
@@ -49,10 +70,28 @@ class FilterTab(AbstractTab):
             Strings.filterTabLabelInterfaceValueName,
             allowTablePaste=False)
 
-        #: Noise that will be substracted from the collected data
-        self.noiseData = []
+        #: Keys of the noise that will be substracted from the collected data:
+        #: Keys of :func:`recordKey` or :func:`recordID`, depending on ``removeNoiseWithIDAndData``
+        self.noiseKeys = set()
+        #: Amount of collected noise packets
+        self.noisePacketCount = 0
+        #: Filter noise by ID and data (default) or ID only
+        self.removeNoiseWithIDAndData = True
+
+        #: Packets that occurred in every sample so far and not in the noise.
+        #: Maps keys of :func:`recordKey` to frame records
+        self.candidatePackets = {}
+        #: Candidate keys that occurred in the currently captured sample
+        self.candidateKeysInSample = set()
+
+        #: Rules of frames that won't be captured at all (see :class:`~src.PacketFilter.PacketFilter`).
+        #: The ID parts are applied by the kernel
+        self.IDFilterRules = []
+        #: Only capture the frames matching ``IDFilterRules`` if this is True
+        self.IDFilterInvert = False
 
         self.snifferProcess = None
+        self.frameReceiver = None
         self.dataAdderThread = None
 
         #: Shared process independent flag to terminate the sniffer process
@@ -71,15 +110,19 @@ class FilterTab(AbstractTab):
             QtGui.QPushButton, "buttonFilterStart")
         self.buttonFilterDataClear = self.tabWidget.findChild(
             QtGui.QPushButton, "buttonFilterDataClear")
+        self.buttonFilterIDFilter = self.tabWidget.findChild(
+            QtGui.QPushButton, "buttonFilterIDFilter")
 
         assert all(GUIElem is not None for GUIElem in [
             self.spinBoxFilterTimeCollectNoise, self.spinBoxFilterSampleAmount,
             self.buttonFilterInterfaceSettings, self.buttonFilterStart, self.
-            buttonFilterDataClear
+            buttonFilterDataClear, self.buttonFilterIDFilter
         ]), "GUI Elements not found"
 
         self.buttonFilterInterfaceSettings.clicked.connect(
             self.handleInterfaceSettingsDialog)
+        self.buttonFilterIDFilter.clicked.connect(
+            self.handleIDFilterDialog)
         self.buttonFilterStart.clicked.connect(self.startFilter)
         self.buttonFilterDataClear.clicked.connect(self.clear)
 
@@ -109,8 +152,6 @@ class FilterTab(AbstractTab):
             noiseCaptureOK = self.collectNoise(noiseCollectSeconds)
 
         if noiseCaptureOK:
-            # Reset the captured data
-            self.rawData = []
             for curSampleIndex in range(sampleAmount):
                 self.getSampleData(sampleAmount, curSampleIndex)
 
@@ -120,127 +161,26 @@ class FilterTab(AbstractTab):
         self.CANData.active = False
         self.active = False
 
-    def analyze(self, removeNoiseWithIDAndData=True):
+    def analyze(self):
         """
-        Analyze captured data:
-         1. Remove sorted noise data (if collected):
-            For each sample:
-            - Sort the sample to increase filtering speed
-            - Remove noise
-         2. Find relevant packets:
-            - Sort each sample to increase filtering speed
-            - Assume that all packets of the first sample occurred in every other sample
-            - Take every other sample and compare
-
-        Depending on ``removeNoiseWithIDAndData`` noise will be filtered by
-        ID and data (default) or ID only
-
-        :param removeNoiseWithIDAndData: Optional value: Filter data by ID and Data or ID only
+        Display the analyzed data: The candidate packets have been updated while capturing,
+        so only the packets that remained after the last sample have to be displayed.
         """
 
-        # Setup the progress dialog for the user
-        progressDialog = Toolbox.Toolbox.getWorkingDialog(
-            Strings.filterTabDialogAnalyzing)
-        progressDialog.open()
-        try:
-            QtCore.QCoreApplication.processEvents()
-
-            # Do the actual computing
-            sortedSamplesWithoutNoise = []
-
-            # Remove noise (if collected)
-
-            if len(self.noiseData) > 0:
-                # Sort by CAN ID first
-                noiseDataSorted = sorted(self.noiseData, key=itemgetter(0))
-
-                # For each sample
-                for curSampleIndex in range(len(self.rawData)):
-                    curSample = self.rawData[curSampleIndex]
-
-                    # Sort the sample list and noise data by ID to increase filtering speed
-                    curSampleSorted = sorted(curSample, key=itemgetter(0))
-                    self.logger.debug("Sample size: " + str(len(curSample)))
-
-                    # Compare noise and sample data
-                    for noisePacket in noiseDataSorted:
-                        # Update the progress bar
-                        QtCore.QCoreApplication.processEvents()
-                        for sniffedPacket in curSampleSorted:
-
-                            # We sorted the lists previously because of this
-                            # This allows us to break the loop earlier because no
-                            # equal ID will be reached anymore (it's sorted!)
-                            if sniffedPacket[0] > noisePacket[0]:
-                                break
-
-                            if removeNoiseWithIDAndData:
-
-                                if sniffedPacket[0] == noisePacket[
-                                        0] and sniffedPacket[1] == noisePacket[
-                                            1]:
-                                    curSampleSorted.remove(sniffedPacket)
-
-                            # Filter it by ID only
-                            else:
-                                if sniffedPacket[0] == noisePacket[0]:
-                                    curSampleSorted.remove(sniffedPacket)
-
-                    sortedSamplesWithoutNoise.append(curSampleSorted)
-
-            # No noise to remove, just sort
-            else:
-                for curSample in self.rawData:
-                    sortedSamplesWithoutNoise.append(
-                        sorted(curSample, key=itemgetter(0)))
-
-            # Noise has been removed --> find relevant packets now
-            self.logger.info(Strings.filterTabStartAnalyzing)
-            # Find packets with ID and data that occurred in all samples
-
-            # First just assume that all packets of the first sample occurred in every other sample
-            # --> Copy the list using the slicing operator
-            packetsInAllSamples = sortedSamplesWithoutNoise[0][:]
-            remainingPackets = []
-
-            # Now take every other sample and compare
-            for sampleIndex in range(1, len(sortedSamplesWithoutNoise)):
-
-                # Every potential packet has been removed --> don't continue
-                if len(packetsInAllSamples) == 0:
-                    break
-
-                for samplePacket in sortedSamplesWithoutNoise[sampleIndex]:
-
-                    # Update the progress bar
-                    QtCore.QCoreApplication.processEvents()
+        self.logger.info(Strings.filterTabStartAnalyzing)
+        remainingPackets = [
+            FilterTab.recordToList(record)
+            for record in sorted(
+                self.candidatePackets.values(), key=itemgetter(1))
+        ]
+        self.logger.info(Strings.filterTabFinishAnalyzing)
 
-                    for packetInAllSamples in packetsInAllSamples:
-                        # Don't continue searching if a greater element has been found
-                        # because they will all be greater anyway
-                        if samplePacket[0] < packetInAllSamples[0]:
-                            break
-
-                    # Check if ID and data are equal
-                        if samplePacket[0] == packetInAllSamples[
-                                0] and samplePacket[1] == packetInAllSamples[1]:
-                            # The packet exists in both lists --> break the inner loop because all following
-                            # packets would have greater IDs
-                            remainingPackets.append(packetInAllSamples)
-                        else:
-                            pass
-
-            self.logger.info(Strings.filterTabFinishAnalyzing)
-
-            # Analyzing done, show the remaining packets
-            self.outputRemainingPackets(remainingPackets)
-
-        finally:
-            progressDialog.close()
+        # Analyzing done, show the remaining packets
+        self.outputRemainingPackets(remainingPackets)
 
     def collectNoise(self, seconds):
         """
-        Collect noise data and update ``noiseData``.
+        Collect noise data and update ``noiseKeys``.
         Uses the processes/threads started in :func:`startSnifferAndAdder`.
 
         :param seconds: Amount of seconds to capture noise
@@ -248,7 +188,8 @@ class FilterTab(AbstractTab):
         :return: True if noise was captured. False if the user pressed "Cancel"
         """
 
-        self.noiseData = []
+        self.noiseKeys = set()
+        self.noisePacketCount = 0
         # Setup the ProgressDialog
         progressDialog = QProgressDialog(
             Strings.filterTabCollectingNoiseMessageBoxText, "Cancel", 0,
@@ -277,6 +218,8 @@ class FilterTab(AbstractTab):
                                             seconds - secondsToCollect)
 
         self.stopSnifferAndAdder()
+        # Add the noise that is still queued in the event loop
+        QtCore.QCoreApplication.processEvents()
         return not progressDialog.wasCanceled()
 
     def updateNoiseCollectProgress(self, progressDialog, value):
@@ -288,7 +231,7 @@ class FilterTab(AbstractTab):
         """
 
         labelText = Strings.filterTabCollectingNoiseMessageBoxText.replace(
-            "0", str(len(self.noiseData)))
+            "0", str(self.noisePacketCount))
         progressDialog.setLabelText(labelText)
         progressDialog.setValue(value)
 
@@ -298,15 +241,14 @@ class FilterTab(AbstractTab):
 
     def getSampleData(self, sampleAmount, curSampleIndex):
         """
-        Collect sample data and add the sniffed data to ``rawData[curSampleIndex]``.
+        Collect sample data and update ``candidatePackets`` using the sniffed data.
         Uses the processes/threads started using :func:`startSnifferAndAdder`.
 
         :param sampleAmount: Amount of samples to collect
-        :param curSampleIndex: Index of the currently captured sample in ``rawData``
+        :param curSampleIndex: Index of the currently captured sample
         """
 
-        # Append a new list for the current sample run
-        self.rawData.append([])
+        self.candidateKeysInSample = set()
 
         # Display another text in the last round
         if curSampleIndex == range(sampleAmount)[-1]:
@@ -325,11 +267,21 @@ class FilterTab(AbstractTab):
             messageBoxText, QMessageBox.Ok)
 
         self.stopSnifferAndAdder()
+        # Add the packets that are still queued in the event loop
+        QtCore.QCoreApplication.processEvents()
+
+        # Only keep the candidates that also occurred in this sample
+        if curSampleIndex > 0:
+            self.candidatePackets = {
+                key: self.candidatePackets[key]
+                for key in self.candidateKeysInSample
+            }
+        self.candidateKeysInSample = set()
 
     def startSnifferAndAdder(self, adderMethod, curSampleIndex=-1):
         """
         Start a DataAdderThread and a SnifferProcess to collect data. They will communicate using a
-        multiprocess pipe to collect data without interrupting the GUI thread.
+        :class:`~src.FrameTransport.FrameTransport` to collect data without interrupting the GUI thread.
 
         :param adderMethod: The DataAdderThread will call this method to handle the received data
         :param curSampleIndex: The index of the currently captured sample (-1 as default)
@@ -341,20 +293,21 @@ class FilterTab(AbstractTab):
 
         # Start the sniffer process and append
         # the sniffed data to the current list using the adder thread
-        snifferReceivePipe, snifferSendPipe = Pipe()
+        frameSender, self.frameReceiver = FrameTransport.create()
 
         # First start the DataAdderThread...
-        self.dataAdderThread = DataAdderThread(snifferReceivePipe,
+        self.dataAdderThread = DataAdderThread(self.frameReceiver,
                                                self.sharedDataAdderEnabledFlag,
                                                curSampleIndex)
 
-        self.dataAdderThread.signalSniffedPacket.connect(adderMethod)
+        self.dataAdderThread.signalSniffedRecords.connect(adderMethod)
         self.dataAdderThread.start()
 
         # ... then start the SnifferProcess
         self.snifferProcess = SnifferProcess(
-            snifferSendPipe, self.sharedSnifferEnabledFlag,
-            Strings.filterTabLoggerName, self.CANData)
+            frameSender, self.sharedSnifferEnabledFlag,
+            Strings.filterTabLoggerName, self.CANData,
+            packetFilterRules=(self.IDFilterRules, self.IDFilterInvert))
         self.snifferProcess.start()
 
         if curSampleIndex == -1:
@@ -365,28 +318,60 @@ class FilterTab(AbstractTab):
 
     def stopSnifferAndAdder(self):
         """
-        Stop the DataAdderThread and SnifferProcess using the shared integer variable.
+        Stop the DataAdderThread and SnifferProcess using the shared integer variables.
+        Both are woken up immediately.
         """
 
         # Stop SnifferProcess and DataAdderThread
         # Stop the Sniffer
-        with self.sharedSnifferEnabledFlag.get_lock():
-            self.sharedSnifferEnabledFlag.value = 0
-        self.snifferProcess.join()
+        self.snifferProcess.stop()
         self.logger.debug(Strings.snifferProcessTerminated)
 
         # Stop the DataAdder
         with self.sharedDataAdderEnabledFlag.get_lock():
             self.sharedDataAdderEnabledFlag.value = 0
+        self.frameReceiver.interrupt()
         self.dataAdderThread.wait()
         self.logger.debug(Strings.filterTabDataAdderThreadTerminated)
 
+        droppedCount = self.frameReceiver.getDroppedCount()
+        if droppedCount > 0:
+            self.logger.warn(Strings.framesDropped + " " + str(droppedCount))
+        self.frameReceiver.close()
+
+    def handleIDFilterDialog(self):
+        """
+        Open a dialog to manage the CAN ID filter. Matching frames are dropped
+        (or exclusively captured if inverted) before they reach the noise and the samples.
+        """
+
+        dialog = PacketsDialog.PacketsDialog(
+            packets=self.IDFilterRules, returnPacketsAsRawList=False,
+            invert=self.IDFilterInvert,
+            editRules=True)
+        res = dialog.open()
+        if res is None:
+            return
+
+        self.IDFilterInvert, IDFilterRules = res
+        if IDFilterRules is not None:
+            self.IDFilterRules = IDFilterRules
+            self.logger.info(Strings.filterTabIDFilterUpdated)
+
+            invalidRules = PacketFilter(IDFilterRules).invalidRules
+            if len(invalidRules) > 0:
+                self.logger.warn(Strings.packetFilterInvalidRules +
+                                 " " + ", ".join(invalidRules))
+
     def clear(self, returnOldPackets=False):
         """
         Clear the currently displayed data on the GUI and in the lists.
         """
         AbstractTab.clear(self)
-        self.noiseData = []
+        self.noiseKeys = set()
+        self.noisePacketCount = 0
+        self.candidatePackets = {}
+        self.candidateKeysInSample = set()
 
     def outputRemainingPackets(self, remainingPackets):
         """
@@ -399,35 +384,66 @@ class FilterTab(AbstractTab):
         for rawPacket in remainingPackets:
             self.addPacket(rawPacket)
 
-    def addSniffedNoise(self, dummyIndex, packet):
+    def addSniffedNoise(self, dummyIndex, records):
         """
-        Adds the passed packet data to ``noiseData``.
+        Adds the keys of the passed frame records to ``noiseKeys``.
         This method gets called by a DataAdderThread.
 
         :param dummyIndex: Not used, only exists to match the signature defined in the signal of the DataAdderThread
-        :param packet: The packet object to extract and add data from
+        :param records: List of frame records (see :class:`~src.FrameBatch.FrameBatch`)
         """
 
-        assert packet is not None
-        # Use a list of values because it's much faster than creating "Packet" objects
-        self.noiseData.append(
-            [packet.CANID, packet.data, packet.length, packet.timestamp])
+        assert records is not None
+        if self.removeNoiseWithIDAndData:
+            self.noiseKeys.update(map(FilterTab.recordKey, records))
+        else:
+            self.noiseKeys.update(map(FilterTab.recordID, records))
+        self.noisePacketCount += len(records)
 
-    def addSniffedPacketToSample(self, curSampleIndex, packet):
+    def addSniffedPacketToSample(self, curSampleIndex, records):
         """
-        Adds a sniffed packet to the sample defined by ``curSampleIndex``.
+        Updates the candidate packets using sniffed frame records of the sample defined by ``curSampleIndex``:
+        Frames of the first sample become candidates if they don't match the noise.
+        Frames of the other samples mark matching candidates as present in the current sample.
         Gets called by a DataAdderThread.
 
-        :param curSampleIndex: The sample index to get a list from ``rawData[curSampleIndex]``
-        :param packet: Packet data to add
-        :return:
+        :param curSampleIndex: The index of the currently captured sample
+        :param records: List of frame records (see :class:`~src.FrameBatch.FrameBatch`)
+        """
+
+        assert records is not None
+
+        candidatePackets = self.candidatePackets
+        if curSampleIndex == 0:
+            noiseKeys = self.noiseKeys
+            noiseKey = FilterTab.recordKey if self.removeNoiseWithIDAndData else FilterTab.recordID
+            recordKey = FilterTab.recordKey
+            for record in records:
+                key = recordKey(record)
+                if key not in candidatePackets and noiseKey(
+                        record) not in noiseKeys:
+                    candidatePackets[key] = record
+        else:
+            self.candidateKeysInSample.update(
+                key for key in map(FilterTab.recordKey, records)
+                if key in candidatePackets)
+
+    @staticmethod
+    def recordToList(record):
         """
+        Converts a frame record (see :class:`~src.FrameBatch.FrameBatch`) to raw list data.
+        This is only done for the packets that remain after analyzing.
 
-        assert packet is not None
+        :param record: The frame record
+        :return: The raw list data: ID, data, length and timestamp
+        """
 
-        # Use a list of values because it's much faster than creating "Packet" objects
-        self.rawData[curSampleIndex].append(
-            [packet.CANID, packet.data, packet.length, packet.timestamp])
+        timestamp, arbitrationID, flags, dlc, data = record
+        if flags & FrameBatch.FLAG_EXTENDED:
+            CANID = "%08X" % arbitrationID
+        else:
+            CANID = "%03X" % arbitrationID
+        return [CANID, data.hex().upper(), dlc, str(timestamp)]
 
     def toggleGUIElements(self, state):
         """
@@ -440,7 +456,7 @@ class FilterTab(AbstractTab):
                 self.spinBoxFilterTimeCollectNoise,
                 self.spinBoxFilterSampleAmount, self.buttonFilterStart,
                 self.buttonFilterInterfaceSettings, self.buttonFilterDataClear,
-                self.packetTableView
+                self.buttonFilterIDFilter, self.packetTableView
         ]:
             GUIElement.setEnabled(state)
 
@@ -455,50 +471,40 @@ class DataAdderThread(QtCore.QThread):
     """
 
     #: Emit a signal to the main thread when items are ready to be added
-    #: This emits the packet and the current sample index
-    signalSniffedPacket = QtCore.Signal(int, object)
+    #: This emits the current sample index and a list of frame records
+    signalSniffedRecords = QtCore.Signal(int, list)
 
-    def __init__(self, snifferReceivePipe, sharedEnabledFlag, curSampleIndex):
+    def __init__(self, frameReceiver, sharedEnabledFlag, curSampleIndex):
         # Call the superclass constructor
         QtCore.QThread.__init__(self)
         self.curSampleIndex = curSampleIndex
         # Attributes to manage the sniffer process
         self.sharedEnabledFlag = sharedEnabledFlag
-        self.snifferReceivePipe = snifferReceivePipe
-
-    def frameToList(self, frame):
-        """
-        Converts a received can.Message frame to raw list data.
-        After that, the data is emitted using ``signalSniffedPacket``
-
-        :param frame: can.Message CAN frame
-        """
-
-        # Extract the data to be displayed
-        id = str(hex(frame.arbitration_id)).replace("0x", "").upper()
-        # cut "0x" and always use an additional leading zero if needed
-        data = "".join(hex(value)[2:].zfill(2) for value in frame.data).upper()
-        length = frame.dlc
-        timestamp = str(frame.timestamp)
-
-        packet = Packet(None, id, data, timestamp, "", length=length)
-
-        self.signalSniffedPacket.emit(self.curSampleIndex, packet)
+        self.frameReceiver = frameReceiver
 
     def run(self):
         """
-        As long as ``sharedEnabledFlag`` is not set to ``0`` data will be
-        received using the pipe and processed using :func:`frameToList`.
+        As long as ``sharedEnabledFlag`` is not set to ``0`` batches of frames will be
+        received using the frame receiver. Every batch is emitted using ``signalSniffedRecords``
+        without converting the frame records. The frame receiver has to be interrupted after
+        the flag has been set.
         """
 
         while self.sharedEnabledFlag.value == 1:
-            frame = None
             try:
-                # Receive data from the SnifferProcess via a pipe
-                if self.snifferReceivePipe.poll(1):
-                    frame = self.snifferReceivePipe.recv()
+                # Receive data from the SnifferProcess
+                records = self.frameReceiver.receiveRecords(None)
             except EOFError:
                 break
             else:
-                if frame is not None:
-                    self.frameToList(frame)
+                if len(records) > 0:
+                    self.signalSniffedRecords.emit(self.curSampleIndex,
+                                                   records)
+
+        # Also add the frames that have been sent right before the sniffer stopped
+        try:
+            records = self.frameReceiver.receiveRecords(0)
+        except EOFError:
+            return
+        if len(records) > 0:
+            self.signalSniffedRecords.emit(self.curSampleIndex, records)
@@ -0,0 +1,176 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+import struct
+import time
+
+
+class FrameBatch():
+    """
+    Collects captured frames so they can be passed on as one batch. Batches can be packed into
+    one compact binary block. Sending one block per batch instead of one pickled ``can.Message``
+    per frame saves a pickle round trip and a syscall for every single frame.
+
+    A frame is handled as a *frame record* which is a tuple of the following form:
+    ``(timestamp, arbitrationID, flags, dlc, data)`` with ``data`` being a bytes object.
+    """
+
+    #: Flag bits of a frame record
+    FLAG_EXTENDED = 0x01
+    FLAG_FD = 0x02
+    FLAG_REMOTE = 0x04
+    FLAG_ERROR = 0x08
+
+    #: Header of every packed record: timestamp, arbitration ID, flags, DLC and the data length.
+    #: The data bytes directly follow the header
+    recordHeader = struct.Struct("<dIBBB")
+
+    #: Default amount of frames after which a batch will be flushed
+    maxFramesDefault = 256
+    #: Default amount of seconds after which a batch will be flushed
+    maxDelayDefault = 0.02
+
+    def __init__(self, maxFrames=None, maxDelay=None):
+        """
+        Set the flush limits.
+
+        :param maxFrames: Optional: The batch is due if it contains this amount of frames
+        :param maxDelay: Optional: The batch is due if its first frame is older than this amount of seconds
+        """
+
+        self.maxFrames = maxFrames if maxFrames is not None else FrameBatch.maxFramesDefault
+        self.maxDelay = maxDelay if maxDelay is not None else FrameBatch.maxDelayDefault
+        self.records = []
+        #: Point in time when the first record of the current batch was added
+        self.firstRecordTime = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, record):
+        """
+        Add a frame record to the current batch.
+
+        :param record: The frame record to add
+        """
+
+        if self.firstRecordTime is None:
+            self.firstRecordTime = time.monotonic()
+        self.records.append(record)
+
+    def isDue(self):
+        """
+        Check whether the batch has to be flushed because of its size or its age.
+
+        :return: A boolean value indicating whether :func:`take` should be called
+        """
+
+        if len(self.records) == 0:
+            return False
+        if len(self.records) >= self.maxFrames:
+            return True
+        return time.monotonic() - self.firstRecordTime >= self.maxDelay
+
+    def getRemainingDelay(self):
+        """
+        :return: The amount of seconds until the batch is due because of its age or None if the batch is empty
+        """
+
+        if self.firstRecordTime is None:
+            return None
+        return max(self.maxDelay - (time.monotonic() - self.firstRecordTime), 0)
+
+    def take(self):
+        """
+        Return all collected records and reset the batch.
+
+        :return: List of frame records
+        """
+
+        records = self.records
+        self.records = []
+        self.firstRecordTime = None
+        return records
+
+    @staticmethod
+    def messageToRecord(frame):
+        """
+        Converts a can.Message object to a frame record.
+
+        :param frame: can.Message CAN frame
+        :return: The frame record
+        """
+
+        flags = 0
+        if frame.is_extended_id:
+            flags |= FrameBatch.FLAG_EXTENDED
+        if getattr(frame, "is_fd", False):
+            flags |= FrameBatch.FLAG_FD
+        if frame.is_remote_frame:
+            flags |= FrameBatch.FLAG_REMOTE
+        if frame.is_error_frame:
+            flags |= FrameBatch.FLAG_ERROR
+
+        timestamp = frame.timestamp if frame.timestamp is not None else 0.0
+        return (timestamp, frame.arbitration_id, flags, frame.dlc,
+                bytes(frame.data))
+
+    @staticmethod
+    def pack(records):
+        """
+        Packs a list of frame records into one bytes object.
+
+        :param records: List of frame records
+        :return: The packed records
+        """
+
+        packHeader = FrameBatch.recordHeader.pack
+        parts = []
+        for timestamp, arbitrationID, flags, dlc, data in records:
+            parts.append(
+                packHeader(timestamp, arbitrationID, flags, dlc, len(data)))
+            parts.append(data)
+        return b"".join(parts)
+
+    @staticmethod
+    def unpack(packedRecords):
+        """
+        Unpacks a whole batch that has been packed using :func:`pack`.
+
+        :param packedRecords: The packed records
+        :return: List of frame records
+        """
+
+        unpackHeader = FrameBatch.recordHeader.unpack_from
+        headerSize = FrameBatch.recordHeader.size
+        records = []
+        offset = 0
+        end = len(packedRecords)
+        while offset < end:
+            timestamp, arbitrationID, flags, dlc, dataLength = unpackHeader(
+                packedRecords, offset)
+            offset += headerSize
+            records.append((timestamp, arbitrationID, flags, dlc,
+                            packedRecords[offset:offset + dataLength]))
+            offset += dataLength
+        return records
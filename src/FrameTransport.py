@@ -0,0 +1,193 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+from multiprocessing import Pipe
+import select
+
+import Settings
+from FrameBatch import FrameBatch
+from RingBuffer import RingBuffer
+from WakeupPipe import WakeupPipe
+
+
+class FrameTransport():
+    """
+    Creates the connection between a capturing process or thread and an adder thread.
+    Both ends exchange lists of frame records (see :class:`~src.FrameBatch.FrameBatch`).
+
+    The transport type is configured using ``Settings.FRAME_TRANSPORT``:
+
+    - ``pipe``: Every batch of records is sent as one packed block through a multiprocessing pipe
+    - ``ring``: Records are written to a shared memory ring buffer (see :class:`~src.RingBuffer.RingBuffer`)
+
+    Receivers wait without polling. A waiting receiver can be woken up using ``interrupt``.
+    """
+
+    TYPE_PIPE = "pipe"
+    TYPE_RING = "ring"
+
+    @staticmethod
+    def create(transportType=None):
+        """
+        Create both ends of a new transport. This has to be done before the producer gets started.
+
+        :param transportType: Optional: The transport type to use. If this is not specified,
+                              ``Settings.FRAME_TRANSPORT`` is being used
+        :return: A tuple of the sender and the receiver
+        """
+
+        if transportType is None:
+            transportType = Settings.FRAME_TRANSPORT
+
+        if transportType == FrameTransport.TYPE_RING:
+            ringBuffer = RingBuffer(Settings.RING_BUFFER_CAPACITY)
+            return RingFrameSender(ringBuffer), RingFrameReceiver(ringBuffer)
+
+        receivePipe, sendPipe = Pipe()
+        return PipeFrameSender(sendPipe), PipeFrameReceiver(receivePipe)
+
+
+class PipeFrameSender():
+    """
+    Sends lists of frame records as packed blocks through a multiprocessing pipe.
+    """
+
+    def __init__(self, sendPipe):
+        self.sendPipe = sendPipe
+
+    def sendRecords(self, records):
+        """
+        :param records: List of frame records to send
+        """
+
+        self.sendPipe.send_bytes(FrameBatch.pack(records))
+
+
+class PipeFrameReceiver():
+    """
+    Receives packed blocks from a multiprocessing pipe.
+    """
+
+    def __init__(self, receivePipe):
+        self.receivePipe = receivePipe
+        self.interruptPipe = WakeupPipe()
+
+    def receiveRecords(self, timeout):
+        """
+        Wait for the next batch of frame records.
+
+        :param timeout: Maximum amount of seconds to wait. None waits until data is available or
+                        :func:`interrupt` is called
+        :return: List of frame records, this is empty if nothing has been received
+        :raises EOFError: If the sending end has been closed
+        """
+
+        readable, _, _ = select.select([self.receivePipe, self.interruptPipe],
+                                       [], [], timeout)
+        if self.receivePipe not in readable:
+            self.interruptPipe.clear()
+            return []
+        return FrameBatch.unpack(self.receivePipe.recv_bytes())
+
+    def interrupt(self):
+        """
+        Wake up a thread that is waiting in :func:`receiveRecords`.
+        """
+
+        self.interruptPipe.wake()
+
+    def close(self):
+        """
+        Release the resources of the receiver after the sender has terminated.
+        """
+
+        self.interruptPipe.close()
+
+    def getDroppedCount(self):
+        """
+        :return: The amount of dropped frames. Pipes never drop frames, so this is always 0
+        """
+
+        return 0
+
+
+class RingFrameSender():
+    """
+    Writes lists of frame records to a shared memory ring buffer.
+    """
+
+    def __init__(self, ringBuffer):
+        self.ringBuffer = ringBuffer
+
+    def sendRecords(self, records):
+        """
+        :param records: List of frame records to send
+        """
+
+        self.ringBuffer.write(records)
+
+
+class RingFrameReceiver():
+    """
+    Reads frame records from a shared memory ring buffer.
+    """
+
+    def __init__(self, ringBuffer):
+        self.ringBuffer = ringBuffer
+        self.interruptPipe = WakeupPipe()
+
+    def receiveRecords(self, timeout):
+        """
+        Wait for frame records and read all available ones.
+
+        :param timeout: Maximum amount of seconds to wait. None waits until data is available or
+                        :func:`interrupt` is called
+        :return: List of frame records, this is empty if nothing has been received
+        """
+
+        if not self.ringBuffer.waitReadable(timeout, self.interruptPipe):
+            self.interruptPipe.clear()
+            return []
+        return self.ringBuffer.readRecords()
+
+    def interrupt(self):
+        """
+        Wake up a thread that is waiting in :func:`receiveRecords`.
+        """
+
+        self.interruptPipe.wake()
+
+    def close(self):
+        """
+        Release the resources of the receiver after the sender has terminated.
+        """
+
+        self.interruptPipe.close()
+        self.ringBuffer.close()
+
+    def getDroppedCount(self):
+        """
+        :return: The amount of frames that have been dropped because the consumer fell behind
+        """
+
+        return self.ringBuffer.getOverflowCount()
@@ -22,7 +22,6 @@ Created on May 31, 2017
 """
 
 import random
-from multiprocessing import Pipe
 
 import Globals
 import Strings
@@ -35,6 +34,7 @@ import MainTab
 from CANData import CANData
 import SenderThread
 from ItemAdderThread import ItemAdderThread
+from FrameTransport import FrameTransport
 
 
 class FuzzerTab(AbstractTab):
@@ -49,7 +49,8 @@ class FuzzerTab(AbstractTab):
             Strings.fuzzerTabLoggerName, [2, 3, 4],
             Strings.fuzzerTabPacketTableViewName,
             Strings.fuzzerTabLabelInterfaceValueName,
-            allowTablePaste=False)
+            allowTablePaste=False,
+            useColumnarStore=True)
 
         #: The ID is 8 chars max. - initialize it with only X chars
         self.IDMask = "X" * 8
@@ -66,6 +67,8 @@ class FuzzerTab(AbstractTab):
         self.fuzzSenderThread = None
         #: Adding items also takes place in a separate thread to avoid blocking the GUI thread
         self.itemAdderThread = None
+        #: Receives the sent frames for the ItemAdderThread
+        self.frameReceiver = None
 
         #: These values will be available in the fuzzing mode ComboBox
         self.fuzzingModeComboBoxValuePairs = [("User specified values", 0),
@@ -159,19 +162,20 @@ class FuzzerTab(AbstractTab):
             # in ms
             sleepTime = self.doubleSpinBoxFuzzerPacketGap.value() / 1000
 
-            fuzzerReceivePipe, fuzzerSendPipe = Pipe()
+            frameSender, self.frameReceiver = FrameTransport.create()
 
             # Start the Threads
             # First start the ItemAdderThread...
             self.itemAdderThread = ItemAdderThread(
-                fuzzerReceivePipe, self.packetTableModel, self.rawData)
+                self.frameReceiver, self.packetTableModel, self.rawData,
+                emitRecords=True)
 
-            self.itemAdderThread.appendRow.connect(self.addPacket)
+            self.itemAdderThread.appendRecords.connect(self.addRecords)
             self.itemAdderThread.start()
 
             # ... then start the fuzzing thread
             self.fuzzSenderThread = SenderThread.FuzzSenderThread(
-                sleepTime, fuzzerSendPipe, self.CANData, self.loggerName)
+                sleepTime, frameSender, self.CANData, self.loggerName)
             self.fuzzSenderThread.start()
             self.logger.info(Strings.fuzzerTabFuzzerThreadStarted)
 
@@ -192,6 +196,7 @@ class FuzzerTab(AbstractTab):
             # Stop the fuzzer
             if self.fuzzSenderThread is not None:
                 self.fuzzSenderThread.disable()
+                self.fuzzSenderThread.wait()
                 self.fuzzSenderThread.quit()
 
             # Stop the ItemAdder
@@ -200,6 +205,13 @@ class FuzzerTab(AbstractTab):
             self.itemAdderThread.quit()
             self.logger.debug(Strings.itemAdderThreadTerminated)
 
+            droppedCount = self.frameReceiver.getDroppedCount()
+            if droppedCount > 0:
+                self.logger.warn(Strings.framesDropped + " " +
+                                 str(droppedCount))
+            self.frameReceiver.close()
+            self.frameReceiver = None
+
             self.active = False
             self.CANData.active = False
             self.buttonFuzzerInterfaceSettings.setEnabled(True)
@@ -264,6 +276,8 @@ class FuzzerTab(AbstractTab):
 
     def prepareUI(self):
         AbstractTab.prepareUI(self)
+        # Rows are added to the GUI in batches to stay responsive at high packet rates
+        self.packetTableModel.setQueuedInserts(True)
         self.lineEditFuzzerTabIDMask.setPlaceholderText("X" * 8)
         self.lineEditFuzzerTabDataMask.setPlaceholderText("X" * 16)
 
@@ -294,6 +308,14 @@ class FuzzerTab(AbstractTab):
         # Also update the label
         self.labelFuzzerCountValue.setText(str(len(self.rawData)))
 
+    def addRecords(self, records):
+        """
+        Override the parents class method to update the counter label
+        """
+
+        AbstractTab.addRecords(self, records)
+        self.labelFuzzerCountValue.setText(str(len(self.rawData)))
+
     def clear(self, returnOldPackets=False):
         """
         Clear the currently displayed data on the GUI and in the rawData list
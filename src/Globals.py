@@ -41,6 +41,10 @@ project = None
 #: Value: Description
 knownPackets = {}
 
+#: Compiled version of ``knownPackets`` (see :class:`~src.KnownPacketMatcher.KnownPacketMatcher`).
+#: This is rebuilt whenever ``knownPackets`` changes
+knownPacketMatcher = None
+
 # Objects to manage the instance of the tabs
 fuzzerTabInstance = None
 comparerTabInstance = None
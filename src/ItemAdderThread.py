@@ -22,79 +22,116 @@ Created on May 18, 2017
 """
 
 from PySide import QtCore
-import can
+import math
 
 
 class ItemAdderThread(QtCore.QThread):
     """
-    This thread receives data from a process and
+    This thread receives batches of frames from a process and
     emits a signal which causes the main thread to add the packets
     to the table.
+    If ``emitRecords`` is True, the frame records are emitted as they are, so tabs that use a
+    :class:`~src.PacketStore.PacketStore` can store them without formatting and parsing any strings.
     """
 
     #: Emit a signal to the main thread when items are ready to be added
-    #: Parameters: valueList
-    appendRow = QtCore.Signal(list)
-
-    def __init__(self, receivePipe, tableModel, rawData, useTimestamp=True):
+    #: Parameters: list of valueLists
+    appendRows = QtCore.Signal(list)
+
+    #: Emit a signal to the main thread when frames are ready to be added
+    #: Parameters: list of frame records
+    appendRecords = QtCore.Signal(list)
+
+    def __init__(self,
+                 frameReceiver,
+                 tableModel,
+                 rawData,
+                 useTimestamp=True,
+                 emitRecords=False):
         # Call the superclass constructor
         QtCore.QThread.__init__(self)
         # Attributes to manage the sniffer process
-        self.receivePipe = receivePipe
+        self.frameReceiver = frameReceiver
         self.tableModel = tableModel
         self.useTimestamp = useTimestamp
         self.rawData = rawData
+        self.emitRecords = emitRecords
         self.enabled = True
 
-    def frameToRow(self, frame):
+    def frameToRow(self, record):
         """
-        Converts a can.Message object to a raw value list. This list will be emitted using the signal
-        ``appendRow`` along with the table data and rawData list.
+        Converts a frame record (see :class:`~src.FrameBatch.FrameBatch`) to a raw value list.
 
-        :param frame: can.Message CAN frame
+        :param record: The frame record
+        :return: The raw value list
         """
 
+        timestamp, arbitrationID, flags, dlc, data = record
+
         # Extract the data to be displayed
-        id = str(hex(frame.arbitration_id)).replace("0x", "").upper()
+        id = "%X" % arbitrationID
 
         if len(id) <= 3:
             neededLength = 3
         else:
             neededLength = 8
 
-        while len(id) < neededLength:
-            id = "0" + id
+        id = id.zfill(neededLength)
 
-        # cut "0x" and always use an additional leading zero if needed
-        data = "".join(hex(value)[2:].zfill(2) for value in frame.data).upper()
-        length = frame.dlc
-        timestamp = str(frame.timestamp) if frame.timestamp is not None else ""
+        # Always use an additional leading zero if needed
+        data = data.hex().upper()
 
-        values = [id, data, length]
+        values = [id, data, dlc]
         if self.useTimestamp:
-            values.append(timestamp)
+            values.append(str(timestamp))
+
+        return values
+
+    def emitBatch(self, records):
+        """
+        Emit a batch of frames using ``appendRecords`` or, if ``emitRecords`` is False,
+        as raw value lists using ``appendRows``.
+
+        :param records: List of frame records
+        """
+
+        if not self.emitRecords:
+            self.appendRows.emit(
+                [self.frameToRow(record) for record in records])
+            return
 
-        self.appendRow.emit(values)
+        if not self.useTimestamp:
+            records = [(math.nan, ) + record[1:] for record in records]
+        self.appendRecords.emit(records)
 
     def disable(self):
         """
         This sets the enabled flag to False which causes the infinite loop in :func:`run` to exit.
+        The thread is woken up immediately if it's waiting for frames.
         """
 
         self.enabled = False
+        self.frameReceiver.interrupt()
 
     def run(self):
         """
-        As long as the thread is enabled: Receive a frame from the pipe and pass it to :func:`frameToRow`.
+        As long as the thread is enabled: Receive a batch of frames from the frame receiver (see
+        :class:`~src.FrameTransport.FrameTransport`) and emit the whole batch using :func:`emitBatch`.
         """
 
         while self.enabled:
-            frame = None
             try:
-                # Receive data from a process via a pipe
-                if self.receivePipe.poll(1):
-                    frame = self.receivePipe.recv()
+                # Receive data from a process or thread, disable() wakes this up
+                records = self.frameReceiver.receiveRecords(None)
             except EOFError:
                 continue
-            if frame is not None:
-                self.frameToRow(frame)
+            if len(records) > 0:
+                self.emitBatch(records)
+
+        # Also add the frames that have been sent right before the producer stopped
+        try:
+            records = self.frameReceiver.receiveRecords(0)
+        except EOFError:
+            return
+        if len(records) > 0:
+            self.emitBatch(records)
@@ -73,6 +73,20 @@ class KnownPacket():
 
         """
 
+        return KnownPacket.fromDict(json.loads(importJSON))
+
+    @staticmethod
+    def fromDict(values):
+        """
+        This class method creates a KnownPacket object using a dictionary of attribute values,
+        e.g. a record of a :class:`~src.ProjectExport.ProjectExport` file.
+
+        :param values: The dictionary containing the object data
+
+        :returns:  A KnownPacket object with the values set accordingly
+
+        """
+
         knownPacket = KnownPacket(None, None, None, None, None)
-        knownPacket.__dict__ = json.loads(importJSON)
+        knownPacket.__dict__ = values
         return knownPacket
@@ -0,0 +1,170 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+
+class KnownPacketMatcher():
+    """
+    Finds the descriptions of known packets for frames. The matcher is built once from ``Globals.knownPackets``
+    whenever the known packets change. Rules are keyed on the integer ID, so frames with unknown IDs
+    are rejected with a single dictionary lookup and no strings have to be built.
+
+    The data of a known packet can be:
+
+     - A hex string: The payload must be equal, e.g. ``0011AABB``
+     - ``*``: Any payload matches
+     - A hex string ending with ``*``: The payload must start with these bytes, e.g. ``0011*``
+     - A hex string with ``?`` nibbles: These nibbles are ignored, e.g. ``00??AABB``. This can be combined
+       with a trailing ``*``
+
+    Exact payloads take precedence over masked ones, which take precedence over ``*``.
+    Masked payloads with more fixed nibbles are checked first.
+    """
+
+    def __init__(self, knownPackets):
+        """
+        Compile the rules.
+
+        :param knownPackets: Dictionary as in ``Globals.knownPackets``: Key: ``CANID#data``, value: description
+        """
+
+        #: ID --> (dictionary payload --> description, list of masked payload rules, wildcard description)
+        self.rules = {}
+
+        patternLists = {}
+        for packetIndex, description in knownPackets.items():
+            CANID, _, data = packetIndex.partition("#")
+            try:
+                arbitrationID = int(CANID, 16)
+            except ValueError:
+                continue
+
+            rule = self.rules.setdefault(arbitrationID, ({}, [], ""))
+            data = data.upper()
+            if data == "*":
+                self.rules[arbitrationID] = (rule[0], rule[1], description)
+            elif "*" in data[:-1] or "?" in data or data.endswith("*"):
+                pattern = KnownPacketMatcher.compilePattern(data, description)
+                if pattern is not None:
+                    patternLists.setdefault(arbitrationID, []).append(pattern)
+            else:
+                try:
+                    rule[0][bytes.fromhex(data)] = description
+                except ValueError:
+                    continue
+
+        # More fixed nibbles --> more specific
+        for arbitrationID, patterns in patternLists.items():
+            patterns.sort(key=lambda pattern: bin(pattern[2]).count("1"),
+                          reverse=True)
+            self.rules[arbitrationID][1].extend(patterns)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @staticmethod
+    def compilePattern(data, description):
+        """
+        Compile a masked payload rule.
+
+        :param data: The payload as hex string with ``?`` nibbles and an optional trailing ``*``
+        :param description: The description of the rule
+        :return: A tuple (length in bytes, isPrefix, mask, value, description) or None if the payload is invalid
+        """
+
+        isPrefix = data.endswith("*")
+        if isPrefix:
+            data = data[:-1]
+        if len(data) % 2 != 0 or "*" in data:
+            return None
+
+        try:
+            mask = int("0" + "".join("0" if nibble == "?" else "F"
+                                     for nibble in data), 16)
+            value = int("0" + data.replace("?", "0"), 16)
+        except ValueError:
+            return None
+        return (len(data) // 2, isPrefix, mask, value, description)
+
+    def match(self, arbitrationID, data):
+        """
+        Get the description of a frame.
+
+        :param arbitrationID: The ID as integer
+        :param data: The payload as bytes
+        :return: The description if one can be found, else an empty string
+        """
+
+        rule = self.rules.get(arbitrationID)
+        if rule is None:
+            return ""
+
+        exactDescriptions, patterns, wildcardDescription = rule
+        description = exactDescriptions.get(data)
+        if description is not None:
+            return description
+
+        for length, isPrefix, mask, value, description in patterns:
+            if len(data) == length or isPrefix and len(data) > length:
+                if int.from_bytes(data[:length], "big") & mask == value:
+                    return description
+
+        return wildcardDescription
+
+    def getDescription(self, CANID, data):
+        """
+        Get the description of a packet given as strings.
+
+        :param CANID: CAN ID as hex string
+        :param data: Data as hex string
+        :return: The description if one can be found, else an empty string
+        """
+
+        try:
+            arbitrationID = int(CANID, 16)
+        except (TypeError, ValueError):
+            return ""
+
+        rule = self.rules.get(arbitrationID)
+        if rule is None:
+            return ""
+
+        try:
+            payload = bytes.fromhex(data if data is not None else "")
+        except ValueError:
+            return rule[2]
+        return self.match(arbitrationID, payload)
+
+    def labelRecords(self, records):
+        """
+        Get the descriptions of a batch of frame records (see :class:`~src.FrameBatch.FrameBatch`) in one pass.
+
+        :param records: List of frame records
+        :return: List of descriptions, empty strings for unknown frames
+        """
+
+        rules = self.rules
+        match = self.match
+        return [
+            match(record[1], record[4]) if record[1] in rules else ""
+            for record in records
+        ]
@@ -0,0 +1,224 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+import mmap
+import os
+
+import Toolbox
+
+
+class LogView(Sequence):
+    """
+    A read-only packet list backed by a memory-mapped log file in SocketCAN format
+    (see :class:`~src.SocketCANLog.SocketCANLog`). It can be used as ``dataList`` of a
+    :class:`~src.PacketTableModel.PacketTableModel` to browse huge logs without loading them.
+
+    Only a sparse index is kept in memory: The file is split into blocks of about ``blockSize`` bytes
+    that end at line boundaries, and the offset and the number of the first line of every block are stored.
+    The index is built step by step using :func:`indexMore`, so lines can be displayed
+    before the whole file has been indexed. Rows are parsed from the mapping on access,
+    a few parsed blocks are cached for scrolling.
+    """
+
+    # Column indexes of the raw value lists
+    IDColIndex = 0
+    dataColIndex = 1
+    lengthColIndex = 2
+    timestampColIndex = 3
+    descriptionColIndex = 4
+
+    #: Approximate amount of bytes per index block
+    blockSize = 64 * 1024
+
+    #: Amount of bytes to index per call of :func:`indexMore`
+    indexStepSize = 16 * 1024 * 1024
+
+    #: Amount of parsed blocks to keep
+    blockCacheSize = 8
+
+    def __init__(self, filePath):
+        """
+        Map the file. No data is read yet.
+
+        :param filePath: The path of the log file
+        """
+
+        self.filePath = filePath
+        self.logFile = open(filePath, "rb")
+        self.fileSize = os.fstat(self.logFile.fileno()).st_size
+        # Empty files can't be mapped
+        self.mapping = None
+        if self.fileSize > 0:
+            self.mapping = mmap.mmap(
+                self.logFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        #: Offset of the first byte of every block
+        self.blockOffsets = array("Q")
+        #: Number of the first line of every block
+        self.blockFirstLines = array("Q")
+        self.indexedOffset = 0
+        self.lineCount = 0
+
+        self.blockCache = OrderedDict()
+
+    def __len__(self):
+        return self.lineCount
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += self.lineCount
+        if index < 0 or index >= self.lineCount:
+            raise IndexError("LogView index out of range")
+
+        blockIndex = bisect_right(self.blockFirstLines, index) - 1
+        row = self.getBlockRows(blockIndex)[index -
+                                            self.blockFirstLines[blockIndex]]
+
+        # Descriptions are resolved on access, so new known packets are displayed, too
+        return row + [
+            Toolbox.Toolbox.getKnownPacketDescription(
+                row[LogView.IDColIndex], row[LogView.dataColIndex])
+        ]
+
+    def isComplete(self):
+        """
+        :return: A boolean value indicating whether the whole file has been indexed
+        """
+
+        return self.indexedOffset >= self.fileSize
+
+    def indexMore(self, byteCount=None):
+        """
+        Extend the index by the next blocks of the file.
+
+        :param byteCount: Optional: The approximate amount of bytes to index. Default: ``indexStepSize``
+        :return: The amount of newly indexed lines
+        """
+
+        if byteCount is None:
+            byteCount = LogView.indexStepSize
+
+        oldLineCount = self.lineCount
+        if self.isComplete():
+            return 0
+
+        # The file is read instead of the mapping, so indexed pages don't stay in memory
+        self.logFile.seek(self.indexedOffset)
+        data = self.logFile.read(byteCount)
+        if not data.endswith(b"\n"):
+            data += self.logFile.readline()
+
+        blockStart = 0
+        while blockStart < len(data):
+            # Let the block end after the first newline at or behind the desired size
+            newlineIndex = data.find(b"\n", blockStart + LogView.blockSize - 1)
+            blockEnd = len(data) if newlineIndex == -1 else newlineIndex + 1
+
+            blockLineCount = data.count(b"\n", blockStart, blockEnd)
+            # The last line doesn't need a newline
+            if data[blockEnd - 1:blockEnd] != b"\n":
+                blockLineCount += 1
+
+            self.blockOffsets.append(self.indexedOffset + blockStart)
+            self.blockFirstLines.append(self.lineCount)
+            self.lineCount += blockLineCount
+            blockStart = blockEnd
+
+        self.indexedOffset += len(data)
+        return self.lineCount - oldLineCount
+
+    def getBlockRows(self, blockIndex):
+        """
+        Get the parsed lines of a block using the block cache.
+
+        :param blockIndex: The index of the block
+        :return: List of raw value lists (ID, data, length, timestamp) without descriptions
+        """
+
+        rows = self.blockCache.get(blockIndex)
+        if rows is not None:
+            self.blockCache.move_to_end(blockIndex)
+            return rows
+
+        start = self.blockOffsets[blockIndex]
+        if blockIndex + 1 < len(self.blockOffsets):
+            end = self.blockOffsets[blockIndex + 1]
+        else:
+            end = self.indexedOffset
+
+        lines = self.mapping[start:end].decode("ascii", "replace").split("\n")
+        # The block ends with a newline --> no line follows it
+        if lines[-1] == "":
+            lines.pop()
+        rows = [LogView.lineToRow(line) for line in lines]
+
+        self.blockCache[blockIndex] = rows
+        if len(self.blockCache) > LogView.blockCacheSize:
+            self.blockCache.popitem(last=False)
+        return rows
+
+    @staticmethod
+    def lineToRow(line):
+        """
+        Convert a line in SocketCAN format to a raw value list (ID, data, length, timestamp).
+        Invalid lines are displayed as empty rows, so the row numbers match the line numbers.
+
+        :param line: The line as string
+        :return: The raw value list
+        """
+
+        try:
+            timestamp, _, frame = line.split()
+        except ValueError:
+            return ["", "", "", ""]
+
+        CANID, _, data = frame.partition("#")
+        # CAN FD line: remove the flag that's present after "##"
+        if data.startswith("#"):
+            data = data[2:]
+        # Remote frames don't have a payload
+        if data.startswith("R"):
+            length = "0"
+        elif len(data) % 2 == 0:
+            length = str(len(data) // 2)
+        else:
+            length = "INVALID"
+        return [CANID, data, length, timestamp.strip("()")]
+
+    def close(self):
+        """
+        Unmap and close the file.
+        """
+
+        self.blockCache.clear()
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        self.logFile.close()
@@ -21,6 +21,8 @@ Created on May 22, 2017
 @author: pschmied
 """
 
+import time
+
 from PySide import QtGui
 from PySide import QtCore
 from sqlite3 import IntegrityError
@@ -31,11 +33,15 @@ from CANData import CANData, SocketCANPacket
 from PacketSet import PacketSet
 import Packet
 from KnownPacket import KnownPacket
+from KnownPacketMatcher import KnownPacketMatcher
 from Project import Project
 import Database
 import MainTab
 import Toolbox
 from AbstractTab import AbstractTab
+from ProjectExport import ProjectExport
+from PacketArchive import PacketArchive
+from PacketTableModel import PacketTableModel
 
 
 class ManagerTab(AbstractTab):
@@ -43,6 +49,11 @@ class ManagerTab(AbstractTab):
     This class handles the logic of the manager tab
     """
 
+    #: Amount of packets after which the progress of an import or export is updated
+    transferProgressInterval = 10000
+    #: Amount of imported packets that are saved using one transaction
+    importChunkSize = 50000
+
     def __init__(self, tabWidget):
         AbstractTab.__init__(self, tabWidget, Strings.managerTabLoggerName,
                              [2, 3, 4], Strings.managerTabPacketTableViewName)
@@ -53,6 +64,8 @@ class ManagerTab(AbstractTab):
         self.dumpsRowIDs = []
         self.dumpsCurrentlyDisplayedPacketSet = None
         self.dumpsDeletedPacketIDs = []
+        #: Database ID of the last packet loaded from the displayed PacketSet
+        self.dumpsLastLoadedPacketID = 0
 
         #: Disallow copying while loading data
         self.loadingData = False
@@ -397,6 +410,7 @@ class ManagerTab(AbstractTab):
         """
 
         if rawPackets is None:
+            self.packetTableModel.fetchAll()
             rawPackets = self.rawData
 
         if len(rawPackets) == 0:
@@ -487,7 +501,6 @@ class ManagerTab(AbstractTab):
         if selectedPacketSet is None:
             return
 
-        self.dumpsDeletedPacketIDs = []
         self.loadingData = True
 
         self.logger.info(Strings.managerTabLoadingDumpDataStart)
@@ -500,41 +513,18 @@ class ManagerTab(AbstractTab):
         self.buttonManagerDumpsSaveToFile.setEnabled(False)
         self.buttonManagerClearDump.setEnabled(False)
 
+        # Switching the dump doesn't delete the packets of the previous one
+        self.dumpsCurrentlyDisplayedPacketSet = None
         self.clear()
+        self.dumpsDeletedPacketIDs = []
 
         self.logger.debug(Strings.managerTabGettingPacketData)
-        rawPacketsFromDB = Globals.db.getPacketsOfPacketSet(
-            selectedPacketSet, raw=True)
-
-        if rawPacketsFromDB is None:
-            self.logger.warn(Strings.managerTabNoPacketsFromPacketSet)
-            return
-
-        # We don't use ID and PacketSetID for the tables --> filter
-        rawPacketsFiltered = [subList[2:5] for subList in rawPacketsFromDB]
-
-        # Use a batch import --> Performance over 9000
-        packetDescriptions = self.packetTableModel.appendRows(
-            rawPacketsFiltered, resolveDescriptions=True)
-
-        assert len(packetDescriptions) == len(
-            rawPacketsFiltered), "Lengths must be equal"
-        assert (len(rawPacketsFromDB) == len(rawPacketsFiltered)
-                ), "Lengths must be equal"
-
-        for i in range(len(rawPacketsFromDB)):
-
-            # Check the ID
-            assert rawPacketsFromDB[i][0] is not None
-
-            # To keep track of the association
-            # --> Allows updating the table via GUI
-            self.dumpsRowIDs.append((i, rawPacketsFromDB[i][0]))
-
-            # Also update rawData
-            self.rawData.append(rawPacketsFiltered[i])
 
+        # Packets are loaded lazily while scrolling (see fetchDumpRows)
         self.dumpsCurrentlyDisplayedPacketSet = selectedPacketSet
+        self.dumpsLastLoadedPacketID = 0
+        self.packetTableModel.setRowSource(self.fetchDumpRows)
+        self.packetTableModel.fetchMore()
 
         self.comboBoxManagerDumps.setEnabled(True)
         self.buttonManagerDumpsAddPacket.setEnabled(True)
@@ -546,6 +536,37 @@ class ManagerTab(AbstractTab):
         self.loadingData = False
         self.logger.info(Strings.managerTabLoadingDumpDataFinished)
 
+    def fetchDumpRows(self, count):
+        """
+        Row source of the packet table model (see :func:`~src.PacketTableModel.PacketTableModel.setRowSource`):
+        Load the next packets of the displayed PacketSet from the database. This also updates ``rawData``
+        and ``dumpsRowIDs``.
+
+        :param count: The maximum amount of packets to load
+        :return: The packets as raw data lists
+        """
+
+        rawPacketsFromDB = Globals.db.getPacketsOfPacketSetPage(
+            self.dumpsCurrentlyDisplayedPacketSet, self.dumpsLastLoadedPacketID,
+            count)
+
+        # We don't use ID and PacketSetID for the tables --> filter
+        rawPacketsFiltered = []
+        for rawPacketFromDB in rawPacketsFromDB:
+            # To keep track of the association
+            # --> Allows updating the table via GUI
+            self.dumpsRowIDs.append((len(self.dumpsRowIDs),
+                                     rawPacketFromDB[0]))
+            rawPacketFiltered = rawPacketFromDB[2:5]
+            rawPacketsFiltered.append(rawPacketFiltered)
+            # Also update rawData
+            self.rawData.append(rawPacketFiltered)
+
+        if len(rawPacketsFromDB) > 0:
+            self.dumpsLastLoadedPacketID = rawPacketsFromDB[-1][0]
+
+        return rawPacketsFiltered
+
     def updateDump(self):
         """
         Users can change the data displayed in the GUI table. This method allows the changed data
@@ -599,6 +620,7 @@ class ManagerTab(AbstractTab):
         Clear the GUI table displaying PacketSets along with data lists.
         """
 
+        notLoadedPackets = self.packetTableModel.canFetchMore()
         AbstractTab.clear(self)
         self.dumpsDeletedPacketIDs.clear()
 
@@ -606,6 +628,13 @@ class ManagerTab(AbstractTab):
             # Append the ID of every deleted row
             self.dumpsDeletedPacketIDs.append(rowIDTuple[1])
 
+        # Packets that haven't been loaded yet are deleted, too
+        if notLoadedPackets and self.dumpsCurrentlyDisplayedPacketSet is not None:
+            self.dumpsDeletedPacketIDs.extend(
+                Globals.db.getPacketIDsOfPacketSet(
+                    self.dumpsCurrentlyDisplayedPacketSet,
+                    self.dumpsLastLoadedPacketID))
+
         self.dumpsRowIDs = []
         self.dumpsCurrentlyDisplayedPacketSetID = -1
 
@@ -617,19 +646,21 @@ class ManagerTab(AbstractTab):
         """
 
         removedRows = AbstractTab.removeSelectedPackets(self)
+        if not removedRows:
+            return
 
-        # Also remove the rows from the dumpsRowIDs list
-        # Reverse the delete order --> no need to worry about shifting indexes <:
-        for row in sorted(removedRows, reverse=True):
-            # Add the ID of the deleted packet as Value of they Key (Rownumber)
-            try:
+        # Add the IDs of the deleted packets
+        for row in removedRows:
+            if row < len(self.dumpsRowIDs):
                 self.dumpsDeletedPacketIDs.append(self.dumpsRowIDs[row][1])
-                del self.dumpsRowIDs[row]
-            except IndexError:
+            else:
                 self.logger.debug(
                     Strings.managerTabDebuggingDumpsRowIDsIndexError +
                     str(row))
 
+        # Also remove the rows from the dumpsRowIDs list
+        PacketTableModel.removeIndexes(self.dumpsRowIDs, removedRows)
+
     def populateProjects(self, keepCurrentIndex=False):
         """
         Populate the project ComboBoxes (delete, Edit, export project).
@@ -675,6 +706,7 @@ class ManagerTab(AbstractTab):
         """
 
         Globals.knownPackets = {}
+        Globals.knownPacketMatcher = None
 
         if Globals.project is None:
             return
@@ -696,6 +728,8 @@ class ManagerTab(AbstractTab):
 
             Globals.knownPackets[strIdx] = knownPacket.description
 
+        Globals.knownPacketMatcher = KnownPacketMatcher(Globals.knownPackets)
+
     def deleteProject(self):
         """
         Delete a project along with associated data. This also updates the project ComboBoxes.
@@ -818,6 +852,7 @@ class ManagerTab(AbstractTab):
         # Inser the new value
         newStrIdx = Toolbox.Toolbox.getPacketDictIndex(newCANID, newData)
         Globals.knownPackets[newStrIdx] = newDescription
+        Globals.knownPacketMatcher = KnownPacketMatcher(Globals.knownPackets)
 
         self.logger.info(Strings.managerTabKnownPacketUpdated)
 
@@ -825,8 +860,9 @@ class ManagerTab(AbstractTab):
 
     def exportProject(self):
         """
-        Export a project as JSON string to a textfile.
-        The ``toJSON()`` method is called for every object to be exported.
+        Export a project to a file (see :class:`~src.ProjectExport.ProjectExport`).
+        Packets are streamed from the database to the file, so the memory usage doesn't
+        depend on the size of the project. Files ending in ``.gz`` are compressed.
         """
 
         selectedProject = self.comboBoxProjectDelete.itemData(
@@ -844,77 +880,73 @@ class ManagerTab(AbstractTab):
             progressDialog.open()
             try:
                 # Get the objects that have to be exported
-                # Get PacketSets
                 packetSets = Globals.db.getPacketSets(project=selectedProject)
-
-                # Get Packets
-                packetLists = []
-                for packetSet in packetSets:
-                    QtCore.QCoreApplication.processEvents()
-                    packetLists.append(
-                        Globals.db.getPacketsOfPacketSet(packetSet))
-                # Make a flat list out of the list of lists
-                packets = sum(packetLists, [])
-
-
-                # Get known packets
                 knownPackets = Globals.db.getKnownPackets(
                     project=selectedProject)
 
                 # Do the actual work
                 # Open or create
-                with open(filePath, "w+") as exportFile:
-
-                    # Write the header first
-                    exportFile.write(Strings.projectExportHeader)
-                    exportFile.write(Strings.projectExportEndSectionMarker)
+                with ProjectExport.open(filePath, "w") as exportFile:
+                    projectExport = ProjectExport(exportFile)
+                    projectExport.writeHeader()
+                    projectExport.writeObject(ProjectExport.recordTypeProject,
+                                              selectedProject)
 
-                    # Write Project data
-                    exportFile.write(Strings.projectExportProjectHeader + "\n")
-                    jsonProject = selectedProject.toJSON()
-                    exportFile.write(jsonProject)
-                    exportFile.write(Strings.projectExportEndSectionMarker)
+                    for packetSet in packetSets:
+                        projectExport.writeObject(
+                            ProjectExport.recordTypePacketSet, packetSet)
 
-                    # Write the PacketSet data
-                    exportFile.write(Strings.projectExportPacketSetHeader +
-                                     "\n")
+                    # Stream the packets from the database --> Only one chunk is kept in memory
+                    startTime = time.monotonic()
+                    packetCount = 0
                     for packetSet in packetSets:
-                        QtCore.QCoreApplication.processEvents()
-                        jsonPacketSet = packetSet.toJSON()
-                        exportFile.write(jsonPacketSet +
-                                         Strings.projectExportEndElementMarker)
-                    exportFile.write(Strings.projectExportEndSectionMarker)
-
-                    # Write the Packet data
-                    exportFile.write(Strings.projectExportPacketHeader + "\n")
-                    for packet in packets:
-                        QtCore.QCoreApplication.processEvents()
-                        jsonPacket = packet.toJSON()
-                        exportFile.write(jsonPacket +
-                                         Strings.projectExportEndElementMarker)
-                    exportFile.write(Strings.projectExportEndSectionMarker)
-
-                    # Write the KnownPacket data
-                    exportFile.write(Strings.projectExportKnownPacketHeader +
-                                     "\n")
+                        for rawPacket in Globals.db.iterPacketsOfPacketSet(
+                                packetSet, raw=True):
+                            projectExport.writePacket(rawPacket)
+                            packetCount += 1
+                            if packetCount % ManagerTab.transferProgressInterval == 0:
+                                self.updateTransferProgress(
+                                    progressDialog,
+                                    Strings.managerTabExportingProject,
+                                    packetCount, startTime)
+
                     for knownPacket in knownPackets:
-                        QtCore.QCoreApplication.processEvents()
-                        jsonKnownPacket = knownPacket.toJSON()
-                        exportFile.write(jsonKnownPacket +
-                                         Strings.projectExportEndElementMarker)
-                    exportFile.write(Strings.projectExportEndSectionMarker)
+                        projectExport.writeObject(
+                            ProjectExport.recordTypeKnownPacket, knownPacket)
 
                 self.logger.info(Strings.managerTabProjectExported)
+                self.logger.info(Strings.dataWritten + " " + str(packetCount))
 
             finally:
                 progressDialog.close()
         else:
             self.logger.info(Strings.dataNotWritten)
 
+    def updateTransferProgress(self, progressDialog, text, packetCount,
+                               startTime):
+        """
+        Display the amount of transferred packets and the packet rate while importing or exporting.
+
+        :param progressDialog: The working dialog to update
+        :param text: The text to display above the progress
+        :param packetCount: The amount of packets transferred so far
+        :param startTime: ``time.monotonic()`` value of the start of the transfer
+        """
+
+        elapsedTime = max(time.monotonic() - startTime, 0.001)
+        progressDialog.setLabelText(
+            text + "\n" + str(packetCount) + " " +
+            Strings.managerTabTransferredPackets + " (" +
+            str(int(packetCount / elapsedTime)) + " " +
+            Strings.managerTabPacketsPerSecond + ")")
+        QtCore.QCoreApplication.processEvents()
+
     def importProject(self):
         """
-        Import a project from a JSON file.
-        The ``fromJSON()`` method of every class is called to re-create objects.
+        Import a project from a file (see :class:`~src.ProjectExport.ProjectExport`).
+        The file is read as a stream and packets are saved in chunks, so the memory usage doesn't
+        depend on the size of the project. Files of older versions are imported
+        using :func:`importLegacyProject`.
         """
 
         # A tuple is returned --> only use the first element which represents the absolute file path
@@ -922,6 +954,143 @@ class ManagerTab(AbstractTab):
                                                      Strings.openDialogTitle,
                                                      QtCore.QDir.homePath())[0]
 
+        if not filePath:
+            self.logger.info(Strings.managerTabProjectNoFileGiven)
+            return
+
+        if not ProjectExport.isExportFile(filePath):
+            self.importLegacyProject(filePath)
+            return
+
+        progressDialog = Toolbox.Toolbox.getWorkingDialog(
+            Strings.managerTabImportingProject)
+        progressDialog.open()
+        try:
+            importedProject = None
+            # Maps the exported PacketSet IDs to the new IDs
+            packetSetIDs = {}
+            # Packets of the same PacketSet are saved in chunks
+            packetChunk = []
+            packetChunkPacketSetID = None
+            startTime = time.monotonic()
+            packetCount = 0
+
+            with ProjectExport.open(filePath, "r") as importFile:
+                for recordType, record in ProjectExport(
+                        importFile).readRecords():
+
+                    if recordType == ProjectExport.recordTypeProject:
+                        importedProject = Project.fromDict(record)
+                        if not self.saveImportedProject(importedProject):
+                            return
+
+                    # The project is always the first record
+                    elif importedProject is None:
+                        break
+
+                    elif recordType == ProjectExport.recordTypePacket:
+                        packetSetID, CANID, data, timestamp, iface = \
+                            ProjectExport.packetValuesFromRecord(record)
+                        newPacketSetID = packetSetIDs.get(packetSetID)
+                        if newPacketSetID is None:
+                            continue
+
+                        if newPacketSetID != packetChunkPacketSetID or len(
+                                packetChunk) >= ManagerTab.importChunkSize:
+                            self.saveImportedPackets(packetChunkPacketSetID,
+                                                     packetChunk)
+                            packetChunk = []
+                            packetChunkPacketSetID = newPacketSetID
+
+                        packetChunk.append((CANID, data, timestamp, iface))
+                        packetCount += 1
+                        if packetCount % ManagerTab.transferProgressInterval == 0:
+                            self.updateTransferProgress(
+                                progressDialog,
+                                Strings.managerTabImportingProject,
+                                packetCount, startTime)
+
+                    elif recordType == ProjectExport.recordTypePacketSet:
+                        packetSet = PacketSet.fromDict(record)
+                        packetSetIDs[packetSet.id] = \
+                            Globals.db.savePacketSetWithData(
+                                packetSet.name, project=importedProject)
+
+                    elif recordType == ProjectExport.recordTypeKnownPacket:
+                        knownPacket = KnownPacket.fromDict(record)
+                        knownPacket.projectID = importedProject.id
+                        Globals.db.saveKnownPacket(knownPacket)
+
+            self.saveImportedPackets(packetChunkPacketSetID, packetChunk)
+
+            if importedProject is None:
+                self.logger.warn(Strings.managerTabNoProjectFound)
+                return
+
+            self.logger.info(Strings.dataWritten + " " + str(packetCount))
+            self.logger.info(Strings.managerTabObjectsWritten)
+
+            # Populate all GUI elements accordingly
+            MainTab.MainTab.populateProjects()
+            self.populateProjects()
+            self.populatePacketSets()
+            self.populateKnownPackets()
+
+        finally:
+            progressDialog.close()
+
+    def saveImportedPackets(self, packetSetID, packetValues):
+        """
+        Save a chunk of imported packets using one transaction.
+
+        :param packetSetID: The database ID of the PacketSet the packets belong to
+        :param packetValues: List of ``(CANID, data, timestamp, interface)`` tuples
+        """
+
+        if len(packetValues) == 0:
+            return
+        Globals.db.savePacketsBatch(packetSetID, packetValues=packetValues)
+
+    def saveImportedProject(self, importedProject):
+        """
+        Save an imported project to the database and set its new ID.
+        If there's a name collision, the user will be prompted for a new and unique name.
+
+        :param importedProject: The imported Project object
+        :return: A boolean value indicating whether the project has been saved
+        """
+
+        # We don't know how many attempts the user needs to find a new name for a
+        # project name collision
+        while True:
+            try:
+                importedProject.id = Globals.db.saveProject(importedProject)
+                return True
+
+            # Theres already a project with the same name --> get new name
+            except IntegrityError:
+                # Get the name from the tuple returned by the dialog
+                newProjectName = QtGui.QInputDialog.getText(
+                    self.packetTableView,
+                    Strings.managerTabDBIntegrityNewProjectNameMessageBoxTitle,
+                    Strings.managerTabDBIntegrityNewProjectNameMessageBoxText,
+                )[0]
+
+                if len(newProjectName) == 0:
+                    self.logger.error(Strings.managerTabInvalidProjectName)
+                    return False
+
+                # Try it again with a new name
+                importedProject.name = newProjectName
+
+    def importLegacyProject(self, filePath):
+        """
+        Import a project from a JSON file that has been exported by older versions.
+        The ``fromJSON()`` method of every class is called to re-create objects.
+
+        :param filePath: The path of the file to import
+        """
+
         importedProject = None
         importedPacketSets = []
         importedPackets = []
@@ -993,34 +1162,8 @@ class ManagerTab(AbstractTab):
                     return
 
                 # Objects created, let's save them to the DB with the new project ID
-
-                # We don't know how many attempts the user needs to find a new name for a
-                # project name collision
-                while True:
-                    try:
-                        newProjectID = Globals.db.saveProject(importedProject)
-
-                    # Theres already a project with the same name --> get new name
-                    except IntegrityError:
-                        # Get the name from the tuple returned by the dialog
-                        newProjectName = QtGui.QInputDialog.getText(
-                            self.packetTableView,
-                            Strings.
-                            managerTabDBIntegrityNewProjectNameMessageBoxTitle,
-                            Strings.
-                            managerTabDBIntegrityNewProjectNameMessageBoxText,
-                        )[0]
-
-                        if len(newProjectName) == 0:
-                            self.logger.error(
-                                Strings.managerTabInvalidProjectName)
-                            return
-
-                        else:
-                            # Try it again with a new name
-                            importedProject.name = newProjectName
-                            continue
-                    break
+                if not self.saveImportedProject(importedProject):
+                    return
 
                 # Import the packet sets along with the packets
                 for importedPacketSet in importedPacketSets:
@@ -1037,7 +1180,7 @@ class ManagerTab(AbstractTab):
                 # Import known packets
                 for importedKnownPacket in importedKnownPackets:
                     QtCore.QCoreApplication.processEvents()
-                    importedKnownPacket.projectID = newProjectID
+                    importedKnownPacket.projectID = importedProject.id
                     Globals.db.saveKnownPacket(importedKnownPacket)
 
                 self.logger.info(Strings.managerTabObjectsWritten)
@@ -1058,15 +1201,28 @@ class ManagerTab(AbstractTab):
     def saveToFile(self):
         """
         Save the packets in the GUI table to a file in SocketCAN format.
+        If the file name ends with :attr:`~src.PacketArchive.PacketArchive.fileSuffix`,
+        a packet archive is written instead.
         """
 
         # Convert raw data to SocketCAN format
         socketCANPackets = []
 
+        self.packetTableModel.fetchAll()
         packetsToSave = self.rawData
         if len(packetsToSave) == 0:
             return
 
+        # A tuple is returned --> only use the first element which represents the absolute file path
+        filePath = Toolbox.Toolbox.getSaveFileName(Strings.saveDialogTitle)
+        if not filePath:
+            self.logger.info(Strings.dataNotWritten)
+            return
+
+        if filePath.endswith(PacketArchive.fileSuffix):
+            self.saveArchive(filePath)
+            return
+
         for packet in packetsToSave:
             socketCANPacket = SocketCANPacket(
                 packet[3], Globals.CANData.ifaceName if
@@ -1075,14 +1231,9 @@ class ManagerTab(AbstractTab):
             socketCANPackets.append(socketCANPacket)
             self.logger.debug(Strings.snifferTabElementSocketCANConvertOK)
 
-        # A tuple is returned --> only use the first element which represents the absolute file path
-        filePath = Toolbox.Toolbox.getSaveFileName(Strings.saveDialogTitle)
-        if filePath:
-            CANData.writeCANFile(filePath, socketCANPackets)
-            self.logger.info(Strings.dataWritten + " " +
-                             str(len(socketCANPackets)))
-        else:
-            self.logger.info(Strings.dataNotWritten)
+        CANData.writeCANFile(filePath, socketCANPackets)
+        self.logger.info(Strings.dataWritten + " " +
+                         str(len(socketCANPackets)))
 
     def handlePaste(self):
         """
@@ -0,0 +1,316 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+from array import array
+import math
+import mmap
+import struct
+import sys
+import zlib
+
+from FrameBatch import FrameBatch
+
+
+class PacketArchive():
+    """
+    A columnar file format for captured packets. Packets are stored as frame records
+    (see :class:`~src.FrameBatch.FrameBatch`) in row groups. Each row group holds one column per
+    field (ID, timestamp, DLC, flags, data length and payload), and each column is compressed
+    separately. The header of every row group holds statistics (row count, ID and timestamp range),
+    so row groups can be skipped without decompressing them.
+
+    Files are read using ``mmap``: Only the footer and the requested row groups are read from disk.
+
+    File layout: ``magic | row group ... | footer | trailer``. The footer holds the offsets of all
+    row groups, the trailer holds the offset of the footer.
+    """
+
+    magic = b"CANARC01"
+    fileSuffix = ".canarc"
+
+    #: Amount of records per row group
+    rowGroupSize = 65536
+    compressionLevel = 6
+
+    #: Row count, min ID, max ID, min timestamp, max timestamp and the compressed sizes of the columns
+    rowGroupHeader = struct.Struct("<IIIdd6I")
+    #: Offset of the footer and the magic bytes
+    trailer = struct.Struct("<Q8s")
+    footerCount = struct.Struct("<I")
+    footerOffset = struct.Struct("<Q")
+
+    #: Typecodes of the fixed width columns, in file order. The payload column follows them
+    columnTypecodes = ["I", "d", "B", "B", "B"]
+
+    def __init__(self, filePath):
+        """
+        Open an archive for reading and read the statistics of all row groups.
+
+        :param filePath: The path of the archive
+        :raises ValueError: If the file is not a valid archive
+        """
+
+        self.archiveFile = open(filePath, "rb")
+        try:
+            self.buffer = mmap.mmap(
+                self.archiveFile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            self.archiveFile.close()
+            raise ValueError("Not a packet archive")
+
+        try:
+            self.rowGroups = self.readFooter()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError("Not a packet archive")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __len__(self):
+        return sum(rowGroup[1] for rowGroup in self.rowGroups)
+
+    def close(self):
+        self.buffer.close()
+        self.archiveFile.close()
+
+    def readFooter(self):
+        """
+        Read the offsets and the statistics of all row groups.
+
+        :return: List of tuples: (offset, row count, min ID, max ID, min timestamp, max timestamp)
+        """
+
+        buffer = self.buffer
+        if len(buffer) < len(PacketArchive.magic) + PacketArchive.trailer.size or \
+                buffer[:len(PacketArchive.magic)] != PacketArchive.magic:
+            raise ValueError("Invalid magic")
+
+        footerStart, magic = PacketArchive.trailer.unpack_from(
+            buffer, len(buffer) - PacketArchive.trailer.size)
+        if magic != PacketArchive.magic:
+            raise ValueError("Invalid trailer")
+
+        count, = PacketArchive.footerCount.unpack_from(buffer, footerStart)
+        rowGroups = []
+        position = footerStart + PacketArchive.footerCount.size
+        for i in range(count):
+            offset, = PacketArchive.footerOffset.unpack_from(buffer, position)
+            position += PacketArchive.footerOffset.size
+            rowGroups.append((offset, ) + PacketArchive.rowGroupHeader.
+                             unpack_from(buffer, offset)[:5])
+        return rowGroups
+
+    def readRowGroup(self, rowGroupIndex):
+        """
+        Decompress a row group.
+
+        :param rowGroupIndex: The index of the row group
+        :return: List of frame records
+        """
+
+        offset = self.rowGroups[rowGroupIndex][0]
+        header = PacketArchive.rowGroupHeader.unpack_from(self.buffer, offset)
+        columnSizes = header[5:]
+        position = offset + PacketArchive.rowGroupHeader.size
+
+        columns = []
+        for typecode, size in zip(PacketArchive.columnTypecodes,
+                                  columnSizes):
+            column = array(typecode)
+            column.frombytes(
+                zlib.decompress(self.buffer[position:position + size]))
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+            position += size
+        payloads = zlib.decompress(
+            self.buffer[position:position + columnSizes[-1]])
+
+        IDs, timestamps, dlcs, flags, dataLengths = columns
+        records = []
+        payloadOffset = 0
+        for i in range(header[0]):
+            dataLength = dataLengths[i]
+            records.append(
+                (timestamps[i], IDs[i], flags[i], dlcs[i],
+                 payloads[payloadOffset:payloadOffset + dataLength]))
+            payloadOffset += dataLength
+        return records
+
+    def iterRecordGroups(self, minID=None, maxID=None):
+        """
+        Iterate over the records of all row groups that may contain the requested IDs.
+        Row groups are skipped using their statistics. Records are not filtered.
+
+        :param minID: Optional: The smallest requested ID
+        :param maxID: Optional: The greatest requested ID
+        :return: A generator yielding one list of frame records per row group
+        """
+
+        for rowGroupIndex, rowGroup in enumerate(self.rowGroups):
+            if minID is not None and rowGroup[3] < minID:
+                continue
+            if maxID is not None and rowGroup[2] > maxID:
+                continue
+            yield self.readRowGroup(rowGroupIndex)
+
+    @staticmethod
+    def write(filePath, records):
+        """
+        Write frame records to a new archive.
+
+        :param filePath: The path of the archive
+        :param records: Iterable of frame records
+        :return: The amount of written records
+        """
+
+        rowGroupOffsets = []
+        recordCount = 0
+        with open(filePath, "wb") as archiveFile:
+            archiveFile.write(PacketArchive.magic)
+
+            rowGroup = []
+            for record in records:
+                rowGroup.append(record)
+                if len(rowGroup) == PacketArchive.rowGroupSize:
+                    rowGroupOffsets.append(archiveFile.tell())
+                    PacketArchive.writeRowGroup(archiveFile, rowGroup)
+                    recordCount += len(rowGroup)
+                    rowGroup = []
+            if len(rowGroup) > 0:
+                rowGroupOffsets.append(archiveFile.tell())
+                PacketArchive.writeRowGroup(archiveFile, rowGroup)
+                recordCount += len(rowGroup)
+
+            footerStart = archiveFile.tell()
+            archiveFile.write(
+                PacketArchive.footerCount.pack(len(rowGroupOffsets)))
+            for offset in rowGroupOffsets:
+                archiveFile.write(PacketArchive.footerOffset.pack(offset))
+            archiveFile.write(
+                PacketArchive.trailer.pack(footerStart, PacketArchive.magic))
+
+        return recordCount
+
+    @staticmethod
+    def writeRowGroup(archiveFile, records):
+        """
+        Write one row group.
+
+        :param archiveFile: The file object to write to
+        :param records: List of frame records
+        """
+
+        IDs = array("I")
+        timestamps = array("d")
+        dlcs = array("B")
+        flags = array("B")
+        dataLengths = array("B")
+        payloads = []
+        for timestamp, arbitrationID, recordFlags, dlc, data in records:
+            IDs.append(arbitrationID)
+            timestamps.append(timestamp)
+            dlcs.append(dlc)
+            flags.append(recordFlags)
+            dataLengths.append(len(data))
+            payloads.append(data)
+
+        # NaN marks missing timestamps
+        validTimestamps = [
+            timestamp for timestamp in timestamps if not math.isnan(timestamp)
+        ]
+        minTimestamp = min(validTimestamps) if validTimestamps else math.nan
+        maxTimestamp = max(validTimestamps) if validTimestamps else math.nan
+
+        compressedColumns = []
+        for column in [IDs, timestamps, dlcs, flags, dataLengths]:
+            if sys.byteorder == "big":
+                column.byteswap()
+            compressedColumns.append(
+                zlib.compress(column.tobytes(), PacketArchive.compressionLevel))
+        compressedColumns.append(
+            zlib.compress(b"".join(payloads), PacketArchive.compressionLevel))
+
+        archiveFile.write(
+            PacketArchive.rowGroupHeader.pack(
+                len(records), min(IDs), max(IDs), minTimestamp, maxTimestamp,
+                *[len(column) for column in compressedColumns]))
+        for column in compressedColumns:
+            archiveFile.write(column)
+
+    @staticmethod
+    def rowToRecord(row):
+        """
+        Convert a raw value list (ID, data, length, timestamp, ...) to a frame record.
+
+        :param row: The raw value list
+        :return: The frame record or None if the row doesn't contain a valid ID and payload
+        """
+
+        try:
+            CANID = row[0]
+            arbitrationID = int(CANID, 16)
+            data = bytes.fromhex(row[1])
+        except (IndexError, TypeError, ValueError):
+            return None
+
+        # Missing or invalid timestamps are stored as NaN
+        try:
+            timestamp = float(row[3])
+        except (IndexError, TypeError, ValueError):
+            timestamp = math.nan
+
+        if arbitrationID > 0x1FFFFFFF or len(data) > 64:
+            return None
+
+        flags = 0
+        if len(CANID) > 3 or arbitrationID > 0x7FF:
+            flags |= FrameBatch.FLAG_EXTENDED
+        if len(data) > 8:
+            flags |= FrameBatch.FLAG_FD
+        return (timestamp, arbitrationID, flags, len(data), data)
+
+    @staticmethod
+    def recordToRow(record):
+        """
+        Convert a frame record to a raw value list (ID, data, length, timestamp).
+
+        :param record: The frame record
+        :return: The raw value list
+        """
+
+        timestamp, arbitrationID, flags, dlc, data = record
+        if flags & FrameBatch.FLAG_EXTENDED:
+            CANID = "%08X" % arbitrationID
+        else:
+            CANID = "%03X" % arbitrationID
+        return [
+            CANID,
+            data.hex().upper(),
+            str(dlc), "" if math.isnan(timestamp) else str(timestamp)
+        ]
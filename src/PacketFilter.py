@@ -0,0 +1,238 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+from KnownPacketMatcher import KnownPacketMatcher
+
+
+class PacketFilter():
+    """
+    Compiled ignore rules of a sniffer (see :class:`~src.SnifferTabElement.SnifferTabElement`). The rules are
+    compiled and evaluated inside the :class:`~src.SnifferProcess.SnifferProcess`, so filtered frames are never
+    sent to the GUI.
+
+    Every rule has the form ``<ID>#<data>`` as returned by :class:`~src.PacketsDialog.PacketsDialog`.
+    The ID can be:
+
+     - A hex ID, e.g. ``123``
+     - A range of IDs, e.g. ``100-1FF``
+     - An ID and a bit mask like in candump, e.g. ``120:7F0`` matches all IDs with ``ID & 7F0 == 120``
+     - ``*``: All IDs
+
+    The data can be:
+
+     - ``*``: Any payload
+     - A hex string, optionally with ``?`` nibbles and a trailing ``*`` for prefixes (see
+       :class:`~src.KnownPacketMatcher.KnownPacketMatcher`), e.g. ``00??FF*``
+     - A hex string and a bit mask, e.g. ``0080:00C0`` matches all 2 byte payloads with ``data & 00C0 == 0080``
+
+    If ``invert`` is True, only frames that match a rule are accepted. Else, matching frames are ignored.
+    The ID parts of the rules can also be passed to the kernel (see :func:`getKernelFilters`).
+    """
+
+    #: Mask of all ID bits
+    IDMask = 0x1FFFFFFF
+
+    def __init__(self, rules, invert=False):
+        """
+        Compile the rules. Invalid rules are collected in ``invalidRules``.
+
+        :param rules: List of rules in the form ``<ID>#<data>``
+        :param invert: Optional: Only accept the frames matching a rule if this is True. Default: False
+        """
+
+        self.invert = invert
+        self.invalidRules = []
+
+        #: ID --> list of data rules. None as data rule matches any payload
+        self.exactIDRules = {}
+        #: List of (lowest ID, highest ID, ID mask, masked ID, data rule)
+        self.IDRangeRules = []
+
+        for rule in rules:
+            CANID, _, data = rule.upper().partition("#")
+            IDRange = PacketFilter.compileIDRule(CANID)
+            dataRule = PacketFilter.compileDataRule(data)
+            if IDRange is None or dataRule is False:
+                self.invalidRules.append(rule)
+                continue
+
+            lowestID, highestID, IDMask, maskedID = IDRange
+            if lowestID == highestID and IDMask == 0:
+                self.exactIDRules.setdefault(lowestID, []).append(dataRule)
+            else:
+                self.IDRangeRules.append(
+                    (lowestID, highestID, IDMask, maskedID, dataRule))
+
+    def isEmpty(self):
+        """
+        :return: A boolean value indicating whether there are no valid rules
+        """
+
+        return len(self.exactIDRules) == 0 and len(self.IDRangeRules) == 0
+
+    @staticmethod
+    def compileIDRule(CANID):
+        """
+        Compile the ID part of a rule.
+
+        :param CANID: The ID part as string
+        :return: A tuple (lowest ID, highest ID, ID mask, masked ID) or None if the ID is invalid
+        """
+
+        try:
+            if CANID == "*":
+                return (0, 0x1FFFFFFF, 0, 0)
+            elif "-" in CANID:
+                lowestID, _, highestID = CANID.partition("-")
+                return (int(lowestID, 16), int(highestID, 16), 0, 0)
+            elif ":" in CANID:
+                maskedID, _, IDMask = CANID.partition(":")
+                IDMask = int(IDMask, 16)
+                return (0, 0x1FFFFFFF, IDMask, int(maskedID, 16) & IDMask)
+            arbitrationID = int(CANID, 16)
+            return (arbitrationID, arbitrationID, 0, 0)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def compileDataRule(data):
+        """
+        Compile the data part of a rule.
+
+        :param data: The data part as string
+        :return: None for any payload, a tuple (length in bytes, isPrefix, mask, masked value)
+                 or False if the data is invalid
+        """
+
+        if data in ("", "*"):
+            return None
+
+        if ":" in data:
+            value, _, mask = data.partition(":")
+            if len(value) % 2 != 0 or len(mask) != len(value):
+                return False
+            try:
+                mask = int(mask, 16)
+                return (len(value) // 2, False, mask, int(value, 16) & mask)
+            except ValueError:
+                return False
+
+        pattern = KnownPacketMatcher.compilePattern(data, None)
+        if pattern is None:
+            return False
+        return pattern[:4]
+
+    @staticmethod
+    def dataRuleMatches(dataRule, data):
+        """
+        :param dataRule: A compiled data rule
+        :param data: The payload as bytes
+        :return: A boolean value indicating whether the payload matches the rule
+        """
+
+        if dataRule is None:
+            return True
+
+        length, isPrefix, mask, value = dataRule
+        if len(data) == length or isPrefix and len(data) > length:
+            return int.from_bytes(data[:length], "big") & mask == value
+        return False
+
+    def matches(self, arbitrationID, data):
+        """
+        :param arbitrationID: The ID as integer
+        :param data: The payload as bytes
+        :return: A boolean value indicating whether the frame matches a rule
+        """
+
+        dataRules = self.exactIDRules.get(arbitrationID)
+        if dataRules is not None:
+            for dataRule in dataRules:
+                if PacketFilter.dataRuleMatches(dataRule, data):
+                    return True
+
+        for lowestID, highestID, IDMask, maskedID, dataRule in self.IDRangeRules:
+            if lowestID <= arbitrationID <= highestID and \
+                    arbitrationID & IDMask == maskedID and \
+                    PacketFilter.dataRuleMatches(dataRule, data):
+                return True
+
+        return False
+
+    @staticmethod
+    def rangeToKernelFilters(lowestID, highestID):
+        """
+        Split a range of IDs into aligned blocks that can be expressed as ``(CAN ID, mask)`` filters.
+
+        :param lowestID: The lowest ID of the range
+        :param highestID: The highest ID of the range
+        :return: List of tuples (CAN ID, mask)
+        """
+
+        kernelFilters = []
+        while lowestID <= highestID:
+            # The biggest aligned block that starts at lowestID and fits into the range
+            blockSize = lowestID & -lowestID if lowestID > 0 else PacketFilter.IDMask + 1
+            while lowestID + blockSize - 1 > highestID:
+                blockSize >>= 1
+            kernelFilters.append(
+                (lowestID, PacketFilter.IDMask & ~(blockSize - 1)))
+            lowestID += blockSize
+        return kernelFilters
+
+    def getKernelFilters(self):
+        """
+        Convert the ID parts of the rules to filters for :func:`~src.CANData.CANData.setFilters`. The kernel
+        filters may let more frames pass than the rules, so :func:`accepts` still has to be used:
+
+         - If ``invert`` is False, rules that match any payload become exclude filters
+         - If ``invert`` is True, the IDs of all rules become include filters
+
+        :return: A tuple (include filters or None, exclude filters)
+        """
+
+        kernelFilters = []
+        for arbitrationID, dataRules in self.exactIDRules.items():
+            if self.invert or None in dataRules:
+                kernelFilters.append((arbitrationID, PacketFilter.IDMask))
+
+        for lowestID, highestID, IDMask, maskedID, dataRule in self.IDRangeRules:
+            if not self.invert and dataRule is not None:
+                continue
+            if IDMask != 0:
+                kernelFilters.append((maskedID, IDMask))
+            else:
+                kernelFilters.extend(
+                    PacketFilter.rangeToKernelFilters(lowestID, highestID))
+
+        if self.invert:
+            return (kernelFilters, [])
+        return (None, kernelFilters)
+
+    def accepts(self, record):
+        """
+        :param record: A frame record (see :class:`~src.FrameBatch.FrameBatch`)
+        :return: A boolean value indicating whether the frame will be displayed
+        """
+
+        return self.matches(record[1], record[4]) == self.invert
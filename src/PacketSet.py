@@ -77,6 +77,20 @@ class PacketSet():
 
         """
 
+        return PacketSet.fromDict(json.loads(importJSON))
+
+    @staticmethod
+    def fromDict(values):
+        """
+        This class method creates a PacketSet object using a dictionary of attribute values,
+        e.g. a record of a :class:`~src.ProjectExport.ProjectExport` file.
+
+        :param values: The dictionary containing the object data
+
+        :returns:  A PacketSet object with the values set accordingly
+
+        """
+
         packetSet = PacketSet(None, None, None)
-        packetSet.__dict__ = json.loads(importJSON)
+        packetSet.__dict__ = values
         return packetSet
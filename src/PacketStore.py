@@ -0,0 +1,660 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+from array import array
+from collections.abc import MutableSequence
+import math
+
+from FrameBatch import FrameBatch
+from PacketArchive import PacketArchive
+import Globals
+import Toolbox
+
+
+class PacketStore(MutableSequence):
+    """
+    A columnar packet list that can be used instead of a list of raw value lists (e.g. as ``rawData``
+    of a tab and as ``dataList`` of a :class:`~src.PacketTableModel.PacketTableModel` at the same time).
+    IDs, timestamps, data lengths, DLCs and flags are stored in typed arrays, payloads in one
+    fixed-width byte matrix. The length column displays the DLC, so remote frames keep their length. Raw value lists (ID, data, length, timestamp, description) are only
+    created on access, descriptions of known packets are resolved at that time, too.
+
+    Rows that can't be stored losslessly in the columns (e.g. manually entered, incomplete
+    or invalid values) are kept as raw value lists in ``self.overrides``.
+
+    If ``newestFirst`` is True, index 0 refers to the last physically stored row. This makes
+    inserting rows at the front as cheap as appending them.
+    """
+
+    # Column indexes of the raw value lists
+    IDColIndex = 0
+    dataColIndex = 1
+    lengthColIndex = 2
+    timestampColIndex = 3
+    descriptionColIndex = 4
+    columnCount = 5
+
+    #: Bytes per row in the payload matrix. It is widened once a longer (CAN FD) payload is stored
+    payloadWidthDefault = 8
+    payloadWidthMax = 64
+
+    #: Flag of extended (8 digit) IDs, same as in :class:`~src.FrameBatch.FrameBatch`
+    FLAG_EXTENDED = FrameBatch.FLAG_EXTENDED
+    #: Flags of frame records that are kept in the flags column. The FD flag is derived from the data length
+    storedFlags = FrameBatch.FLAG_EXTENDED | FrameBatch.FLAG_REMOTE
+
+    def __init__(self, rows=None, newestFirst=False):
+        """
+        Create the empty columns and add the passed rows.
+
+        :param rows: Optional: Raw value lists to add
+        :param newestFirst: Optional: Whether the physical order is the reverse of the logical order.
+                            Default: False
+        """
+
+        self.newestFirst = newestFirst
+
+        self.IDs = array("I")
+        self.timestamps = array("d")
+        self.dataLengths = array("B")
+        self.DLCs = array("B")
+        self.flags = array("B")
+        self.payloadWidth = PacketStore.payloadWidthDefault
+        self.payloads = bytearray()
+        #: Physical index --> raw value list of rows that aren't stored in the columns
+        self.overrides = {}
+        #: Physical indexes in the sorted logical order (see :func:`sortByColumn`) or None
+        self.order = None
+        #: Column index --> ascending permutation of physical indexes
+        self.sortCache = {}
+
+        if rows is not None:
+            self.extend(rows)
+
+    def __len__(self):
+        return len(self.IDs)
+
+    def getPhysicalIndex(self, index):
+        """
+        Convert a logical index to the index of the columns.
+
+        :param index: The logical index, this may be negative
+        :return: The physical index
+        :raises IndexError: If the index is out of range
+        """
+
+        length = len(self.IDs)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("PacketStore index out of range")
+
+        if self.order is not None:
+            # Rows added after sorting aren't part of the order yet
+            unsortedCount = length - len(self.order)
+            if self.newestFirst:
+                if index < unsortedCount:
+                    return length - 1 - index
+                return self.order[index - unsortedCount]
+            elif index < len(self.order):
+                return self.order[index]
+            return index
+
+        return length - 1 - index if self.newestFirst else index
+
+    def encodeRow(self, row):
+        """
+        Convert a raw value list to column values. This only succeeds if the values can be restored
+        exactly as they are. Rows with a length that differs from the payload length can't be stored
+        because the remote flag is unknown.
+
+        :param row: The raw value list
+        :return: A tuple (ID, flags, payload, DLC, timestamp) or None if the row can't be stored in the columns
+        """
+
+        try:
+            CANID = row[PacketStore.IDColIndex]
+            data = row[PacketStore.dataColIndex]
+            length = row[PacketStore.lengthColIndex]
+            timestamp = row[PacketStore.timestampColIndex]
+
+            if len(CANID) == 3:
+                flags = 0
+            elif len(CANID) == 8:
+                flags = PacketStore.FLAG_EXTENDED
+            else:
+                return None
+
+            intID = int(CANID, 16)
+            payload = bytes.fromhex(data)
+            if "%0*X" % (len(CANID), intID) != CANID or \
+                    payload.hex().upper() != data or \
+                    len(payload) > PacketStore.payloadWidthMax or \
+                    str(length) != str(len(payload)):
+                return None
+
+            if timestamp == "":
+                floatTimestamp = float("nan")
+            else:
+                floatTimestamp = float(timestamp)
+                if str(floatTimestamp) != timestamp:
+                    return None
+
+        except (IndexError, TypeError, ValueError):
+            return None
+
+        return intID, flags, payload, len(payload), floatTimestamp
+
+    def decodeRow(self, physicalIndex):
+        """
+        Create the raw value list of a stored row.
+
+        :param physicalIndex: The physical index of the row
+        :return: The raw value list
+        """
+
+        if physicalIndex in self.overrides:
+            row = list(self.overrides[physicalIndex])
+            row[PacketStore.descriptionColIndex] = Toolbox.Toolbox.getKnownPacketDescription(
+                row[PacketStore.IDColIndex], row[PacketStore.dataColIndex])
+            return row
+
+        timestamp = self.timestamps[physicalIndex]
+        return [
+            self.formatID(physicalIndex),
+            self.formatData(physicalIndex),
+            str(self.DLCs[physicalIndex]),
+            "" if math.isnan(timestamp) else str(timestamp),
+            self.getDescription(physicalIndex)
+        ]
+
+    def invalidateDescriptions(self):
+        """
+        Drop the cached sort order of the description column. This must be called if the known packets change.
+        """
+
+        self.sortCache.pop(PacketStore.descriptionColIndex, None)
+
+    def getDescription(self, physicalIndex):
+        """
+        Get the description of a stored row using the integer ID and the payload bytes
+        (see :class:`~src.KnownPacketMatcher.KnownPacketMatcher`).
+
+        :param physicalIndex: The physical index of a row that is stored in the columns
+        :return: The description if one can be found, else an empty string
+        """
+
+        knownPacketMatcher = Globals.knownPacketMatcher
+        if knownPacketMatcher is None or self.IDs[physicalIndex] not in knownPacketMatcher.rules:
+            return ""
+
+        start = physicalIndex * self.payloadWidth
+        return knownPacketMatcher.match(
+            self.IDs[physicalIndex],
+            bytes(self.payloads[start:start + self.dataLengths[physicalIndex]]))
+
+    def formatID(self, physicalIndex):
+        """
+        :param physicalIndex: The physical index of the row
+        :return: The ID as hex string with 3 or 8 digits
+        """
+
+        if self.flags[physicalIndex] & PacketStore.FLAG_EXTENDED:
+            return "%08X" % self.IDs[physicalIndex]
+        return "%03X" % self.IDs[physicalIndex]
+
+    def formatData(self, physicalIndex):
+        """
+        :param physicalIndex: The physical index of the row
+        :return: The payload as hex string
+        """
+
+        start = physicalIndex * self.payloadWidth
+        return self.payloads[start:start + self.dataLengths[physicalIndex]].hex(
+        ).upper()
+
+    def getValue(self, index, colIndex):
+        """
+        Get a single value without creating the whole raw value list.
+
+        :param index: The logical row index
+        :param colIndex: The column index
+        :return: The value as it would be in the raw value list
+        """
+
+        physicalIndex = self.getPhysicalIndex(index)
+        if physicalIndex in self.overrides:
+            return self.decodeRow(physicalIndex)[colIndex]
+
+        if colIndex == PacketStore.descriptionColIndex:
+            return self.getDescription(physicalIndex)
+
+        if colIndex == PacketStore.IDColIndex:
+            return self.formatID(physicalIndex)
+        elif colIndex == PacketStore.dataColIndex:
+            return self.formatData(physicalIndex)
+        elif colIndex == PacketStore.lengthColIndex:
+            return str(self.DLCs[physicalIndex])
+        elif colIndex == PacketStore.timestampColIndex:
+            timestamp = self.timestamps[physicalIndex]
+            return "" if math.isnan(timestamp) else str(timestamp)
+        raise IndexError("PacketStore column index out of range")
+
+    def widenPayloads(self, payloadWidth):
+        """
+        Rebuild the payload matrix with more bytes per row.
+
+        :param payloadWidth: The new amount of bytes per row
+        """
+
+        oldWidth = self.payloadWidth
+        padding = bytes(payloadWidth - oldWidth)
+        self.payloads = bytearray(b"".join(
+            self.payloads[start:start + oldWidth] + padding
+            for start in range(0, len(self.payloads), oldWidth)))
+        self.payloadWidth = payloadWidth
+
+    def writeRow(self, physicalIndex, row):
+        """
+        Store a raw value list at an already allocated physical index.
+
+        :param physicalIndex: The physical index
+        :param row: The raw value list
+        """
+
+        # Cached permutations that contain the row are outdated
+        if len(self.sortCache) > 0:
+            self.sortCache = {
+                colIndex: permutation
+                for colIndex, permutation in self.sortCache.items()
+                if len(permutation) <= physicalIndex
+            }
+
+        encodedRow = self.encodeRow(row)
+        if encodedRow is None:
+            row = list(row)
+            while len(row) < PacketStore.columnCount:
+                row.append("")
+            self.overrides[physicalIndex] = row
+            encodedRow = (0, 0, b"", 0, float("nan"))
+        else:
+            self.overrides.pop(physicalIndex, None)
+
+        intID, flags, payload, DLC, timestamp = encodedRow
+        if len(payload) > self.payloadWidth:
+            self.widenPayloads(PacketStore.payloadWidthMax)
+
+        self.IDs[physicalIndex] = intID
+        self.flags[physicalIndex] = flags
+        self.dataLengths[physicalIndex] = len(payload)
+        self.DLCs[physicalIndex] = DLC
+        self.timestamps[physicalIndex] = timestamp
+        start = physicalIndex * self.payloadWidth
+        self.payloads[start:start + self.payloadWidth] = payload.ljust(
+            self.payloadWidth, b"\x00")
+
+    def extendRecords(self, records):
+        """
+        Store frame records (see :class:`~src.FrameBatch.FrameBatch`) directly in the columns without
+        formatting them. The records are stored after the last physically stored row, so they are
+        added at the front if ``newestFirst`` is True.
+
+        :param records: List of frame records
+        """
+
+        if len(records) == 0:
+            return
+
+        # Fill the columns one by one instead of record by record
+        timestamps, IDs, flags, DLCs, payloads = zip(*records)
+        dataLengths = list(map(len, payloads))
+        if max(dataLengths) > self.payloadWidth:
+            self.widenPayloads(PacketStore.payloadWidthMax)
+
+        self.IDs.extend(IDs)
+        self.flags.extend(
+            [flag & PacketStore.storedFlags for flag in flags])
+        self.dataLengths.extend(dataLengths)
+        self.DLCs.extend(DLCs)
+        self.timestamps.extend(timestamps)
+        payloadWidth = self.payloadWidth
+        self.payloads += b"".join(
+            [payload.ljust(payloadWidth, b"\x00") for payload in payloads])
+
+    def iterRecords(self):
+        """
+        Iterate over the stored rows as frame records (see :class:`~src.FrameBatch.FrameBatch`)
+        in the physical order, which is the order the rows were added in. Rows that can't be
+        converted to frame records are skipped.
+
+        :return: A generator yielding frame records
+        """
+
+        payloadWidth = self.payloadWidth
+        for physicalIndex in range(len(self.IDs)):
+            if physicalIndex in self.overrides:
+                record = PacketArchive.rowToRecord(
+                    self.overrides[physicalIndex])
+                if record is not None:
+                    yield record
+                continue
+
+            dataLength = self.dataLengths[physicalIndex]
+            flags = self.flags[physicalIndex]
+            if dataLength > 8:
+                flags |= FrameBatch.FLAG_FD
+            start = physicalIndex * payloadWidth
+            yield (self.timestamps[physicalIndex], self.IDs[physicalIndex],
+                   flags, self.DLCs[physicalIndex],
+                   bytes(self.payloads[start:start + dataLength]))
+
+    def shiftOverrides(self, fromIndex, offset):
+        """
+        Move the overrides after an insertion or a deletion.
+
+        :param fromIndex: All overrides with a physical index >= this are being moved
+        :param offset: The amount of rows to move
+        """
+
+        if len(self.overrides) == 0:
+            return
+        self.overrides = {
+            (physicalIndex + offset
+             if physicalIndex >= fromIndex else physicalIndex): row
+            for physicalIndex, row in self.overrides.items()
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PacketStore(
+                [self[i] for i in range(*index.indices(len(self)))])
+        return self.decodeRow(self.getPhysicalIndex(index))
+
+    def __setitem__(self, index, row):
+        if isinstance(index, slice):
+            raise TypeError("PacketStore doesn't support slice assignment")
+        self.writeRow(self.getPhysicalIndex(index), row)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            # Delete from the back to keep the remaining indexes valid
+            for i in sorted(range(*index.indices(len(self))), reverse=True):
+                del self[i]
+            return
+
+        # Deleting rows changes the physical indexes
+        self.applyOrder()
+        physicalIndex = self.getPhysicalIndex(index)
+        del self.IDs[physicalIndex]
+        del self.flags[physicalIndex]
+        del self.dataLengths[physicalIndex]
+        del self.DLCs[physicalIndex]
+        del self.timestamps[physicalIndex]
+        start = physicalIndex * self.payloadWidth
+        del self.payloads[start:start + self.payloadWidth]
+        self.overrides.pop(physicalIndex, None)
+        self.shiftOverrides(physicalIndex + 1, -1)
+
+    def deleteRows(self, indexes):
+        """
+        Delete many rows at once: The columns are compacted in one pass instead of
+        moving all following rows for every deleted row.
+
+        :param indexes: Collection of logical row indexes
+        """
+
+        if len(indexes) == 0:
+            return
+
+        self.applyOrder()
+        deletedPhysicalIndexes = {
+            self.getPhysicalIndex(index)
+            for index in indexes
+        }
+        keptIndexes = [
+            physicalIndex for physicalIndex in range(len(self.IDs))
+            if physicalIndex not in deletedPhysicalIndexes
+        ]
+
+        width = self.payloadWidth
+        self.IDs = array("I", [self.IDs[i] for i in keptIndexes])
+        self.flags = array("B", [self.flags[i] for i in keptIndexes])
+        self.dataLengths = array("B",
+                                 [self.dataLengths[i] for i in keptIndexes])
+        self.DLCs = array("B", [self.DLCs[i] for i in keptIndexes])
+        self.timestamps = array("d", [self.timestamps[i] for i in keptIndexes])
+        payloads = self.payloads
+        self.payloads = bytearray(b"".join(
+            [payloads[i * width:(i + 1) * width] for i in keptIndexes]))
+        if len(self.overrides) > 0:
+            self.overrides = {
+                newIndex: self.overrides[oldIndex]
+                for newIndex, oldIndex in enumerate(keptIndexes)
+                if oldIndex in self.overrides
+            }
+
+    def insert(self, index, row):
+        """
+        Insert a raw value list before the logical index.
+
+        :param index: The logical index
+        :param row: The raw value list
+        """
+
+        length = len(self.IDs)
+        if index < 0:
+            index = max(0, index + length)
+        index = min(index, length)
+        physicalIndex = length - index if self.newestFirst else index
+        # Only rows added after the physically last row keep the sort order valid
+        if physicalIndex != length:
+            self.applyOrder()
+
+        if physicalIndex == length:
+            self.IDs.append(0)
+            self.flags.append(0)
+            self.dataLengths.append(0)
+            self.DLCs.append(0)
+            self.timestamps.append(0.0)
+            self.payloads.extend(bytes(self.payloadWidth))
+        else:
+            self.IDs.insert(physicalIndex, 0)
+            self.flags.insert(physicalIndex, 0)
+            self.dataLengths.insert(physicalIndex, 0)
+            self.DLCs.insert(physicalIndex, 0)
+            self.timestamps.insert(physicalIndex, 0.0)
+            start = physicalIndex * self.payloadWidth
+            self.payloads[start:start] = bytes(self.payloadWidth)
+            self.shiftOverrides(physicalIndex, 1)
+
+        self.writeRow(physicalIndex, row)
+
+    def clear(self):
+        self.IDs = array("I")
+        self.timestamps = array("d")
+        self.dataLengths = array("B")
+        self.DLCs = array("B")
+        self.flags = array("B")
+        self.payloadWidth = PacketStore.payloadWidthDefault
+        self.payloads = bytearray()
+        self.overrides = {}
+        self.order = None
+        self.sortCache = {}
+
+    def emptyCopy(self):
+        """
+        :return: A new empty PacketStore with the same order
+        """
+
+        return PacketStore(newestFirst=self.newestFirst)
+
+    def sortByColumn(self, colIndex, reverse=False):
+        """
+        Sort the rows by the typed values of a column (see :func:`getSortKey`). The columns aren't reordered:
+        The sort order is stored as permutation of physical indexes and cached per column.
+        Rows added afterwards are displayed in the order they were added (at the front if ``newestFirst``
+        is True) until the next sort, which only sorts the new rows and merges them into the cached permutation.
+
+        :param colIndex: The column index to sort for
+        :param reverse: Optional: Sort descending if this is True. Default: False
+        """
+
+        permutation = self.sortCache.get(colIndex)
+        if permutation is None:
+            permutation = array("I", sorted(
+                range(len(self.IDs)),
+                key=lambda physicalIndex: self.getSortKey(physicalIndex, colIndex)))
+        elif len(permutation) < len(self.IDs):
+            permutation = self.mergeIntoPermutation(permutation, colIndex)
+        self.sortCache[colIndex] = permutation
+
+        self.order = permutation[::-1] if reverse else permutation
+
+    def mergeIntoPermutation(self, permutation, colIndex):
+        """
+        Add the rows that have been added after a permutation has been created. Only the new rows are sorted,
+        their positions are found using a binary search: This needs O(k log n) key comparisons for k new rows.
+
+        :param permutation: Ascending permutation of the physical indexes ``0 .. len(permutation) - 1``
+        :param colIndex: The column index of the permutation
+        :return: The new permutation of all physical indexes
+        """
+
+        def sortKey(physicalIndex):
+            return self.getSortKey(physicalIndex, colIndex)
+
+        newIndexes = sorted(range(len(permutation), len(self.IDs)), key=sortKey)
+
+        mergedPermutation = array("I")
+        copiedCount = 0
+        for physicalIndex in newIndexes:
+            # Find the first position with a greater key (stable: new rows come after equal rows).
+            # The new rows are sorted, so the search starts behind the previous position
+            key = sortKey(physicalIndex)
+            low = copiedCount
+            high = len(permutation)
+            while low < high:
+                middle = (low + high) // 2
+                if key < sortKey(permutation[middle]):
+                    high = middle
+                else:
+                    low = middle + 1
+            mergedPermutation.extend(permutation[copiedCount:low])
+            mergedPermutation.append(physicalIndex)
+            copiedCount = low
+
+        mergedPermutation.extend(permutation[copiedCount:])
+        return mergedPermutation
+
+    def applyOrder(self):
+        """
+        Reorder the columns physically to match the current logical order and remove the sort order.
+        This is needed before rows are inserted or deleted in between, because those change the physical indexes.
+        All cached permutations are dropped.
+        """
+
+        self.sortCache = {}
+        if self.order is None:
+            return
+
+        physicalOrder = [self.getPhysicalIndex(i) for i in range(len(self))]
+        if self.newestFirst:
+            physicalOrder.reverse()
+        self.order = None
+
+        width = self.payloadWidth
+        self.IDs = array("I", (self.IDs[i] for i in physicalOrder))
+        self.flags = array("B", (self.flags[i] for i in physicalOrder))
+        self.dataLengths = array("B",
+                                 (self.dataLengths[i] for i in physicalOrder))
+        self.DLCs = array("B", (self.DLCs[i] for i in physicalOrder))
+        self.timestamps = array("d",
+                                (self.timestamps[i] for i in physicalOrder))
+        self.payloads = bytearray(b"".join(
+            self.payloads[i * width:(i + 1) * width] for i in physicalOrder))
+        if len(self.overrides) > 0:
+            newIndexes = {
+                oldIndex: newIndex
+                for newIndex, oldIndex in enumerate(physicalOrder)
+            }
+            self.overrides = {
+                newIndexes[oldIndex]: row
+                for oldIndex, row in self.overrides.items()
+            }
+
+    def getSortKey(self, physicalIndex, colIndex):
+        """
+        Get the typed sort key of a stored value without formatting it (see :func:`valueToSortKey`).
+
+        :param physicalIndex: The physical index of the row
+        :param colIndex: The column index
+        :return: The sort key
+        """
+
+        if physicalIndex in self.overrides:
+            return PacketStore.valueToSortKey(
+                self.decodeRow(physicalIndex)[colIndex], colIndex)
+
+        if colIndex == PacketStore.descriptionColIndex:
+            return (0, self.getDescription(physicalIndex))
+
+        if colIndex == PacketStore.IDColIndex:
+            return (0, self.IDs[physicalIndex])
+        elif colIndex == PacketStore.dataColIndex:
+            start = physicalIndex * self.payloadWidth
+            return (0, bytes(self.payloads[start:start +
+                                           self.dataLengths[physicalIndex]]))
+        elif colIndex == PacketStore.lengthColIndex:
+            return (0, self.DLCs[physicalIndex])
+        elif colIndex == PacketStore.timestampColIndex:
+            timestamp = self.timestamps[physicalIndex]
+            return (1, "") if math.isnan(timestamp) else (0, timestamp)
+        raise IndexError("PacketStore column index out of range")
+
+    @staticmethod
+    def valueToSortKey(value, colIndex):
+        """
+        Convert a displayed value to a typed sort key: IDs are compared as numbers, data as bytes,
+        lengths and timestamps as numbers and descriptions as strings. Values that can't be converted
+        are sorted behind all valid values.
+
+        :param value: The value as it would be in the raw value list
+        :param colIndex: The column index of the value
+        :return: A tuple (0, typed value) or (1, value as string) for invalid values
+        """
+
+        try:
+            if colIndex == PacketStore.IDColIndex:
+                return (0, int(value, 16))
+            elif colIndex == PacketStore.dataColIndex:
+                return (0, bytes.fromhex(value))
+            elif colIndex in (PacketStore.lengthColIndex,
+                              PacketStore.timestampColIndex):
+                number = float(value)
+                if not math.isnan(number):
+                    return (0, number)
+            else:
+                return (0, str(value))
+        except (TypeError, ValueError):
+            pass
+        return (1, str(value))
@@ -20,12 +20,13 @@ Created on May 31, 2017
 
 @author: pschmied
 """
-import operator
+from collections.abc import MutableSequence
 from PySide.QtCore import Qt
 import re
 
 import Packet
 import Toolbox
+from PacketStore import PacketStore
 from PySide import QtCore
 
 # With guidance from:
@@ -35,11 +36,20 @@ from PySide import QtCore
 class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
     """
     A custom TableModel is needed to allow efficient handling of **many** values.
+    ``dataList`` can either be a list of raw value lists or a :class:`~src.PacketStore.PacketStore`.
     """
 
     #: Emits rowIndex and columnIndex of the changed cell
     cellChanged = QtCore.Signal(int, int)
 
+    #: Interval in ms to add queued rows to the GUI (~30 Hz)
+    flushInterval = 33
+
+    #: Amount of rows to request from a row source when the view needs more rows
+    fetchBatchSize = 1000
+    #: Amount of rows to request at once from a row source when all rows are needed
+    fetchAllBatchSize = 50000
+
     def __init__(self,
                  parent,
                  dataList,
@@ -50,6 +60,7 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
                  lengthColIndex=3,
                  timestampColIndex=4,
                  descriptionColIndex=5,
+                 sanitizeHex=True,
                  *args):
 
         QtCore.QAbstractTableModel.__init__(self, parent, *args)
@@ -64,6 +75,151 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         self.timestampColIndex = timestampColIndex
         self.descriptionColIndex = descriptionColIndex
 
+        #: If this is True, edited cells only keep hex characters.
+        #: Else, only whitespace is removed, e.g. to edit filter rules (see :class:`~src.PacketFilter.PacketFilter`)
+        self.sanitizeHex = sanitizeHex
+
+        #: If this is True, rows added by :func:`appendRow` are displayed periodically
+        self.queuedInserts = False
+        #: Amount of rows at the front/end of ``dataList`` that haven't been displayed yet
+        self.queuedFrontRowCount = 0
+        self.queuedBackRowCount = 0
+        self.flushTimer = None
+
+        #: Callable that provides more rows on demand (see :func:`setRowSource`)
+        self.rowSource = None
+
+    def setRowSource(self, rowSource):
+        """
+        Set a source to load rows lazily: The view only requests more rows (see :func:`fetchMore`) if they
+        are going to be displayed. This way, huge data sets can be displayed instantly.
+
+        :param rowSource: Callable that is called with the maximum amount of rows to return. It must return
+                          a list of raw value lists which will be appended. If less rows than requested are returned,
+                          the source is considered to be exhausted. Use None to remove the current source
+        """
+
+        self.rowSource = rowSource
+
+    def setDataList(self, dataList):
+        """
+        Replace the managed data, e.g. by a read-only :class:`~src.LogView.LogView`.
+        The current row source is removed.
+
+        :param dataList: The new data list
+        """
+
+        self.beginResetModel()
+        self.rowSource = None
+        self.dataList = dataList
+        self.queuedFrontRowCount = 0
+        self.queuedBackRowCount = 0
+        self.endResetModel()
+
+    def isReadOnly(self):
+        """
+        :return: A boolean value indicating whether the data list can't be modified, e.g. a :class:`~src.LogView.LogView`
+        """
+
+        return not isinstance(self.dataList, MutableSequence)
+
+    def appendStoredRows(self, count):
+        """
+        Display rows that have already been added to the end of ``self.dataList``,
+        e.g. newly indexed lines of a :class:`~src.LogView.LogView`.
+
+        :param count: The amount of added rows
+        """
+
+        if count > 0:
+            self.queuedBackRowCount += count
+            self.flushQueuedRows()
+
+    def canFetchMore(self, parent=None):
+        """
+        :param parent: Dummy parameter to keep the needed signature
+        :return: A boolean value indicating whether the row source can provide more rows
+        """
+
+        return self.rowSource is not None
+
+    def fetchMore(self, parent=None):
+        """
+        Called by the view to append the next batch of rows from the row source.
+
+        :param parent: Dummy parameter to keep the needed signature
+        """
+
+        self.fetchRows(PacketTableModel.fetchBatchSize)
+
+    def fetchRows(self, count):
+        """
+        Append up to ``count`` rows from the row source.
+
+        :param count: The maximum amount of rows to append
+        :return: The amount of appended rows
+        """
+
+        if self.rowSource is None:
+            return 0
+
+        rows = self.rowSource(count)
+        if len(rows) < count:
+            self.rowSource = None
+
+        self.appendRows(rows, resolveDescriptions=True)
+        return len(rows)
+
+    def fetchAll(self):
+        """
+        Append all remaining rows of the row source. This must be called before
+        operations that need all rows, e.g. sorting or saving.
+        """
+
+        while self.rowSource is not None:
+            self.fetchRows(PacketTableModel.fetchAllBatchSize)
+            QtCore.QCoreApplication.processEvents()
+
+    def setQueuedInserts(self, enabled):
+        """
+        Enable or disable queued inserts. If enabled, rows passed to :func:`appendRow` are stored immediately
+        but they aren't displayed yet: :func:`flushQueuedRows` displays them about 30 times
+        a second using only one insert notification per flush. This keeps the GUI responsive
+        at high packet rates.
+
+        :param enabled: Boolean value indicating whether rows will be queued
+        """
+
+        if not enabled:
+            self.flushQueuedRows()
+        elif self.flushTimer is None:
+            self.flushTimer = QtCore.QTimer(self)
+            self.flushTimer.setSingleShot(True)
+            self.flushTimer.setInterval(PacketTableModel.flushInterval)
+            self.flushTimer.timeout.connect(self.flushQueuedRows)
+
+        self.queuedInserts = enabled
+
+    def flushQueuedRows(self):
+        """
+        Display all queued rows. The GUI is notified using one ``beginInsertRows``/``endInsertRows``
+        pair for the rows added at the front and one for the rows added at the end.
+        This must be called before accessing rows by index because the indexes change afterwards.
+        """
+
+        if self.queuedFrontRowCount > 0:
+            self.beginInsertRows(QtCore.QModelIndex(), 0,
+                                 self.queuedFrontRowCount - 1)
+            self.queuedFrontRowCount = 0
+            self.endInsertRows()
+
+        if self.queuedBackRowCount > 0:
+            rowCount = self.rowCount()
+            self.beginInsertRows(QtCore.QModelIndex(), rowCount,
+                                 rowCount + self.queuedBackRowCount - 1)
+            self.queuedBackRowCount = 0
+            self.endInsertRows()
+
     def columnCount(self, parent=None):
         """
         Returns the current column count by returning the length of the header list.
@@ -82,7 +238,8 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :return: The row count as integer
         """
 
-        return len(self.dataList)
+        return len(
+            self.dataList) - self.queuedFrontRowCount - self.queuedBackRowCount
 
     def setRowCount(self, count):
         """
@@ -92,13 +249,13 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :param count: The desired amount of rows
         """
 
+        self.flushQueuedRows()
+
         # If additional rows are needed
         if count > len(self.dataList):
             while len(self.dataList) < count:
-                self.dataList.append([])
                 # Fill the columns with empty data
-                for colIndex in range(self.columnCount()):
-                    self.dataList[-1].append("")
+                self.dataList.append([""] * self.columnCount())
         # Rows have to be removed
         elif count < len(self.dataList):
             while len(self.dataList) > count:
@@ -112,8 +269,43 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         This is a shortcut to :func:`setRowCount` with parameter ``0``.
         """
 
-        self.dataList = []
-        self.emit(QtCore.SIGNAL("layoutChanged()"))
+        self.beginResetModel()
+        self.rowSource = None
+        if isinstance(self.dataList, PacketStore):
+            self.dataList = self.dataList.emptyCopy()
+        else:
+            self.dataList = []
+        self.queuedFrontRowCount = 0
+        self.queuedBackRowCount = 0
+        self.endResetModel()
+
+    def prepareRow(self, dataList, resolveDescription=False):
+        """
+        Fill missing columns of a raw value list and set its length (and description).
+
+        :param dataList: The raw value list, this is modified in place
+        :param resolveDescription: If this is set to True, the description of the potential known packet will
+                                   be resolved. Default: False
+        :return: The description if ``resolveDescription`` is True, else None
+        """
+
+        # Fill the columns with empty data
+        while len(dataList) < self.columnCount():
+            dataList.append("")
+
+        assert len(dataList) == self.columnCount(), "Invalid data list length"
+
+        description = None
+        if resolveDescription:
+            description = Toolbox.Toolbox.getKnownPacketDescription(
+                dataList[0], dataList[1])
+            dataList[self.descriptionColIndex] = description
+
+        # Set the length
+        dataList[self.lengthColIndex] = str(
+            Packet.Packet.getDisplayDataLength(dataList[self.IDColIndex],
+                                               dataList[self.dataColIndex]))
+        return description
 
     def appendRow(self,
                   dataList=[],
@@ -135,42 +327,35 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :return: The description of the known packet. If ``resolveDescription`` is False, an empty string is returned.
                  Else None.
 
-        This also emits the ``dataChanged`` and ``layoutChanged`` signals to let the GUI know that
-        the data/layout has been changed.
+        If queued inserts are enabled (see :func:`setQueuedInserts`), the row is only queued and will be
+        added with the next flush. Else the GUI is notified using ``beginInsertRows``/``endInsertRows``.
         """
 
         if not isinstance(dataList, list):
             return
 
-        # Fill the columns with empty data
-        while len(dataList) < self.columnCount():
-            dataList.append("")
-
-        assert len(dataList) == self.columnCount(), "Invalid data list length"
+        description = self.prepareRow(dataList, resolveDescription)
 
-        if resolveDescription:
-            description = Toolbox.Toolbox.getKnownPacketDescription(
-                dataList[0], dataList[1])
-            dataList[self.descriptionColIndex] = description
-
-        # Set the length
-        dataList[self.lengthColIndex] = str(
-            Packet.Packet.getDisplayDataLength(dataList[self.IDColIndex],
-                                               dataList[self.dataColIndex]))
+        # Slice --> insert a copy to avoid the references being all the same
+        if self.queuedInserts:
+            if addAtFront:
+                self.dataList.insert(0, dataList[:])
+                self.queuedFrontRowCount += 1
+            else:
+                self.dataList.append(dataList[:])
+                self.queuedBackRowCount += 1
+            if not self.flushTimer.isActive():
+                self.flushTimer.start()
 
-        if addAtFront:
-            self.dataList.insert(0, dataList[:])
         else:
-            # Slice --> insert a copy to avoid the references being all the same
-            self.dataList.append(dataList[:])
-
-        for colIndex in range(len(self.header)):
+            # Keep the order of previously queued rows
+            self.flushQueuedRows()
+            rowIndex = 0 if addAtFront else len(self.dataList)
             if emit:
-                self.dataChanged.emit(self.rowCount(), colIndex)
-                self.cellChanged.emit(self.rowCount(), colIndex)
-
-        if emit:
-            self.emit(QtCore.SIGNAL("layoutChanged()"))
+                self.beginInsertRows(QtCore.QModelIndex(), rowIndex, rowIndex)
+            self.dataList.insert(rowIndex, dataList[:])
+            if emit:
+                self.endInsertRows()
 
         if resolveDescription:
             return description
@@ -179,7 +364,8 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
 
     def appendRows(self, rowList, addAtFront=False, resolveDescriptions=True):
         """
-        This allows appending a whole set of rows at once using the best possible speed
+        This allows appending a whole set of rows at once using the best possible speed:
+        The rows are added in one step and the GUI is notified only once.
 
         :param rowList: List of raw data lists to append
         :param addAtFront: Values will be added to the front of ``self.dataList`` if this is True.
@@ -192,37 +378,34 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
                  to keep indexes. Else None will be returned
         """
 
-        self.emit(
-            QtCore.SIGNAL("beginInsertRows()"), QtCore.QModelIndex(),
-            self.rowCount(),
-            self.rowCount() + len(rowList))
-        descriptions = []
-
-        for rowIdx in range(len(rowList)):
-            # Only notify the layout after every X rows
-            doEmit = rowIdx < 10 or rowIdx % 10000 == 0
-
-            if doEmit:
-                QtCore.QCoreApplication.processEvents()
-
-            while len(rowList[rowIdx]) < self.columnCount():
-                rowList[rowIdx].append("")
+        self.flushQueuedRows()
 
+        descriptions = []
+        newRows = []
+        for row in rowList:
+            description = self.prepareRow(row, resolveDescriptions)
             if resolveDescriptions:
-                descriptions.append(
-                    self.appendRow(
-                        rowList[rowIdx],
-                        addAtFront,
-                        emit=doEmit,
-                        resolveDescription=True))
+                descriptions.append(description)
+            # Slice --> insert a copy to avoid the references being all the same
+            newRows.append(row[:])
+
+        if len(newRows) > 0:
+            if addAtFront:
+                # Every row is inserted before the previous one
+                newRows.reverse()
+                self.beginInsertRows(QtCore.QModelIndex(), 0,
+                                     len(newRows) - 1)
+                if isinstance(self.dataList, PacketStore):
+                    for row in reversed(newRows):
+                        self.dataList.insert(0, row)
+                else:
+                    self.dataList[0:0] = newRows
             else:
-                self.appendRow(rowList[rowIdx], addAtFront, emit=doEmit)
-
-            if doEmit:
-                QtCore.QCoreApplication.processEvents()
-
-        self.emit(QtCore.SIGNAL("endInsertRows()"))
-        self.emit(QtCore.SIGNAL("layoutChanged()"))
+                rowCount = len(self.dataList)
+                self.beginInsertRows(QtCore.QModelIndex(), rowCount,
+                                     rowCount + len(newRows) - 1)
+                self.dataList.extend(newRows)
+            self.endInsertRows()
 
         if resolveDescriptions:
             return descriptions
@@ -230,6 +413,31 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         else:
             return None
 
+    def appendRecords(self, records):
+        """
+        Store frame records (see :class:`~src.FrameBatch.FrameBatch`) directly in the
+        :class:`~src.PacketStore.PacketStore` of this model and notify the GUI once.
+        The rows are added at the front if the store is ordered ``newestFirst``, else at the end.
+
+        :param records: List of frame records
+        """
+
+        assert isinstance(self.dataList,
+                          PacketStore), "Frame records need a PacketStore"
+
+        self.flushQueuedRows()
+        if len(records) == 0:
+            return
+
+        if self.dataList.newestFirst:
+            firstRowIndex = 0
+        else:
+            firstRowIndex = len(self.dataList)
+        self.beginInsertRows(QtCore.QModelIndex(), firstRowIndex,
+                             firstRowIndex + len(records) - 1)
+        self.dataList.extendRecords(records)
+        self.endInsertRows()
+
     def insertRow(self, dataList=[]):
         """
         This is just an alias to :func:`appendRow` for compatibility.
@@ -247,25 +455,56 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :param rowIndex: The row index to delete
         """
 
+        self.flushQueuedRows()
         del self.dataList[rowIndex]
         self.emit(QtCore.SIGNAL("layoutChanged()"))
 
     def removeRows(self, rowIndexes):
         """
-        Remove multiple rows at once.
+        Remove multiple rows at once. The data list is compacted in one pass
+        and the GUI is notified only once.
 
-        :param rowIndexes: The rows that will be deleted
+        :param rowIndexes: The rows that will be deleted as QModelIndex objects or row numbers
+        :return: The sorted list of removed row numbers
         """
 
-        # Make the indexes persistent first to be able to
-        # delete multiple selections at once
-        persistentRowIndexes = []
-        # Reverse the delete order --> no need to worry about shifting indexes <:
-        for rowIndex in sorted(rowIndexes, reverse=True):
-            persistentRowIndexes.append(QtCore.QPersistentModelIndex(rowIndex))
+        self.flushQueuedRows()
+        if self.isReadOnly():
+            return []
+
+        removedRows = sorted({
+            rowIndex if isinstance(rowIndex, int) else rowIndex.row()
+            for rowIndex in rowIndexes
+        })
+
+        self.emit(QtCore.SIGNAL("layoutAboutToBeChanged()"))
+        PacketTableModel.removeIndexes(self.dataList, removedRows)
+        self.emit(QtCore.SIGNAL("layoutChanged()"))
+
+        return removedRows
+
+    @staticmethod
+    def removeIndexes(sequence, indexes):
+        """
+        Remove many elements of a list or a :class:`~src.PacketStore.PacketStore` in one pass.
+        The sequence is modified in place, so other references to it stay valid.
+
+        :param sequence: The list or PacketStore
+        :param indexes: Collection of indexes to remove
+        """
+
+        if len(indexes) == 0:
+            return
+
+        if isinstance(sequence, PacketStore):
+            sequence.deleteRows(indexes)
+            return
 
-        for persistentRowIndex in persistentRowIndexes:
-            self.removeRow(persistentRowIndex.row())
+        indexes = set(indexes)
+        sequence[:] = [
+            element for index, element in enumerate(sequence)
+            if index not in indexes
+        ]
 
     def data(self, index, role):
         """
@@ -285,19 +524,31 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
             return QtCore.Qt.AlignCenter
 
         elif role == QtCore.Qt.DisplayRole or role == QtCore.Qt.EditRole:
-            rowIndex = index.row()
-            colIndex = index.column()
-
-            if len(self.dataList) - 1 >= rowIndex:
-                try:
-                    return self.dataList[rowIndex][colIndex]
-                except IndexError:
-                    return None
-            else:
-                return None
+            # Queued rows at the front are not displayed yet
+            return self.getStoredValue(
+                index.row() + self.queuedFrontRowCount, index.column())
 
         return None
 
+    def getStoredValue(self, rowIndex, colIndex):
+        """
+        Get a value from ``self.dataList``. If this is a :class:`~src.PacketStore.PacketStore`, only the requested
+        value will be formatted.
+
+        :param rowIndex: Index of the row in ``self.dataList``
+        :param colIndex: Column index
+        :return: The data at the specified index (if possible); Else None
+        """
+
+        if rowIndex < 0 or rowIndex >= len(self.dataList):
+            return None
+        try:
+            if isinstance(self.dataList, PacketStore):
+                return self.dataList.getValue(rowIndex, colIndex)
+            return self.dataList[rowIndex][colIndex]
+        except IndexError:
+            return None
+
     def getValue(self, rowIndex, colIndex):
         """
         Get the data from the table at the given indexes.
@@ -307,13 +558,8 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :return: The data at the specified index (if possible); Else None
         """
 
-        if len(self.dataList) - 1 >= rowIndex:
-            try:
-                return self.dataList[rowIndex][colIndex]
-            except IndexError:
-                return None
-        else:
-            return None
+        self.flushQueuedRows()
+        return self.getStoredValue(rowIndex, colIndex)
 
     def setText(self, rowIndex, colIndex, data):
         """
@@ -331,10 +577,15 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
             data = ""
         data = str(data)
 
+        self.flushQueuedRows()
+
         if len(self.dataList) - 1 >= rowIndex and \
                 len(self.dataList[rowIndex]) - 1 >= colIndex:
 
-            self.dataList[rowIndex][colIndex] = data
+            # Assign the row again to also update PacketStores
+            row = self.dataList[rowIndex]
+            row[colIndex] = data
+            self.dataList[rowIndex] = row
             self.cellChanged.emit(rowIndex, colIndex)
             self.dataChanged.emit(rowIndex, colIndex)
             self.emit(QtCore.SIGNAL("layoutChanged()"))
@@ -350,10 +601,19 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :return: True if the operation succeeded
         """
 
-        rowIndex = index.row()
+        # The index refers to the displayed rows, so respect queued rows before displaying them
+        rowIndex = index.row() + self.queuedFrontRowCount
         colIndex = index.column()
-        value = re.sub("[^A-Fa-f0-9]+", "", str(value)).upper()
-        self.dataList[rowIndex][colIndex] = value
+        self.flushQueuedRows()
+
+        if self.sanitizeHex:
+            value = re.sub("[^A-Fa-f0-9]+", "", str(value)).upper()
+        else:
+            value = re.sub(r"\s+", "", str(value)).upper()
+        # Assign the row again to also update PacketStores
+        row = self.dataList[rowIndex]
+        row[colIndex] = value
+        self.dataList[rowIndex] = row
 
         self.cellChanged.emit(rowIndex, colIndex)
         self.dataChanged.emit(rowIndex, colIndex)
@@ -389,11 +649,30 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         :param order: Either ``DescendingOrder`` or ``AscendingOrder``
         """
 
+        self.flushQueuedRows()
+        # Read-only data lists may be too large to be sorted
+        if self.isReadOnly():
+            return
+        # All rows are needed to sort
+        self.fetchAll()
         self.emit(QtCore.SIGNAL("layoutAboutToBeChanged()"))
-        self.dataList = sorted(
-            self.dataList, key=operator.itemgetter(colIndex))
-        if order == QtCore.Qt.DescendingOrder:
-            self.dataList.reverse()
+        if isinstance(self.dataList, PacketStore):
+            # Sort in place because the store may be shared with a tab
+            self.dataList.sortByColumn(
+                colIndex, reverse=order == QtCore.Qt.DescendingOrder)
+        else:
+            # Compare typed values instead of the strings (e.g. timestamps as numbers)
+            valueKind = {
+                self.IDColIndex: PacketStore.IDColIndex,
+                self.dataColIndex: PacketStore.dataColIndex,
+                self.lengthColIndex: PacketStore.lengthColIndex,
+                self.timestampColIndex: PacketStore.timestampColIndex
+            }.get(colIndex, PacketStore.descriptionColIndex)
+            self.dataList = sorted(
+                self.dataList,
+                key=lambda row: PacketStore.valueToSortKey(row[colIndex], valueKind))
+            if order == QtCore.Qt.DescendingOrder:
+                self.dataList.reverse()
         self.emit(QtCore.SIGNAL("layoutChanged()"))
 
     def flags(self, index):
@@ -405,7 +684,7 @@ class PacketTableModel(QtCore.QAbstractTableModel, QtCore.QObject):
         """
 
         flags = super(self.__class__, self).flags(index)
-        if index.column() not in self.readOnlyCols:
+        if index.column() not in self.readOnlyCols and not self.isReadOnly():
             flags |= Qt.ItemIsEditable
         flags |= Qt.ItemIsSelectable
         flags |= Qt.ItemIsEnabled
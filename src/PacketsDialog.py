@@ -27,6 +27,7 @@ from PySide.QtGui import QMessageBox
 import Strings
 import Toolbox
 from AbstractTab import AbstractTab
+from PacketFilter import PacketFilter
 
 
 class PacketsDialog(AbstractTab):
@@ -39,7 +40,8 @@ class PacketsDialog(AbstractTab):
             packets=None,
             rawPacketList=None,
             returnPacketsAsRawList=True,
-            invert=False):
+            invert=False,
+            editRules=False):
         """
         This basically just sets data and reads the widget from the ``.ui`` file.
 
@@ -56,11 +58,16 @@ class PacketsDialog(AbstractTab):
 
         :param invert: Boolean value indicating whether the selected packets are the ones that will be displayed by the sniffer.
                          This filters all packets that are NOT defined in the dialog.
+
+        :param editRules: Optional: Boolean value indicating whether the rows are filter rules
+                          (see :class:`~src.PacketFilter.PacketFilter`). If this is True, ranges, masks and wildcards
+                          can be entered and every edited rule is validated. Default: False
         """
 
         self.packets = packets
         self.rawPacketList = rawPacketList
         self.invert = invert
+        self.editRules = editRules
 
         self.widget = Toolbox.Toolbox.widgetFromUIFile(
                 Strings.packetsDialogUIPath)
@@ -71,7 +78,8 @@ class PacketsDialog(AbstractTab):
                 Strings.packetsDialogLoggerName, [2, 3],
                 Strings.packetsDialogTableViewName,
                 labelInterfaceValueName=None,
-                hideTimestampCol=False)
+                hideTimestampCol=False,
+                sanitizeHex=not editRules)
 
         self.returnPacketsAsRawList = returnPacketsAsRawList
 
@@ -156,6 +164,48 @@ class PacketsDialog(AbstractTab):
         else:
             return None
 
+    def addPacket(self, valueList, *args, **kwargs):
+        """
+        Add a packet or a filter rule to the GUI table (see :func:`~src.AbstractTab.AbstractTab.addPacket`).
+        Filter rules with ranges, masks or wildcards have no length.
+
+        :param valueList: Packet data as raw value list
+        :return: The description of the packet
+        """
+
+        descr = AbstractTab.addPacket(self, valueList, *args, **kwargs)
+        if self.editRules and not Toolbox.Toolbox.isHexString(
+                valueList[self.IDColIndex] + valueList[self.dataColIndex]):
+            valueList[self.lengthColIndex] = ""
+        return descr
+
+    def handleCellChanged(self, rowIndex, colIndex):
+        """
+        Update the row like :func:`~src.AbstractTab.AbstractTab.handleCellChanged`.
+        If filter rules are edited, the changed rule is validated using :class:`~src.PacketFilter.PacketFilter`.
+
+        :param rowIndex: The changed row
+        :param colIndex: The changed column
+        """
+
+        AbstractTab.handleCellChanged(self, rowIndex, colIndex)
+
+        if not self.editRules or (colIndex != self.IDColIndex
+                                  and colIndex != self.dataColIndex):
+            return
+
+        CANID = self.packetTableModel.getValue(rowIndex, self.IDColIndex)
+        data = self.packetTableModel.getValue(rowIndex, self.dataColIndex)
+        if CANID is None or data is None or CANID == "":
+            return
+
+        if not Toolbox.Toolbox.isHexString(CANID + data):
+            self.packetTableModel.setText(rowIndex, self.lengthColIndex, "")
+
+        rule = CANID + "#" + (data if len(data) > 0 else "*")
+        if len(PacketFilter([rule]).invalidRules) > 0:
+            self.logger.warn(Strings.packetFilterInvalidRules + " " + rule)
+
     def getUniquePackets(self):
         """
         Filters all unique packets out of ``rawData`` and displays them on the GUI table.
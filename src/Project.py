@@ -76,6 +76,20 @@ class Project:
 
         """
 
+        return Project.fromDict(json.loads(importJSON))
+
+    @staticmethod
+    def fromDict(values):
+        """
+        This class method creates a project object using a dictionary of attribute values,
+        e.g. a record of a :class:`~src.ProjectExport.ProjectExport` file.
+
+        :param values: The dictionary containing the object data
+
+        :returns:  A project object with the values set accordingly
+
+        """
+
         project = Project(None, None, None)
-        project.__dict__ = json.loads(importJSON)
+        project.__dict__ = values
         return project
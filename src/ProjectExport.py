@@ -0,0 +1,178 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+import gzip
+import json
+
+import Settings
+
+
+class ProjectExport():
+    """
+    Reads and writes project export files as a stream: Every line of the file is one JSON record,
+    so files of any size can be written and read in constant memory. Files ending in ``.gz``
+    are compressed using gzip.
+
+    Each record is a JSON object with a ``type`` key. The first record is the header, followed by the project,
+    its PacketSets, the packets of every PacketSet and the known packets.
+    Packets are written as compact records with short keys because they make up most of the file.
+    """
+
+    #: Identifies the file format in the header record
+    formatName = "CANalyzat0r-ndjson"
+    formatVersion = 1
+
+    recordTypeHeader = "Header"
+    recordTypeProject = "Project"
+    recordTypePacketSet = "PacketSet"
+    recordTypePacket = "Packet"
+    recordTypeKnownPacket = "KnownPacket"
+
+    #: Files with this suffix will be compressed
+    compressedFileSuffix = ".gz"
+    #: Faster than the default level 9 and the files are only slightly bigger
+    compressionLevel = 6
+
+    def __init__(self, exportFile):
+        """
+        :param exportFile: A file object opened using :func:`open`
+        """
+
+        self.exportFile = exportFile
+        self.encoder = json.JSONEncoder(separators=(",", ":"))
+
+    @staticmethod
+    def open(filePath, mode):
+        """
+        Opens an export file in text mode. Compression is chosen by the file suffix.
+
+        :param filePath: The path of the file
+        :param mode: ``"r"`` to read or ``"w"`` to write
+        :return: The file object
+        """
+
+        if filePath.endswith(ProjectExport.compressedFileSuffix):
+            return gzip.open(
+                filePath,
+                mode + "t",
+                compresslevel=ProjectExport.compressionLevel,
+                encoding="utf-8")
+        return open(filePath, mode, encoding="utf-8")
+
+    @staticmethod
+    def isExportFile(filePath):
+        """
+        Check if a file is a streamed export file or a file written by older versions.
+
+        :param filePath: The path of the file
+        :return: True if the first record is a header of this format
+        """
+
+        try:
+            with ProjectExport.open(filePath, "r") as exportFile:
+                header = json.loads(exportFile.readline())
+        # Not JSON, not UTF-8 or not gzip compressed
+        except (ValueError, OSError):
+            return False
+
+        return isinstance(header, dict) and \
+            header.get("type") == ProjectExport.recordTypeHeader and \
+            header.get("format") == ProjectExport.formatName
+
+    def writeRecord(self, recordType, values):
+        """
+        Writes one record to the file.
+
+        :param recordType: The type of the record, e.g. ``recordTypeProject``
+        :param values: Dictionary of values to write. This is modified in place
+        """
+
+        values["type"] = recordType
+        self.exportFile.write(self.encoder.encode(values))
+        self.exportFile.write("\n")
+
+    def writeHeader(self):
+        """
+        Writes the header record. This must be the first record.
+        """
+
+        self.writeRecord(ProjectExport.recordTypeHeader, {
+            "format": ProjectExport.formatName,
+            "version": ProjectExport.formatVersion,
+            "app": Settings.APP_NAME + " " + Settings.APP_VERSION
+        })
+
+    def writeObject(self, recordType, obj):
+        """
+        Writes a Project, PacketSet or KnownPacket object using its attributes.
+
+        :param recordType: The type of the record
+        :param obj: The object to write
+        """
+
+        self.writeRecord(recordType, dict(obj.__dict__))
+
+    def writePacket(self, rawPacket):
+        """
+        Writes a packet using a raw data list as returned by
+        :func:`~src.Database.Database.iterPacketsOfPacketSet`.
+
+        :param rawPacket: Raw data list: ID, PacketSetID, CANID, Data, Timestamp, Interface
+        """
+
+        self.writeRecord(ProjectExport.recordTypePacket, {
+            "s": rawPacket[1],
+            "i": rawPacket[2],
+            "d": rawPacket[3],
+            "t": rawPacket[4],
+            "f": rawPacket[5]
+        })
+
+    @staticmethod
+    def packetValuesFromRecord(record):
+        """
+        Get the values of a packet record.
+
+        :param record: The packet record
+        :return: Tuple: PacketSetID, CANID, data, timestamp, interface
+        """
+
+        return (record["s"], record["i"], record["d"], record["t"],
+                record["f"])
+
+    def readRecords(self):
+        """
+        Reads all records of the file after the header, one line at a time.
+
+        :return: A generator yielding ``(recordType, record)`` tuples. ``record`` is a dictionary
+                 without the ``type`` key
+        """
+
+        for line in self.exportFile:
+            if len(line.strip()) == 0:
+                continue
+            record = json.loads(line)
+            recordType = record.pop("type", None)
+            if recordType == ProjectExport.recordTypeHeader:
+                continue
+            yield recordType, record
@@ -0,0 +1,395 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+import errno
+import math
+import select
+import socket
+import struct
+import time
+
+from FrameBatch import FrameBatch
+import Strings
+
+
+class RawCANSocket():
+    """
+    Talks to a SocketCAN interface using a raw ``AF_CAN`` socket instead of ``can.Bus``.
+    Frames are read and written as ``struct can_frame`` / ``struct canfd_frame`` using preallocated
+    buffers and are returned as frame records (see :class:`~src.FrameBatch.FrameBatch`), so no
+    ``can.Message`` objects have to be created.
+
+    Receiving is batched: After waiting for the first frame, all frames that are already queued in the
+    socket are drained using non-blocking reads.
+
+    Every frame gets the receive timestamp of the kernel (``SO_TIMESTAMPNS``). So the timestamps don't depend
+    on when the frames are read. Optionally, the timestamps of the CAN controller (``SO_TIMESTAMPING``) are used
+    instead. They are taken from the clock of the controller, so they are only used if the controller provides them
+    for the first received frame. Then they are used for all frames to never mix two clocks.
+    """
+
+    #: ``struct can_frame``: can_id, can_dlc, 3 padding bytes, data[8]
+    canFrame = struct.Struct("=IB3x8s")
+    #: ``struct canfd_frame``: can_id, len, flags, 2 reserved bytes, data[64]
+    canFDFrame = struct.Struct("=IBB2x64s")
+    #: Header of both frame types: can_id and the data length
+    frameHeader = struct.Struct("=IB")
+
+    CAN_MTU = canFrame.size
+    CANFD_MTU = canFDFrame.size
+    #: Offset of the data in both frame types
+    dataOffset = 8
+
+    CAN_EFF_FLAG = 0x80000000
+    CAN_RTR_FLAG = 0x40000000
+    CAN_ERR_FLAG = 0x20000000
+    CAN_EFF_MASK = 0x1FFFFFFF
+    CAN_SFF_MASK = 0x000007FF
+    CANFD_BRS = 0x01
+
+    # Socket options and flags for receive timestamps, the constants are not available in older Python versions
+    SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+    SO_TIMESTAMPING = getattr(socket, "SO_TIMESTAMPING", 37)
+    SOF_TIMESTAMPING_RX_HARDWARE = 1 << 2
+    SOF_TIMESTAMPING_RAW_HARDWARE = 1 << 6
+    #: ``struct timespec``: tv_sec, tv_nsec
+    timespec = struct.Struct("@ll")
+    #: ``struct scm_timestamping``: Software, legacy and hardware timestamp
+    scmTimestamping = struct.Struct("@llllll")
+
+    # Sources of receive timestamps
+    TIMESTAMPS_HARDWARE = "hardware (controller clock) if provided, else kernel"
+    TIMESTAMPS_KERNEL = "kernel"
+    TIMESTAMPS_USER = "user"
+
+    #: Maximum amount of frames that is drained at once
+    receiveBatchSize = 256
+    #: Maximum seconds to retry sending if the send queue is full
+    sendTimeout = 0.1
+    #: Seconds to sleep between two attempts to send
+    sendRetryInterval = 0.001
+
+    def __init__(self, ifaceName, fd=False, hardwareTimestamps=False):
+        """
+        Open and bind the raw socket.
+
+        :param ifaceName: The SocketCAN interface name
+        :param fd: Optional: Enable CAN FD frames. Default: False
+        :param hardwareTimestamps: Optional: Use the timestamps of the CAN controller if it provides them.
+                                   Default: False
+        """
+
+        self.ifaceName = ifaceName
+        self.fd = fd
+
+        self.socket = socket.socket(socket.AF_CAN, socket.SOCK_RAW,
+                                    socket.CAN_RAW)
+        if fd:
+            self.socket.setsockopt(socket.SOL_CAN_RAW,
+                                   socket.CAN_RAW_FD_FRAMES, 1)
+        self.socket.bind((ifaceName, ))
+
+        #: Where the receive timestamps come from
+        self.timestampSource = self.enableTimestamps(hardwareTimestamps)
+        #: Whether all frames get hardware timestamps. None until the first frame decides it
+        self.useHardwareTimestamps = None if \
+            self.timestampSource == RawCANSocket.TIMESTAMPS_HARDWARE else False
+        self.ancillaryBufferSize = socket.CMSG_SPACE(
+            RawCANSocket.timespec.size) + socket.CMSG_SPACE(
+                RawCANSocket.scmTimestamping.size)
+
+        self.receiveBuffer = bytearray(RawCANSocket.CANFD_MTU)
+        self.receiveView = memoryview(self.receiveBuffer)
+        self.sendBuffer = bytearray(RawCANSocket.CANFD_MTU)
+        self.sendView = memoryview(self.sendBuffer)
+
+    def enableTimestamps(self, hardwareTimestamps):
+        """
+        Enable receive timestamps on the socket. Kernel timestamps are always enabled
+        because hardware timestamps are only delivered if the CAN controller provides them.
+
+        :param hardwareTimestamps: Also request the timestamps of the CAN controller
+        :return: The timestamp source: ``TIMESTAMPS_HARDWARE``, ``TIMESTAMPS_KERNEL`` or ``TIMESTAMPS_USER`` if
+                 the kernel doesn't support timestamps
+        """
+
+        timestampSource = RawCANSocket.TIMESTAMPS_USER
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET,
+                                   RawCANSocket.SO_TIMESTAMPNS, 1)
+            timestampSource = RawCANSocket.TIMESTAMPS_KERNEL
+        except OSError:
+            pass
+
+        if hardwareTimestamps:
+            try:
+                self.socket.setsockopt(
+                    socket.SOL_SOCKET, RawCANSocket.SO_TIMESTAMPING,
+                    RawCANSocket.SOF_TIMESTAMPING_RX_HARDWARE |
+                    RawCANSocket.SOF_TIMESTAMPING_RAW_HARDWARE)
+                timestampSource = RawCANSocket.TIMESTAMPS_HARDWARE
+            except OSError:
+                pass
+
+        return timestampSource
+
+    @staticmethod
+    def ancillaryDataToTimestamps(ancillaryData):
+        """
+        Extract the receive timestamps from the ancillary data of ``recvmsg``.
+
+        :param ancillaryData: List of (level, type, data) tuples
+        :return: A tuple (kernel timestamp, hardware timestamp). The kernel timestamp is in seconds since the epoch,
+                 the hardware timestamp in seconds of the clock of the CAN controller. Missing timestamps are None
+        """
+
+        kernelTimestamp = None
+        hardwareTimestamp = None
+        for level, messageType, data in ancillaryData:
+            if level != socket.SOL_SOCKET:
+                continue
+            if messageType == RawCANSocket.SO_TIMESTAMPING and len(
+                    data) >= RawCANSocket.scmTimestamping.size:
+                _, _, _, _, hardwareSeconds, hardwareNanoseconds = \
+                    RawCANSocket.scmTimestamping.unpack_from(data)
+                # The hardware timestamp is zero if the controller doesn't provide one
+                if hardwareSeconds != 0 or hardwareNanoseconds != 0:
+                    hardwareTimestamp = hardwareSeconds + hardwareNanoseconds * 1e-9
+            elif messageType == RawCANSocket.SO_TIMESTAMPNS and len(
+                    data) >= RawCANSocket.timespec.size:
+                seconds, nanoseconds = RawCANSocket.timespec.unpack_from(data)
+                kernelTimestamp = seconds + nanoseconds * 1e-9
+        return kernelTimestamp, hardwareTimestamp
+
+    def fileno(self):
+        """
+        :return: The file descriptor of the socket, e.g. for ``select``
+        """
+
+        return self.socket.fileno()
+
+    def close(self):
+        """
+        Close the socket.
+        """
+
+        self.socket.close()
+
+    def clear(self):
+        """
+        Read and discard all queued frames.
+        """
+
+        recvInto = self.socket.recv_into
+        buffer = self.receiveBuffer
+        while True:
+            try:
+                recvInto(buffer, 0, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return
+
+    def receiveRecords(self, timeout, maxFrames=None):
+        """
+        Wait up to ``timeout`` seconds for a frame and drain all queued frames afterwards.
+
+        :param timeout: Seconds to wait for the first frame. None waits without a timeout,
+                        0 only drains the queued frames
+        :param maxFrames: Optional: Maximum amount of frames to return. Default: ``receiveBatchSize``
+        :return: List of frame records, empty if no frame has been received
+        """
+
+        if maxFrames is None:
+            maxFrames = RawCANSocket.receiveBatchSize
+
+        if timeout != 0:
+            readable, _, _ = select.select([self.socket], [], [], timeout)
+            if len(readable) == 0:
+                return []
+
+        recvmsgInto = self.socket.recvmsg_into
+        buffers = [self.receiveBuffer]
+        ancillaryBufferSize = self.ancillaryBufferSize
+        toTimestamps = RawCANSocket.ancillaryDataToTimestamps
+        useHardwareTimestamps = self.useHardwareTimestamps
+        buffer = self.receiveBuffer
+        view = self.receiveView
+        unpackHeader = RawCANSocket.frameHeader.unpack_from
+        dataOffset = RawCANSocket.dataOffset
+        records = []
+
+        while len(records) < maxFrames:
+            try:
+                frameSize, ancillaryData, _, _ = recvmsgInto(
+                    buffers, ancillaryBufferSize, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                break
+
+            kernelTimestamp, hardwareTimestamp = toTimestamps(ancillaryData)
+            if useHardwareTimestamps is None:
+                # The first frame decides which clock is used for all frames
+                useHardwareTimestamps = hardwareTimestamp is not None
+                self.useHardwareTimestamps = useHardwareTimestamps
+
+            if useHardwareTimestamps:
+                # Don't mix in kernel timestamps, they are taken from another clock
+                timestamp = hardwareTimestamp if hardwareTimestamp is not None else math.nan
+            elif kernelTimestamp is not None:
+                timestamp = kernelTimestamp
+            else:
+                timestamp = time.time()
+
+            canID, length = unpackHeader(buffer)
+            flags = 0
+            if frameSize == RawCANSocket.CANFD_MTU:
+                flags = FrameBatch.FLAG_FD
+            if canID & RawCANSocket.CAN_EFF_FLAG:
+                flags |= FrameBatch.FLAG_EXTENDED
+                arbitrationID = canID & RawCANSocket.CAN_EFF_MASK
+            else:
+                arbitrationID = canID & RawCANSocket.CAN_SFF_MASK
+            if canID & RawCANSocket.CAN_RTR_FLAG:
+                flags |= FrameBatch.FLAG_REMOTE
+            if canID & RawCANSocket.CAN_ERR_FLAG:
+                flags |= FrameBatch.FLAG_ERROR
+
+            # Remote frames have a length but no data
+            data = bytes(view[dataOffset:dataOffset + length]) \
+                if not flags & FrameBatch.FLAG_REMOTE else b""
+            records.append((timestamp, arbitrationID, flags, length, data))
+
+        return records
+
+    def packFrame(self, arbitrationID, flags, data, dlc=None, bitrateSwitch=False):
+        """
+        Write a frame to the send buffer.
+
+        :param arbitrationID: The CAN ID as integer
+        :param flags: Flags of the frame (see :class:`~src.FrameBatch.FrameBatch`)
+        :param data: The payload as bytes
+        :param dlc: Optional: The data length. This is needed for remote frames. Default: The length of ``data``
+        :param bitrateSwitch: Optional: Set the bit rate switch flag of CAN FD frames. Default: False
+        :return: A memoryview of the packed frame
+        :raises ValueError: If the payload is longer than 8 bytes and the socket isn't in FD mode
+        """
+
+        canID = arbitrationID
+        if flags & FrameBatch.FLAG_EXTENDED:
+            canID |= RawCANSocket.CAN_EFF_FLAG
+        if flags & FrameBatch.FLAG_REMOTE:
+            canID |= RawCANSocket.CAN_RTR_FLAG
+
+        length = dlc if dlc is not None else len(data)
+
+        isFD = flags & FrameBatch.FLAG_FD or length > 8
+        if isFD and not self.fd:
+            # The kernel rejects CAN FD frames on sockets that aren't in FD mode
+            if length > 8:
+                raise ValueError(Strings.CANDataNeedFD)
+            isFD = False
+
+        if isFD:
+            RawCANSocket.canFDFrame.pack_into(
+                self.sendBuffer, 0, canID, length,
+                RawCANSocket.CANFD_BRS if bitrateSwitch else 0, data)
+            return self.sendView[:RawCANSocket.CANFD_MTU]
+
+        RawCANSocket.canFrame.pack_into(self.sendBuffer, 0, canID, length,
+                                        data)
+        return self.sendView[:RawCANSocket.CAN_MTU]
+
+    def sendFrame(self, frame):
+        """
+        Send a packed frame. If the send queue of the interface is full, sending is retried
+        every ``sendRetryInterval`` seconds for up to ``sendTimeout`` seconds. Waiting for the socket
+        to become writable doesn't help because CAN sockets report to be writable even if the queue is full.
+
+        :param frame: The frame as returned by :func:`packFrame`
+        :raises OSError: If sending fails, e.g. with ``ENOBUFS`` if the queue is still full after ``sendTimeout``
+        """
+
+        deadline = None
+        while True:
+            try:
+                self.socket.send(frame)
+                return
+            except OSError as e:
+                if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                    raise e
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + RawCANSocket.sendTimeout
+                elif now >= deadline:
+                    raise e
+            time.sleep(RawCANSocket.sendRetryInterval)
+
+    def sendMessage(self, packet):
+        """
+        Send a can.Message object.
+
+        :param packet: The packet as can.Message object
+        """
+
+        self.sendFrame(self.packMessage(packet))
+
+    def packMessage(self, packet):
+        """
+        Write a can.Message object to the send buffer.
+
+        :param packet: The packet as can.Message object
+        :return: A memoryview of the packed frame
+        """
+
+        flags = 0
+        if packet.is_extended_id:
+            flags |= FrameBatch.FLAG_EXTENDED
+        if packet.is_remote_frame:
+            flags |= FrameBatch.FLAG_REMOTE
+        if getattr(packet, "is_fd", False):
+            flags |= FrameBatch.FLAG_FD
+
+        return self.packFrame(packet.arbitration_id, flags, bytes(packet.data),
+                              dlc=packet.dlc, bitrateSwitch=getattr(packet, "bitrate_switch", False))
+
+    def sendMessages(self, packets):
+        """
+        Send a batch of can.Message objects. Every frame is packed into the same preallocated buffer.
+
+        :param packets: Iterable of can.Message objects
+        """
+
+        sendFrame = self.sendFrame
+        packMessage = self.packMessage
+        for packet in packets:
+            sendFrame(packMessage(packet))
+
+    def sendRecords(self, records):
+        """
+        Send a batch of frame records. Every frame is packed into the same preallocated buffer.
+
+        :param records: Iterable of frame records
+        """
+
+        sendFrame = self.sendFrame
+        packFrame = self.packFrame
+        for _, arbitrationID, flags, dlc, data in records:
+            sendFrame(packFrame(arbitrationID, flags, data, dlc=dlc))
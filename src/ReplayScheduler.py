@@ -0,0 +1,214 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+import math
+import time
+
+
+class ReplayScheduler():
+    """
+    Sends packets at absolute deadlines instead of sleeping a fixed time after every packet. This way,
+    the time needed to send a packet doesn't add up over time and the inter-frame gaps of recorded
+    packets can be reproduced. Waiting is done by sleeping until shortly before the deadline and
+    spinning for the rest of the time, because ``time.sleep`` alone is too coarse.
+
+    The lateness of every sent packet (time of sending - deadline) is collected to report jitter statistics.
+    """
+
+    #: Time in seconds before a deadline in which the scheduler spins instead of sleeping
+    spinTime = 0.002
+    #: Maximum time in seconds to sleep at once. This keeps the scheduler responsive when it gets disabled
+    maxSleepTime = 0.1
+    #: If a packet is sent this many seconds too late, the schedule is shifted instead of sending
+    #: all following packets in a burst
+    resyncThreshold = 0.05
+    #: Amount of packets that are sent at once if there is no timing
+    sendBatchSize = 256
+
+    def __init__(self, offsets, period, speed=1.0):
+        """
+        Set the schedule.
+
+        :param offsets: List of send times in seconds relative to the start of a cycle, one entry per packet
+        :param period: Duration of a cycle in seconds. The next loop iteration starts after this time
+        :param speed: Optional: Speed factor, e.g. 0.5 for half speed. 0 sends as fast as possible. Default: 1.0
+        """
+
+        self.offsets = offsets
+        self.period = period
+        self.speed = speed
+
+        # Jitter statistics in seconds
+        self.sentCount = 0
+        self.latenessSum = 0
+        self.latenessSquareSum = 0
+        self.maxLateness = 0
+        self.resyncCount = 0
+
+    @staticmethod
+    def fromGap(count, gap, speed=1.0):
+        """
+        Create a scheduler that sends ``count`` packets with a fixed gap.
+
+        :param count: The amount of packets
+        :param gap: The gap between two packets in seconds
+        :param speed: Optional: Speed factor (see :func:`__init__`). Default: 1.0
+        :return: A :class:`ReplayScheduler` instance
+        """
+
+        return ReplayScheduler([index * gap for index in range(count)],
+                               count * gap, speed=speed)
+
+    @staticmethod
+    def fromTimestamps(timestamps, gap, speed=1.0):
+        """
+        Create a scheduler that reproduces the deltas of recorded timestamps.
+
+        :param timestamps: List of ascending timestamps in seconds, one entry per packet
+        :param gap: The gap in seconds between the last packet and the next loop iteration
+        :param speed: Optional: Speed factor (see :func:`__init__`). Default: 1.0
+        :return: A :class:`ReplayScheduler` instance
+        """
+
+        firstTimestamp = timestamps[0]
+        offsets = [timestamp - firstTimestamp for timestamp in timestamps]
+        return ReplayScheduler(offsets, offsets[-1] + gap, speed=speed)
+
+    @staticmethod
+    def parseTimestamps(values):
+        """
+        Convert timestamp strings of raw packets to floats.
+
+        :param values: List of timestamp strings
+        :return: List of floats or None if a value is missing or invalid
+        """
+
+        try:
+            return [float(value) for value in values]
+        except (ValueError, TypeError):
+            return None
+
+    def waitUntil(self, deadline, isEnabled):
+        """
+        Sleep until shortly before the deadline and spin afterwards.
+
+        :param deadline: The deadline as ``time.perf_counter`` value
+        :param isEnabled: Function that returns False if waiting should be aborted
+        :return: False if waiting has been aborted, else True
+        """
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return True
+            if not isEnabled():
+                return False
+            if remaining > ReplayScheduler.spinTime:
+                time.sleep(
+                    min(remaining - ReplayScheduler.spinTime,
+                        ReplayScheduler.maxSleepTime))
+
+    def replay(self, packets, sendPacket, isEnabled, loop=False, sendPackets=None):
+        """
+        Send the packets according to the schedule.
+
+        :param packets: List of packets, one entry per offset
+        :param sendPacket: Function that sends a single packet
+        :param isEnabled: Function that returns False if sending should be stopped
+        :param loop: Optional: Send the packets in a loop until ``isEnabled`` returns False. Default: False
+        :param sendPackets: Optional: Function that sends a list of packets. If this is specified, it is used
+                            to send batches of ``sendBatchSize`` packets as fast as possible if the speed is 0
+        """
+
+        asFastAsPossible = self.speed == 0
+        timeScale = 1 / self.speed if not asFastAsPossible else 0
+        cycleStart = time.perf_counter()
+
+        while isEnabled():
+            if asFastAsPossible and sendPackets is not None:
+                for batchStart in range(0, len(packets), ReplayScheduler.sendBatchSize):
+                    if not isEnabled():
+                        return
+                    sendPackets(packets[batchStart:batchStart + ReplayScheduler.sendBatchSize])
+                if not loop:
+                    return
+                continue
+
+            for packet, offset in zip(packets, self.offsets):
+                if asFastAsPossible:
+                    if not isEnabled():
+                        return
+                else:
+                    deadline = cycleStart + offset * timeScale
+                    if not self.waitUntil(deadline, isEnabled):
+                        return
+
+                    lateness = time.perf_counter() - deadline
+                    self.addLateness(lateness)
+                    if lateness > ReplayScheduler.resyncThreshold:
+                        # Don't try to catch up, shift the schedule instead
+                        cycleStart += lateness
+                        self.resyncCount += 1
+
+                sendPacket(packet)
+
+            if not loop:
+                return
+            cycleStart += self.period * timeScale
+
+    def addLateness(self, lateness):
+        """
+        Add a measured lateness to the jitter statistics.
+
+        :param lateness: The lateness in seconds
+        """
+
+        self.sentCount += 1
+        self.latenessSum += lateness
+        self.latenessSquareSum += lateness * lateness
+        self.maxLateness = max(self.maxLateness, lateness)
+
+    def getJitterStatistics(self):
+        """
+        :return: A tuple (mean lateness, standard deviation, maximum lateness) in microseconds or None if no
+                 packets have been sent on schedule
+        """
+
+        if self.sentCount == 0:
+            return None
+
+        mean = self.latenessSum / self.sentCount
+        variance = max(self.latenessSquareSum / self.sentCount - mean * mean, 0)
+        return (mean * 1e6, math.sqrt(variance) * 1e6, self.maxLateness * 1e6)
+
+    def getJitterStatisticsString(self):
+        """
+        :return: The jitter statistics as human readable string or None if there are no statistics
+        """
+
+        statistics = self.getJitterStatistics()
+        if statistics is None:
+            return None
+
+        return "%d packets, mean lateness %.0f us, std dev %.0f us, max %.0f us, %d resyncs" % (
+            (self.sentCount, ) + statistics + (self.resyncCount, ))
@@ -0,0 +1,215 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+import ctypes
+import select
+import struct
+from multiprocessing.sharedctypes import RawArray
+
+from WakeupPipe import WakeupPipe
+
+
+class RingBuffer():
+    """
+    A lock-free single producer/single consumer ring buffer in shared memory that holds
+    fixed-size frame records. It can be used to pass frames from one process or thread to another
+    without pickling and without a syscall per frame.
+
+    The producer only writes the head counter, the consumer only writes the tail counter.
+    Both counters grow monotonically, the slot of a record is ``counter & (capacity - 1)``.
+    If the consumer falls behind, new records are dropped and counted in the overflow counter.
+
+    Records that are written and read have the same format as the frame records of
+    :class:`~src.FrameBatch.FrameBatch`.
+
+    After every write, the producer wakes up the consumer using a :class:`~src.WakeupPipe.WakeupPipe`,
+    so the consumer can wait without polling.
+    """
+
+    #: Layout of a slot: timestamp, arbitration ID, flags, DLC, data length, padding and 64 data bytes
+    recordStruct = struct.Struct("<dIBBBx64s")
+
+    #: Default amount of slots, this must be a power of 2
+    capacityDefault = 65536
+
+    # Indexes of the shared counters
+    HEAD = 0
+    TAIL = 1
+    OVERFLOW = 2
+
+    def __init__(self, capacity=None):
+        """
+        Allocate the shared slots and counters. This has to be done before the producer
+        process is being started.
+
+        :param capacity: Optional: The amount of slots. This must be a power of 2
+        """
+
+        self.capacity = capacity if capacity is not None else RingBuffer.capacityDefault
+        assert self.capacity > 0 and self.capacity & (
+            self.capacity - 1) == 0, "The capacity must be a power of 2"
+
+        self.mask = self.capacity - 1
+        self.recordSize = RingBuffer.recordStruct.size
+        self.buffer = RawArray(ctypes.c_ubyte, self.capacity * self.recordSize)
+        self.counters = RawArray(ctypes.c_uint64, 3)
+        #: Signals the consumer that records have been written
+        self.notifyPipe = WakeupPipe()
+        #: The memoryview is created lazily because it can't be passed to another process
+        self.view = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["view"] = None
+        return state
+
+    def getView(self):
+        """
+        :return: A byte memoryview of the shared slots
+        """
+
+        if self.view is None:
+            self.view = memoryview(self.buffer).cast("B")
+        return self.view
+
+    def __len__(self):
+        return self.counters[RingBuffer.HEAD] - self.counters[RingBuffer.TAIL]
+
+    def getOverflowCount(self):
+        """
+        :return: The amount of records that have been dropped because the buffer was full
+        """
+
+        return self.counters[RingBuffer.OVERFLOW]
+
+    def write(self, records):
+        """
+        Write frame records to the buffer. This must only be called by the producer.
+        Records that don't fit into the buffer are dropped and counted.
+
+        :param records: List of frame records
+        :return: The amount of records that have been written
+        """
+
+        head = self.counters[RingBuffer.HEAD]
+        free = self.capacity - (head - self.counters[RingBuffer.TAIL])
+        if len(records) > free:
+            self.counters[RingBuffer.OVERFLOW] += len(records) - free
+            records = records[:free]
+
+        view = self.getView()
+        packInto = RingBuffer.recordStruct.pack_into
+        for timestamp, arbitrationID, flags, dlc, data in records:
+            packInto(view, (head & self.mask) * self.recordSize, timestamp,
+                     arbitrationID, flags, dlc, len(data), data)
+            head += 1
+
+        # Publish the records after they have been written completely
+        self.counters[RingBuffer.HEAD] = head
+        if len(records) > 0:
+            self.notifyPipe.wake()
+        return len(records)
+
+    def waitReadable(self, timeout, interruptPipe=None):
+        """
+        Wait until records are available.
+
+        :param timeout: Maximum amount of seconds to wait. None waits until records are available
+        :param interruptPipe: Optional: A :class:`~src.WakeupPipe.WakeupPipe` to stop waiting early
+        :return: A boolean value indicating whether records are available
+        """
+
+        if len(self) > 0:
+            return True
+
+        waitFiles = [self.notifyPipe]
+        if interruptPipe is not None:
+            waitFiles.append(interruptPipe)
+        select.select(waitFiles, [], [], timeout)
+
+        # Wakeups of records that are read afterwards are consumed too, this only causes spurious wakeups
+        self.notifyPipe.clear()
+        return len(self) > 0
+
+    def close(self):
+        """
+        Close the notification pipe. This must be done after the producer has terminated.
+        """
+
+        self.notifyPipe.close()
+
+    def peekSpans(self, maxRecords=None):
+        """
+        Get the readable records as memoryviews of the shared slots without copying them.
+        Because the buffer wraps around, up to two spans are returned. The slots stay reserved
+        until :func:`release` is called, so the views must not be used afterwards.
+        The slots of a span can be unpacked using ``recordStruct.iter_unpack``.
+
+        :param maxRecords: Optional: Maximum amount of records to return
+        :return: A tuple of the list of memoryviews and the amount of records in them
+        """
+
+        tail = self.counters[RingBuffer.TAIL]
+        available = self.counters[RingBuffer.HEAD] - tail
+        if maxRecords is not None:
+            available = min(available, maxRecords)
+        if available == 0:
+            return [], 0
+
+        view = self.getView()
+        start = tail & self.mask
+        firstCount = min(available, self.capacity - start)
+        spans = [
+            view[start * self.recordSize:(start + firstCount) *
+                 self.recordSize]
+        ]
+        if available > firstCount:
+            spans.append(view[:(available - firstCount) * self.recordSize])
+        return spans, available
+
+    def release(self, count):
+        """
+        Free slots after they have been read. This must only be called by the consumer.
+
+        :param count: The amount of records to release
+        """
+
+        self.counters[RingBuffer.TAIL] += count
+
+    def readRecords(self, maxRecords=None):
+        """
+        Read and release all available records.
+
+        :param maxRecords: Optional: Maximum amount of records to read
+        :return: List of frame records
+        """
+
+        spans, count = self.peekSpans(maxRecords)
+        records = []
+        for span in spans:
+            for timestamp, arbitrationID, flags, dlc, dataLength, data in RingBuffer.recordStruct.iter_unpack(
+                    span):
+                records.append((timestamp, arbitrationID, flags, dlc,
+                                data[:dataLength]))
+        self.release(count)
+        return records
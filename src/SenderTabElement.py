@@ -21,13 +21,13 @@ Created on May 23, 2017
 @author: pschmied
 """
 
-import time
 from PySide import QtCore
 
 import Globals
 import Strings
 import SenderTab
 from SenderThread import LoopSenderThread
+from ReplayScheduler import ReplayScheduler
 from CANData import CANData
 import MainTab
 import Toolbox
@@ -46,6 +46,16 @@ class SenderTabElement(AbstractTab):
     #: Amount of sending threads running to display in the status bar
     amountThreadsRunning = 0
 
+    #: Entries of the timing combo box: (text, whether to use the recorded timestamps, speed factor).
+    #: A speed factor of 0 means as fast as possible
+    timingModes = [
+        (Strings.senderTabElementTimingFixedGap, False, 1.0),
+        (Strings.senderTabElementTimingRecorded + " 0.5x", True, 0.5),
+        (Strings.senderTabElementTimingRecorded + " 1x", True, 1.0),
+        (Strings.senderTabElementTimingRecorded + " 10x", True, 10.0),
+        (Strings.senderTabElementTimingAsFastAsPossible, False, 0),
+    ]
+
     def __init__(self, tabWidget, tabName):
         """
         Set all passed data. Also, add the own send button to ``SenderTab.sendButtonList`` to
@@ -76,9 +86,9 @@ class SenderTabElement(AbstractTab):
 
     def sendAll(self):
         """
-        Send all packets in the GUI table. By default, this just sends the packet once using simple calls.
-        If the user requests to send the packets in a loop, an instance of :class:`~src.SenderThread.LoopSenderThread`
-        is being used to send the packets.
+        Send all packets in the GUI table using an instance of :class:`~src.SenderThread.LoopSenderThread`.
+        The packets are sent once or in a loop if the user requests it. The timing depends on the selected
+        timing mode (see :func:`createScheduler`).
         Also, GUI elements like the status bar are being updated.
         """
 
@@ -91,14 +101,15 @@ class SenderTabElement(AbstractTab):
 
         # Check if theres a sending thread running
         if not self.active:
-            # in ms
-            sleepTime = self.tabWidget.doubleSpinBoxGap.value() / 1000
             packetsToSend = []
+            timestamps = []
             for packetData in self.rawData:
                 packetToSend = CANData.tryBuildPacket(packetData[0],
                                                       packetData[1])
                 if packetToSend is not None:
                     packetsToSend.append(packetToSend)
+                    timestamps.append(packetData[self.timestampColIndex]
+                                      if len(packetData) > self.timestampColIndex else None)
                 else:
                     self.logger.error(Strings.packetBuildError + ": " +
                                       packetData[0] + " " + packetData[1])
@@ -106,45 +117,62 @@ class SenderTabElement(AbstractTab):
             if len(packetsToSend) == 0 or packetsToSend[0] is None:
                 return
 
-            # If a sending loop is requested: Create a thread and set the current tab to active
-            if self.tabWidget.checkBoxSendingLoop.isChecked():
+            packetsToSend, scheduler = self.createScheduler(packetsToSend, timestamps)
+            loop = self.tabWidget.checkBoxSendingLoop.isChecked()
 
-                self.loopSenderThread = LoopSenderThread(
-                    packetsToSend, sleepTime, self.CANData, self.tabName)
-                self.loopSenderThread.start()
-                self.logger.info(Strings.senderTabElementSenderThreadStarted)
+            self.loopSenderThread = LoopSenderThread(
+                packetsToSend, scheduler, self.CANData, self.tabName, loop=loop)
+            self.loopSenderThread.finished.connect(self.handleSenderThreadFinished)
+            self.loopSenderThread.start()
+            self.logger.info(Strings.senderTabElementSenderThreadStarted)
 
-                self.toggleGUIElements(False)
-                self.active = True
-                self.CANData.active = True
-                self.toggleLoopActive()
-                SenderTabElement.amountThreadsRunning += 1
+            self.toggleGUIElements(False)
+            self.active = True
+            self.CANData.active = True
+            self.toggleLoopActive()
+            SenderTabElement.amountThreadsRunning += 1
 
-                self.updateStatusBar()
+            self.updateStatusBar()
 
-            # Else just send the packets once - no need for a new thread
-            else:
-                progressDialog = Toolbox.Toolbox.getWorkingDialog(
-                    Strings.dialogSending)
-                progressDialog.show()
-                QtCore.QCoreApplication.processEvents()
+        # Stop the thread and reset logic
+        else:
+            self.stopSending()
 
-                try:
-                    for packetIdx in range(len(packetsToSend)):
-                        packetToSend = packetsToSend[packetIdx]
-                        self.CANData.sendPacket(packetToSend)
-                        time.sleep(sleepTime)
+    def createScheduler(self, packets, timestamps):
+        """
+        Create a :class:`~src.ReplayScheduler.ReplayScheduler` for the timing mode selected in the GUI.
+        If the recorded timing is requested, the packets are ordered by their timestamps.
 
-                        if packetIdx % 500 == 0:
-                            QtCore.QCoreApplication.processEvents()
+        :param packets: List of packets to send
+        :param timestamps: List of timestamp strings of the packets. Entries may be None
+        :return: A tuple (packets in sending order, scheduler)
+        """
 
-                    self.logger.info(Strings.senderTabPacketsSentOK)
+        _, useTimestamps, speed = SenderTabElement.timingModes[
+            max(self.tabWidget.comboBoxTiming.currentIndex(), 0)]
+        # in ms
+        gap = self.tabWidget.doubleSpinBoxGap.value() / 1000
 
-                finally:
-                    progressDialog.close()
+        if useTimestamps:
+            timestamps = ReplayScheduler.parseTimestamps(timestamps)
+            if timestamps is not None:
+                # Sniffed packets are displayed newest first
+                order = sorted(range(len(packets)), key=timestamps.__getitem__)
+                return ([packets[index] for index in order],
+                        ReplayScheduler.fromTimestamps(
+                            [timestamps[index] for index in order], gap, speed=speed))
 
-        # Stop the thread and reset logic
-        else:
+            self.logger.warn(Strings.senderTabElementTimestampsMissing)
+
+        return packets, ReplayScheduler.fromGap(len(packets), gap, speed=speed)
+
+    def handleSenderThreadFinished(self):
+        """
+        Reset the GUI if the sender thread has sent all packets by itself, i.e. without a loop.
+        """
+
+        if self.active:
+            self.logger.info(Strings.senderTabPacketsSentOK)
             self.stopSending()
 
     def stopSending(self):
@@ -233,6 +261,9 @@ class SenderTabElement(AbstractTab):
         sendButtonEnabledState = self.CANData is not None
         self.setSendButtonState(sendButtonEnabledState)
 
+        for timingMode in SenderTabElement.timingModes:
+            self.tabWidget.comboBoxTiming.addItem(timingMode[0])
+
     def setSendButtonState(self, state):
         """
         This sets the enabled state of the send button.
@@ -254,6 +285,7 @@ class SenderTabElement(AbstractTab):
                 self.tabWidget.buttonSenderXInterfaceSettings,
                 self.tabWidget.buttonAddPacket,
                 self.tabWidget.doubleSpinBoxGap,
+                self.tabWidget.comboBoxTiming,
                 self.tabWidget.tableViewSenderXData,
                 self.tabWidget.buttonApplyNewKnownPacketsSender,
                 self.tabWidget.buttonSenderXDataClear
@@ -26,52 +26,79 @@ import time
 import Globals
 import Strings
 from PySide import QtCore
+from FrameBatch import FrameBatch
 from Logger import Logger
 
 
 class LoopSenderThread(QtCore.QThread):
     """
-    Spawns a new thread that will send the passed packets in a loop.
+    Spawns a new thread that will send the passed packets once or in a loop. The timing
+    is handled by a :class:`~src.ReplayScheduler.ReplayScheduler`.
     """
 
-    def __init__(self, packets, sleepTime, CANData, threadName):
+    def __init__(self, packets, scheduler, CANData, threadName, loop=True):
         QtCore.QThread.__init__(self)
         self.packets = packets
-        self.sleepTime = sleepTime
+        self.scheduler = scheduler
         self.CANData = CANData
         self.threadName = threadName
+        self.loop = loop
         self.enabled = True
+        self.errorCount = 0
 
         self.logger = Logger(Strings.senderThreadLoggerName + " (" +
                              self.threadName + ")").getLogger()
 
+    def sendPacket(self, packet):
+        """
+        Send a single packet and log errors.
+
+        :param packet: The packet to send
+        """
+
+        try:
+            self.CANData.sendPacket(packet)
+        except OSError:
+            if self.errorCount % 10000 == 0:
+                self.logger.error(Strings.OSError)
+                self.errorCount = 1
+            self.errorCount += 1
+
+    def sendPackets(self, packets):
+        """
+        Send a batch of packets and log errors.
+
+        :param packets: List of packets to send
+        """
+
+        try:
+            self.CANData.sendPackets(packets)
+        except OSError:
+            if self.errorCount % 10000 == 0:
+                self.logger.error(Strings.OSError)
+                self.errorCount = 1
+            self.errorCount += 1
+
+    def isEnabled(self):
+        """
+        :return: The ``enabled`` flag
+        """
+
+        return self.enabled
+
     def run(self):
         """
-        Send the packets in a loop and wait accordingly until the thread is disabled.
+        Send the packets according to the schedule until all packets have been sent (if not in loop mode)
+        or the thread is disabled. Jitter statistics are logged afterwards.
         """
 
-        errorCount = 0
-        slept = 0
-        # Send until the thread gets terminated
-        while self.enabled:
-            for packet in self.packets:
-                if not self.enabled:
-                    return
+        self.scheduler.replay(self.packets, self.sendPacket, self.isEnabled,
+                              loop=self.loop, sendPackets=self.sendPackets)
 
-                slept = 0
-                try:
-                    self.CANData.sendPacket(packet)
-                except OSError:
-                    if errorCount % 10000 == 0:
-                        self.logger.error(Strings.OSError)
-                        errorCount = 1
-                    errorCount += 1
-
-                while slept < self.sleepTime:
-                    if not self.enabled:
-                        return
-                    time.sleep(0.1)
-                    slept += 0.1
+        statistics = self.scheduler.getJitterStatisticsString()
+        if statistics is not None:
+            self.logger.info(Strings.senderThreadJitterStatistics + " " +
+                             statistics)
 
     def disable(self):
         """
@@ -89,10 +116,10 @@ class FuzzSenderThread(QtCore.QThread):
     Spawns a new thread that will send random data in a loop.
     """
 
-    def __init__(self, sleepTime, fuzzerSendPipe, CANData, threadName):
+    def __init__(self, sleepTime, frameSender, CANData, threadName):
         QtCore.QThread.__init__(self)
         self.sleepTime = sleepTime
-        self.fuzzerSendPipe = fuzzerSendPipe
+        self.frameSender = frameSender
         self.CANData = CANData
         self.threadName = threadName
         self.enabled = True
@@ -121,8 +148,9 @@ class FuzzSenderThread(QtCore.QThread):
                     errorCount = 1
                 errorCount += 1
 
-            # Also send the data over the pipe to add it on the GUI
-            self.fuzzerSendPipe.send(packet)
+            # Also pass the data to the adder thread to add it on the GUI
+            self.frameSender.sendRecords(
+                [FrameBatch.messageToRecord(packet)])
 
             while slept < self.sleepTime:
                 if not self.enabled:
@@ -146,11 +174,11 @@ class UDSSenderThread(QtCore.QThread):
     Spawns a new thread that will send sequential UDS packets in a loop.
     """
 
-    def __init__(self, UDSTab, sleepTime, UDSSendPipe, CANData, threadName):
+    def __init__(self, UDSTab, sleepTime, frameSender, CANData, threadName):
         QtCore.QThread.__init__(self)
         self.UDSTab = UDSTab
         self.sleepTime = sleepTime
-        self.UDSSendPipe = UDSSendPipe
+        self.frameSender = frameSender
         self.CANData = CANData
         self.threadName = threadName
         self.enabled = True
@@ -182,8 +210,9 @@ class UDSSenderThread(QtCore.QThread):
                     errorCount = 1
                 errorCount += 1
 
-            # Also send the data over the pipe to add it on the GUI
-            self.UDSSendPipe.send(packet)
+            # Also pass the data to the adder thread to add it on the GUI
+            self.frameSender.sendRecords(
+                [FrameBatch.messageToRecord(packet)])
 
             if done:
                 # Tell the GUI that we're finished
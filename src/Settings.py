@@ -41,3 +41,15 @@ FORKME_PATH = "./ui/icon/forkme.png"
 
 #: Where to find this project in GitHub
 GITHUB_URL = "https://github.com/schutzwerk/CANalyzat0r"
+
+#: How captured frames are passed to the GUI: "ring" (shared memory ring buffer) or "pipe"
+FRAME_TRANSPORT = "ring"
+#: Amount of frame slots of each ring buffer, this must be a power of 2
+RING_BUFFER_CAPACITY = 65536
+
+#: How CANData talks to SocketCAN interfaces: "python-can" (can.Bus) or "raw" (raw AF_CAN socket, see RawCANSocket)
+CAN_BACKEND = "python-can"
+#: Whether the raw backend uses the receive timestamps of the CAN controller instead of the kernel timestamps.
+#: Hardware timestamps are taken from the clock of the controller, not the system clock. They are used for
+#: all frames if the controller provides them for the first frame, else kernel timestamps are used
+CAN_HARDWARE_TIMESTAMPS = False
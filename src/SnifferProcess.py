@@ -22,6 +22,10 @@ Created on May 18, 2017
 """
 
 from multiprocessing import Process
+import selectors
+from FrameBatch import FrameBatch
+from PacketFilter import PacketFilter
+from WakeupPipe import WakeupPipe
 from Logger import Logger
 import Strings
 import Globals
@@ -30,51 +34,185 @@ import Globals
 class SnifferProcess(Process):
     """
     Spawn a new process that will sniff packets from the specified CANData instance.
-    Captured data will be transmitted via the ``snifferSendPipe``.
+    Captured data will be transmitted in batches via the ``frameSender`` (see :class:`~src.FrameTransport.FrameTransport`).
+    Frames are filtered using a :class:`~src.PacketFilter.PacketFilter` before they are transmitted.
+    The ID parts of the filter rules are also passed to the kernel, so most unwanted frames are
+    dropped before they reach this process.
+
+    The process waits for frames, rule updates and the stop signal (see :func:`stop`) at the same time
+    using a selector, so it doesn't wake up while the bus is idle and stops immediately.
     """
 
     def __init__(self,
-                 snifferSendPipe,
+                 frameSender,
                  sharedEnabledFlag,
                  snifferName,
-                 CANData=None):
+                 CANData=None,
+                 packetFilterRules=None,
+                 ruleReceiver=None):
         """
         Set the passed parameters.
 
-        :param snifferSendPipe: The multiprocessing pipe to send received data to
+        :param frameSender: The sending end of a :class:`~src.FrameTransport.FrameTransport` to send received data to
         :param sharedEnabledFlag: The multiprocessing value to handle disabling
         :param snifferName: The name of the sniffer process, used for logging
         :param CANData: Optional: The CANData instance to query for data.
                         If this is not specified, the global interface is being used
+        :param packetFilterRules: Optional: A tuple (rules, invert) to create a :class:`~src.PacketFilter.PacketFilter`
+        :param ruleReceiver: Optional: The receiving end of a pipe. Updated tuples (rules, invert) can be sent
+                             through it while the process is running
         """
 
         Process.__init__(self)
         self.CANData = CANData if CANData is not None else Globals.CANData
-        self.snifferSendPipe = snifferSendPipe
+        self.frameSender = frameSender
         self.sharedEnabledFlag = sharedEnabledFlag
         self.snifferName = snifferName
+        self.packetFilterRules = packetFilterRules
+        self.ruleReceiver = ruleReceiver
+        #: Wakes up the process when it has to stop
+        self.stopPipe = WakeupPipe()
 
         self.logger = Logger(Strings.snifferProcessLoggerName + " (" +
                              self.snifferName + ")").getLogger()
 
+    @staticmethod
+    def compilePacketFilter(packetFilterRules):
+        """
+        Compile the filter rules.
+
+        :param packetFilterRules: A tuple (rules, invert) or None
+        :return: A :class:`~src.PacketFilter.PacketFilter` or None if every frame is accepted
+        """
+
+        if packetFilterRules is None:
+            return None
+
+        rules, invert = packetFilterRules
+        packetFilter = PacketFilter(rules, invert=invert)
+        # An empty whitelist accepts nothing, an empty blacklist everything
+        if packetFilter.isEmpty() and not invert:
+            return None
+        return packetFilter
+
+    def receiveRuleUpdates(self, packetFilter):
+        """
+        Apply the rules that have been sent via ``ruleReceiver`` (if any).
+
+        :param packetFilter: The current :class:`~src.PacketFilter.PacketFilter` or None
+        :return: The packet filter to use from now on
+        """
+
+        if self.ruleReceiver is None:
+            return packetFilter
+
+        try:
+            if not self.ruleReceiver.poll():
+                return packetFilter
+            # Only the latest rules are relevant
+            while self.ruleReceiver.poll():
+                self.packetFilterRules = self.ruleReceiver.recv()
+        except (EOFError, OSError):
+            self.ruleReceiver = None
+            return packetFilter
+
+        self.logger.debug(Strings.snifferProcessPacketFilterUpdated)
+        packetFilter = SnifferProcess.compilePacketFilter(
+            self.packetFilterRules)
+        self.applyKernelFilters(packetFilter)
+        return packetFilter
+
+    def applyKernelFilters(self, packetFilter):
+        """
+        Pass the ID filters of the packet filter to the kernel (see :func:`~src.CANData.CANData.setFilters`).
+
+        :param packetFilter: The current :class:`~src.PacketFilter.PacketFilter` or None to remove all filters
+        """
+
+        try:
+            if packetFilter is None:
+                self.CANData.clearFilters()
+            else:
+                self.CANData.setFilters(*packetFilter.getKernelFilters())
+        except OSError:
+            # The user space filter still works
+            self.logger.warn(Strings.snifferProcessKernelFilterError)
+
+    def stop(self):
+        """
+        Disable the process, wake it up and wait until it has terminated.
+        This must be called by the process that started the sniffer process.
+        """
+
+        with self.sharedEnabledFlag.get_lock():
+            self.sharedEnabledFlag.value = 0
+        self.stopPipe.wake()
+        self.join()
+        self.stopPipe.close()
+
     def run(self):
         """
-        As long as the process hasn't been disabled: Read a frame using :func:`~src.CANData.CANData.readPacketAsync`
-        and transmit the received can.Message object via the pipe.
+        As long as the process hasn't been disabled: Wait until frames are available and read them using
+        :func:`~src.CANData.CANData.readRecords`. Frames that pass the packet filter are added to the current batch.
+        The batch is passed to the frame sender as soon as it is full or old enough.
+        Rule updates are applied as soon as they are received.
         """
         errorCount = 0
+        batch = FrameBatch()
+        packetFilter = SnifferProcess.compilePacketFilter(
+            self.packetFilterRules)
 
+        self.applyKernelFilters(packetFilter)
+        # Also discards frames that have been received before the filters were set
         self.CANData.clearSocket()
+
+        CANSocket = self.CANData.getSocket()
+        ruleReceiver = self.ruleReceiver
+        selector = selectors.DefaultSelector()
+        selector.register(CANSocket, selectors.EVENT_READ)
+        selector.register(self.stopPipe, selectors.EVENT_READ)
+        if ruleReceiver is not None:
+            selector.register(ruleReceiver, selectors.EVENT_READ)
+
         while self.sharedEnabledFlag.value == 1:
-            # This will either return a packet or None (timeout)
-            try:
-                frame = self.CANData.readPacketAsync()
-            except OSError:
-                if errorCount % 10000 == 0:
-                    self.logger.error(Strings.OSError + " (" +
-                                      self.snifferName + ")")
-                    errorCount = 1
-                errorCount += 1
-
-            if frame is not None:
-                self.snifferSendPipe.send(frame)
+            # Only wake up without an event if the current batch has to be flushed
+            readyFiles = [
+                key.fileobj
+                for key, _ in selector.select(batch.getRemainingDelay())
+            ]
+
+            if CANSocket in readyFiles:
+                records = []
+                try:
+                    records = self.CANData.readRecords(
+                        maxFrames=batch.maxFrames, timeout=0)
+                except OSError:
+                    if errorCount % 10000 == 0:
+                        self.logger.error(Strings.OSError + " (" +
+                                          self.snifferName + ")")
+                        errorCount = 1
+                    errorCount += 1
+
+                for record in records:
+                    if packetFilter is None or packetFilter.accepts(record):
+                        batch.append(record)
+
+            if batch.isDue():
+                self.frameSender.sendRecords(batch.take())
+
+            if ruleReceiver is not None and ruleReceiver in readyFiles:
+                packetFilter = self.receiveRuleUpdates(packetFilter)
+                # The sending end has been closed
+                if self.ruleReceiver is None:
+                    selector.unregister(ruleReceiver)
+                    ruleReceiver = None
+
+        selector.close()
+
+        # Don't lose the frames of the last incomplete batch
+        if len(batch) > 0:
+            self.frameSender.sendRecords(batch.take())
+
+        # The socket is shared with other users of the interface
+        if packetFilter is not None:
+            self.applyKernelFilters(None)
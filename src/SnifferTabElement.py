@@ -21,7 +21,7 @@ Created on Jun 16, 2017
 @author: pschmied
 """
 
-from multiprocessing import Pipe, Value
+from multiprocessing import Value, Pipe
 from PySide import QtCore
 from PySide.QtGui import QMessageBox
 
@@ -31,8 +31,9 @@ import MainTab
 import SnifferTab
 import SnifferProcess
 import ItemAdderThread
+from FrameTransport import FrameTransport
 import PacketsDialog
-import Toolbox
+from PacketFilter import PacketFilter
 from CANData import CANData
 from AbstractTab import AbstractTab
 
@@ -67,28 +68,29 @@ class SnifferTabElement(AbstractTab):
             snifferTabElementLabelInterfaceValueName,
             CANData=CANData.CANDataInstances[self.ifaceName],
             hideTimestampCol=False,
-            allowTablePaste=False)
+            allowTablePaste=False,
+            useColumnarStore=True)
 
         self.tabName = tabName
 
-        # Amount of packets received on an interface to prevent freezes
-        self.packetCount = self.getPacketCount()
-        self.tooMuchData = False
-        self.valueListsToProcess = []
-
-        # Can be managed using the button
+        # Can be managed using the button. The rules are applied in the sniffer process (see PacketFilter)
         self.ignoredPackets = []
         # whether to invert the packet ignore mechanism --> do a whitelist instead of a blacklist
         self.invert = False
 
         self.snifferProcess = None
         self.itemAdderThread = None
+        self.frameReceiver = None
+        # Used to send updated ignore rules to the running sniffer process
+        self.ruleSender = None
 
         # These flags are shared with the processes/threads
         # to terminate them
         self.sharedSnifferEnabledFlag = Value("i", 1)
 
         self.prepareUI()
+        # Rows are added to the GUI in batches to stay responsive at high packet rates
+        self.packetTableModel.setQueuedInserts(True)
 
     def toggleSniffing(self):
         """
@@ -109,49 +111,39 @@ class SnifferTabElement(AbstractTab):
         if self.active:
             self.terminateThreads()
 
-            # If too much data was received process it now
-            if self.tooMuchData:
-                progressDialog = Toolbox.Toolbox.getWorkingDialog(
-                    Strings.snifferTabElementDialogProcessing)
-                progressDialog.open()
-                try:
-                    self.packetTableModel.clear()
-                    for listIdx in range(len(self.valueListsToProcess)):
-                        if listIdx % 1500 == 0:
-                            QtCore.QCoreApplication.processEvents()
-                        self.addPacket(
-                            self.valueListsToProcess[listIdx],
-                            ignorePacketRate=True)
-                finally:
-                    progressDialog.close()
-                    self.packetTableView.setEnabled(True)
-                    self.tooMuchData = False
-
         # Start sniffer process, item generator process and item adder thread
         else:
+            # Sniffed packets need a packet store
+            self.closeLogView()
 
             # Reset the flag
             self.sharedSnifferEnabledFlag = Value("i", 1)
 
-            snifferReceivePipe, snifferSendPipe = Pipe()
+            frameSender, self.frameReceiver = FrameTransport.create()
+            ruleReceiver, self.ruleSender = Pipe(duplex=False)
 
             # First start the ItemAdderThread...
             self.itemAdderThread = ItemAdderThread.ItemAdderThread(
-                snifferReceivePipe,
+                self.frameReceiver,
                 self.packetTableModel,
                 self.rawData,
-                useTimestamp=True)
+                useTimestamp=True,
+                emitRecords=True)
 
-            self.itemAdderThread.appendRow.connect(self.addPacket)
+            self.itemAdderThread.appendRecords.connect(self.addRecords)
             self.itemAdderThread.start()
 
             # ... then start the SnifferProcess
             self.snifferProcess = SnifferProcess.SnifferProcess(
-                snifferSendPipe,
+                frameSender,
                 self.sharedSnifferEnabledFlag,
                 self.tabName,
-                CANData=self.CANData)
+                CANData=self.CANData,
+                packetFilterRules=(self.ignoredPackets, self.invert),
+                ruleReceiver=ruleReceiver)
             self.snifferProcess.start()
+            # The process owns the receiving end now
+            ruleReceiver.close()
 
             SnifferTabElement.amountThreadsRunning += 1
             self.updateStatusBar()
@@ -186,72 +178,28 @@ class SnifferTabElement(AbstractTab):
                   addAtFront=True,
                   append=True,
                   emit=True,
-                  addToRawDataOnly=False,
-                  ignorePacketRate=False):
+                  addToRawDataOnly=False):
         """
         Override the parents method to add packets at front and to update the counter label.
-        If too much data is received, the data will be added after sniffing to prevent freezes.
-        Also, only add packets if the data isn't present in ``self.ignoredPackets``
-
-        :param ignorePacketRate: Additional optional parameter: Boolean value indicating whether the rate of
-                                 packets per second will be ignored or not. This is set to False by Default.
-                                 We need to set it to True to process ``self.valueList`` after sniffing if too much
-                                 data was received.
-
+        Ignored packets have already been filtered by the sniffer process.
         """
 
-        # Check if we want to ignore the packet
-        CANID = valueList[self.IDColIndex]
-        data = valueList[self.dataColIndex]
-        strIdx = Toolbox.Toolbox.getPacketDictIndex(CANID, data)
-
-        accepted = True
-        if strIdx in self.ignoredPackets:
-            accepted = False
-        # Check wildcard
-        elif str(str(CANID) + "#*").upper() in self.ignoredPackets:
-            accepted = False
-
-        if self.invert:
-            accepted = not accepted
-
-        if not accepted:
-            return
-
-        # Save the values for later
-        if not ignorePacketRate and self.tooMuchData:
-            self.valueListsToProcess.append(valueList)
-            # Also update the label
-            self.tabWidget.labelSnifferCountValue.setText(
-                str(len(self.rawData) + len(self.valueListsToProcess)))
-            return
+        AbstractTab.addPacket(
+            self,
+            valueList=valueList,
+            addAtFront=addAtFront,
+            append=append,
+            emit=emit)
+        # Also update the label
+        self.tabWidget.labelSnifferCountValue.setText(str(len(self.rawData)))
+
+    def addRecords(self, records):
+        """
+        Override the parents method to update the counter label.
+        """
 
-        else:
-            # Check periodically
-            if len(self.rawData) % 500 == 0 and len(
-                    self.rawData
-            ) > 0 and not ignorePacketRate and not self.tooMuchData:
-                packetCount = self.getPacketCount()
-                # if we add one packet to the GUI, X packets are received on the socket
-                # --> this is too much data
-                # --> save data to process it after the sniffing has stopped to prevent freezes
-                if packetCount != 0 and packetCount - self.packetCount > 7200:
-                    self.tooMuchData = True
-                    self.packetTableView.setEnabled(False)
-                    self.logger.warn(Strings.snifferTabElementTooMuchData)
-
-                # Update the value for the next call
-                self.packetCount = packetCount
-
-            AbstractTab.addPacket(
-                self,
-                valueList=valueList,
-                addAtFront=addAtFront,
-                append=append,
-                emit=emit)
-            # Also update the label
-            self.tabWidget.labelSnifferCountValue.setText(
-                str(len(self.rawData)))
+        AbstractTab.addRecords(self, records)
+        self.tabWidget.labelSnifferCountValue.setText(str(len(self.rawData)))
 
     def handleInterfaceSettingsDialog(self, allowOnlyOwnInterface=True):
         """
@@ -272,7 +220,6 @@ class SnifferTabElement(AbstractTab):
 
         savedPackets = AbstractTab.clear(
             self, returnOldPackets=returnOldPackets)
-        self.valueListsToProcess.clear()
         # Reset the label too
         self.tabWidget.labelSnifferCountValue.setText("0")
 
@@ -299,13 +246,15 @@ class SnifferTabElement(AbstractTab):
         Also, the CANData instance will be set to inactive and GUI elements will be toggled.
         """
 
-        # Stop the Sniffer
+        # Stop the Sniffer, it's woken up immediately
         if self.snifferProcess is not None:
-            with self.sharedSnifferEnabledFlag.get_lock():
-                self.sharedSnifferEnabledFlag.value = 0
-            self.snifferProcess.join()
+            self.snifferProcess.stop()
             self.logger.debug(Strings.snifferProcessTerminated)
 
+        if self.ruleSender is not None:
+            self.ruleSender.close()
+            self.ruleSender = None
+
         # Stop the ItemAdder
         if self.itemAdderThread is not None:
             self.itemAdderThread.disable()
@@ -313,6 +262,12 @@ class SnifferTabElement(AbstractTab):
             self.itemAdderThread.quit()
             self.logger.debug(Strings.itemAdderThreadTerminated)
 
+            droppedCount = self.frameReceiver.getDroppedCount()
+            if droppedCount > 0:
+                self.logger.warn(Strings.framesDropped + " " +
+                                 str(droppedCount))
+            self.frameReceiver.close()
+
         # Reset settings and the UI
         self.tabWidget.buttonSniff.setText(
             Strings.snifferTabElementSniffingButtonDisabled)
@@ -333,15 +288,19 @@ class SnifferTabElement(AbstractTab):
 
         # Stop the thread first
         self.terminateThreads()
+        self.closeLogView()
         SnifferTab.SnifferTab.removeSniffer(self)
 
     def handleManageIgnoredPacketsDialog(self):
         """
-        Open a dialog to manage ignored packets when sniffing
+        Open a dialog to manage ignored packets when sniffing. Besides CAN IDs and payloads, the rules may contain
+        ID ranges, ID masks and data masks (see :class:`~src.PacketFilter.PacketFilter`).
+        Updated rules are sent to the running sniffer process.
         """
 
         dialog = PacketsDialog.PacketsDialog(
-            packets=self.ignoredPackets, returnPacketsAsRawList=False, invert=self.invert)
+            packets=self.ignoredPackets, returnPacketsAsRawList=False, invert=self.invert,
+            editRules=True)
         res = dialog.open()
         if res is None:
             return
@@ -355,6 +314,20 @@ class SnifferTabElement(AbstractTab):
             self.ignoredPackets = ignoredPackets
             self.logger.info(Strings.snifferTabElementIgnoredPacketsUpdated)
 
+            invalidRules = PacketFilter(ignoredPackets).invalidRules
+            if len(invalidRules) > 0:
+                self.logger.warn(Strings.packetFilterInvalidRules +
+                                 " " + ", ".join(invalidRules))
+
+        if self.active and self.ruleSender is not None:
+            # The sniffer process may have terminated already
+            try:
+                self.ruleSender.send((self.ignoredPackets, self.invert))
+            except OSError as e:
+                self.logger.error(
+                    Strings.snifferTabElementIgnoredPacketsNotSent + " " +
+                    str(e))
+
     def tabIndex(self):
         """
         Get the **current** tab index of the sub tab element
@@ -363,15 +336,3 @@ class SnifferTabElement(AbstractTab):
         """
 
         return Globals.ui.tabWidgetSnifferTabs.indexOf(self.tabWidget)
-
-    def getPacketCount(self):
-        """
-        This uses a call to ``/sys/class/net/<ifaceName>/statistics/rx_packets`` to return the number
-        of total received packets of the current interface
-
-        :return: Received packet count of the current interface as itneger
-        """
-
-        with open("/sys/class/net/" + self.ifaceName +
-                  "/statistics/rx_packets") as statisticsFile:
-            return int(statisticsFile.readlines()[0].strip())
@@ -0,0 +1,213 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+from binascii import unhexlify
+from collections import deque
+from multiprocessing.pool import Pool
+import os
+
+from FrameBatch import FrameBatch
+from Logger import Logger
+import Strings
+
+
+class SocketCANLog():
+    """
+    A streaming parser for log files in SocketCAN format (as generated by ``candump -l`` from can-utils).
+    Lines look like ``(1493280437.565631) can0 1FD#0000000000000000``. CAN FD lines use ``##`` followed
+    by one flag nibble and remote frames use ``R`` with an optional DLC, e.g. ``(1493280437.565631) can0 123#R2``.
+
+    Files are read in chunks of complete lines and every chunk is parsed straight
+    into frame records (see :class:`~src.FrameBatch.FrameBatch`). Because the chunks are independent,
+    large files can be parsed by a process pool.
+    """
+
+    #: Class specific logger instance
+    logger = Logger(Strings.socketCANLogLoggerName).getLogger()
+
+    #: Amount of bytes per parsed chunk
+    chunkSize = 4 * 1024 * 1024
+
+    #: Files larger than this are parsed using a process pool by default
+    parallelFileSize = 64 * 1024 * 1024
+
+    @staticmethod
+    def parseChunk(chunk):
+        """
+        Parse a chunk of complete lines to frame records. Every line is split only once and no
+        objects are created except for the records. This only uses bytes and tuples,
+        so it can be executed in worker processes.
+
+        :param chunk: The lines as bytes
+        :return: A tuple: (list of frame records, list of invalid lines as bytes)
+        """
+
+        records = []
+        appendRecord = records.append
+        invalidLines = []
+        for line in chunk.split(b"\n"):
+            try:
+                # Like CANData.parseSocketCANLines: Trailing fields (e.g. candump -x flags) are ignored
+                fields = line.split()
+                if len(fields) < 3:
+                    raise ValueError
+                timestamp = fields[0]
+                frame = fields[2]
+                CANID, _, data = frame.partition(b"#")
+                if timestamp[:1] != b"(" or len(CANID) > 8:
+                    raise ValueError
+
+                flags = FrameBatch.FLAG_EXTENDED if len(CANID) > 3 else 0
+                # CAN FD line: "##" followed by one flag nibble
+                if data[:1] == b"#":
+                    flags |= FrameBatch.FLAG_FD
+                    data = unhexlify(data[2:])
+                    dlc = len(data)
+                # Remote frame with an optional DLC
+                elif data[:1] == b"R":
+                    flags |= FrameBatch.FLAG_REMOTE
+                    dlc = int(data[1:] or 0)
+                    data = b""
+                else:
+                    data = unhexlify(data)
+                    dlc = len(data)
+
+                if dlc > 64:
+                    raise ValueError
+                appendRecord((float(timestamp[1:-1]), int(CANID, 16), flags,
+                              dlc, data))
+            except ValueError:
+                # binascii.Error is a ValueError, too
+                if line.strip():
+                    invalidLines.append(line)
+
+        return records, invalidLines
+
+    @staticmethod
+    def iterChunks(logFile, chunkSize=None):
+        """
+        Read a binary file object in chunks that only contain complete lines.
+
+        :param logFile: The file object opened in binary mode
+        :param chunkSize: Optional: The approximate size of the chunks. Default: ``chunkSize``
+        :return: A generator yielding the chunks as bytes
+        """
+
+        if chunkSize is None:
+            chunkSize = SocketCANLog.chunkSize
+
+        remainder = b""
+        while True:
+            block = logFile.read(chunkSize)
+            if not block:
+                break
+            lastNewlineIndex = block.rfind(b"\n")
+            if lastNewlineIndex == -1:
+                remainder += block
+                continue
+            yield remainder + block[:lastNewlineIndex + 1]
+            remainder = block[lastNewlineIndex + 1:]
+
+        if remainder:
+            yield remainder
+
+    @staticmethod
+    def iterRecordChunks(filePath, processes=None):
+        """
+        Parse a log file chunk by chunk. Invalid lines are logged and skipped.
+
+        :param filePath: The path of the log file
+        :param processes: Optional: Amount of worker processes. Default: All CPUs for files larger
+               than ``parallelFileSize``, else the file is parsed in the current process
+        :return: A generator yielding one list of frame records per chunk, in file order
+        """
+
+        if processes is None:
+            processes = 1
+            if os.path.getsize(filePath) > SocketCANLog.parallelFileSize:
+                processes = os.cpu_count() or 1
+
+        with open(filePath, "rb") as logFile:
+            chunks = SocketCANLog.iterChunks(logFile)
+            if processes > 1:
+                yield from SocketCANLog.logInvalidLines(
+                    SocketCANLog.parseChunksInPool(chunks, processes))
+            else:
+                yield from SocketCANLog.logInvalidLines(
+                    map(SocketCANLog.parseChunk, chunks))
+
+    @staticmethod
+    def parseChunksInPool(chunks, processes):
+        """
+        Parse chunks using a process pool. Only two chunks per worker are read ahead,
+        so the memory usage doesn't depend on the file size.
+
+        :param chunks: Iterable of chunks
+        :param processes: Amount of worker processes
+        :return: A generator yielding the results of :func:`parseChunk` in chunk order
+        """
+
+        pool = Pool(processes=processes)
+        try:
+            pendingResults = deque()
+            for chunk in chunks:
+                pendingResults.append(
+                    pool.apply_async(SocketCANLog.parseChunk, (chunk, )))
+                if len(pendingResults) >= 2 * processes:
+                    yield pendingResults.popleft().get()
+            while pendingResults:
+                yield pendingResults.popleft().get()
+        finally:
+            pool.terminate()
+
+    @staticmethod
+    def logInvalidLines(parsedChunks):
+        """
+        Log the invalid lines of parsed chunks and only pass on the frame records.
+
+        :param parsedChunks: Iterable of results of :func:`parseChunk`
+        :return: A generator yielding the lists of frame records
+        """
+
+        for records, invalidLines in parsedChunks:
+            for invalidLine in invalidLines:
+                SocketCANLog.logger.warning(
+                    Strings.CANDataInvalidSocketCANLine + ": " +
+                    invalidLine.decode("ascii", "replace"))
+            yield records
+
+    @staticmethod
+    def parseLines(lines):
+        """
+        Parse a list of lines to frame records. Invalid lines are logged and skipped.
+
+        :param lines: List of lines in SocketCAN format
+        :return: List of frame records
+        """
+
+        chunk = "\n".join(lines).encode("ascii", "replace")
+        records = []
+        for chunkRecords in SocketCANLog.logInvalidLines(
+            [SocketCANLog.parseChunk(chunk)]):
+            records.extend(chunkRecords)
+        return records
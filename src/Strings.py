@@ -21,7 +21,6 @@ Created on May 17, 2017
 @author: pschmied
 """
 
-from datetime import datetime
 import Settings
 
 # MainTab
@@ -58,8 +57,20 @@ objectCreated = "Object created"
 itemAdderThreadTerminated = "ItemAdderThread terminated"
 mainTabLoadingProjectData = "Loading project data..."
 dataWritten = "Records saved:"
+dataSkipped = "Rows not saved because they aren't valid frames:"
+dataLoaded = "Records loaded:"
 contextMenuSendToSender = "Send all packets to sender"
 contextMenuSaveAsPacketSet = "Save all packets as new dump"
+contextMenuSaveAsArchive = "Save all packets as archive"
+contextMenuLoadArchive = "Load packets from archive"
+contextMenuLoadSocketCANLog = "Load packets from SocketCAN log"
+contextMenuOpenLogView = "Open SocketCAN log read-only"
+packetArchiveInvalid = "Not a valid packet archive:"
+packetArchiveLoading = "Loading packet archive..."
+socketCANLogLoading = "Loading SocketCAN log..."
+logViewOpened = "Opened log view:"
+logViewIndexed = "Log view indexed, lines:"
+logViewTabActive = "Stop sniffing before opening a log view"
 OSError = "Got OSError, retrying"
 ignoringCANDataStillActive = "Ignoring CANData Instance: Interface is being used: "
 errorNoAudioDevice = "No audio device present"
@@ -67,6 +78,7 @@ activeCANDataWontSave = "Active interface found, won't save: "
 gotSocketError = "Socket error received"
 dialogFiltering = "Filtering..."
 dialogSending = "Sending...."
+framesDropped = "Frames dropped because the GUI fell behind:"
 
 # SnifferTab
 snifferTabLoggerName = "SnifferTab"
@@ -89,11 +101,15 @@ snifferTabElementInterfaceMissingMessageBoxTitle = "No interface selected"
 snifferTabElementInterfaceMissingMessageBoxText = "Please select an interface in the main tab"
 snifferTabElementDisableAutoScroll = "Disabling autoscroll to prevent freezes"
 snifferTabElementIgnoredPacketsUpdated = "Ignored packets updated"
-snifferTabElementTooMuchData = "Too much data, will process when sniffing is stopped"
-snifferTabElementDialogProcessing = "Processing..."
+snifferTabElementIgnoredPacketsNotSent = "Failed to send the ignored packets to the sniffer process:"
+
+# PacketFilter
+packetFilterInvalidRules = "Skipping invalid filter rules:"
 
 # SnifferProcess
 snifferProcessLoggerName = "SnifferProcess"
+snifferProcessPacketFilterUpdated = "Packet filter updated"
+snifferProcessKernelFilterError = "Can't set the kernel CAN ID filters, filtering in user space only"
 
 # SenderTab
 senderTabLoggerName = "SenderTab"
@@ -111,9 +127,14 @@ senderTabElementPacketTableViewName = "tableViewSenderXData"
 senderTabElementLabelInterfaceValueName = "labelSenderXInterfaceValue"
 senderTabElementSenderThreadStarted = "Started sender thread"
 senderTabElementSenderThreadStopped = "Stopped sender thread"
+senderTabElementTimingFixedGap = "Fixed gap"
+senderTabElementTimingRecorded = "Recorded timing"
+senderTabElementTimingAsFastAsPossible = "As fast as possible"
+senderTabElementTimestampsMissing = "Not all packets have a valid timestamp, using the fixed gap instead"
 
 # SenderThread
 senderThreadLoggerName = "SenderThread"
+senderThreadJitterStatistics = "Replay timing:"
 
 # FuzzerTab
 fuzzerTabLoggerName = "FuzzerTab"
@@ -184,6 +205,8 @@ managerTabGettingPacketData = "Getting packet data..."
 managerTabSavingPackets = "Saving packets..."
 managerTabExportingProject = "Exporting project data..."
 managerTabImportingProject = "Importing project data..."
+managerTabTransferredPackets = "packets"
+managerTabPacketsPerSecond = "packets/s"
 managerTabDebuggingDumpsRowIDsIndexError = "Index error for: "
 
 # FilterTab
@@ -199,7 +222,7 @@ filterTabCollectingNoiseMessageBoxText = "Collected packets: 0"
 filterTabDataAdderThreadTerminated = "DataAdderThread terminated"
 filterTabStartAnalyzing = "Starting to analyze samples"
 filterTabFinishAnalyzing = "Finished analyzing"
-filterTabDialogAnalyzing = "Analyzing..."
+filterTabIDFilterUpdated = "CAN ID filter updated"
 
 # SearcherTab
 searcherTabLoggerName = "SearcherTab"
@@ -234,6 +257,12 @@ CANDataDetectedVirtualInterface = "Detected virtual interface for: "
 CANDataNoInstanceAvailable = "No CANData instance available"
 CANDataNewInterfaceAdded = "New CAN interface added: "
 CANDataNeedFD = "Failed to send packet, please use FD mode for packets larger than 8 bytes"
+CANDataUsingRawSocket = "Using the raw SocketCAN backend for: "
+CANDataTimestampSource = "receive timestamps:"
+CANDataKernelFiltersIncomplete = "Not all CAN ID filters can be applied by the kernel"
+
+# SocketCANLog
+socketCANLogLoggerName = "SocketCANLog"
 
 # Database
 databaseLoggerName = "Database"
@@ -241,6 +270,7 @@ databaseConnectionOK = "Database connection OK"
 databaseConnectionFailed = "Database connection failed, check the path in Settings.py"
 databaseCreatingTablesStart = "Preparing database"
 databaseCreatingTablesOK = "Database prepared"
+databaseMigrating = "Upgrading the database schema to version"
 databaseCorruptMessageBoxTitle = "Database error"
 databaseCorruptMessageBoxText = "The database seems to be corrupted. Do you want to truncate it?"
 databaseCorruptNoAction = "No action required, exiting"
@@ -280,8 +310,6 @@ statusBarSending = "sending"
 # Project import/export file structuring
 projectExportEndSectionMarker = "\n=============\n"
 projectExportEndElementMarker = "\n-------------\n"
-projectExportHeader = Settings.APP_NAME + " " + Settings.APP_VERSION + \
-    " project export (" + str(datetime.now()) + ")"
 projectExportProjectHeader = "Project:"
 projectExportPacketSetHeader = "PacketSets:"
 projectExportPacketHeader = "Packets:"
@@ -24,6 +24,7 @@ from PySide import QtGui, QtCore
 from PySide.QtGui import QApplication, QProgressDialog, QMessageBox, QFileDialog, QProgressBar, QHBoxLayout
 from PySide.QtUiTools import QUiLoader
 from PySide.QtCore import QFile
+import re
 
 import Globals
 import Strings
@@ -52,8 +53,8 @@ class Toolbox():
     @staticmethod
     def getKnownPacketDescription(CANID, data):
         """
-        Get a description for a known packet. This will use the dictionary defined in
-        ``Globals`` to find data
+        Get a description for a known packet. This will use the matcher defined in
+        ``Globals`` (see :class:`~src.KnownPacketMatcher.KnownPacketMatcher`) to find data
 
         :param CANID: CAN ID
         :param data: Data
@@ -61,18 +62,9 @@ class Toolbox():
         :return: The description if one can be found, else an empty string
         """
 
-        data = data if data is not None else ""
-        strIdx = Toolbox.getPacketDictIndex(CANID, data)
-        # Check for a known packet and assign the description
-        if strIdx in Globals.knownPackets:
-            return Globals.knownPackets[str(CANID) + "#" + data]
-
-        # Check for wildcard in a known packet
-        elif str(str(CANID) + "#*").upper() in Globals.knownPackets:
-            return Globals.knownPackets[str(CANID) + "#*"]
-
-        else:
+        if Globals.knownPacketMatcher is None:
             return ""
+        return Globals.knownPacketMatcher.getDescription(CANID, data)
 
     @staticmethod
     def tableExtractSelectedRowData(table):
@@ -84,6 +76,8 @@ class Toolbox():
         """
 
         colCount = table.model().columnCount()
+        # Display queued rows first so the selected indexes are up to date
+        table.model().flushQueuedRows()
         # Only check selected rows
         selectionModel = table.selectionModel()
         selectedRows = selectionModel.selectedRows()
@@ -116,6 +110,8 @@ class Toolbox():
         """
 
         model = table.model()
+        model.fetchAll()
+        model.flushQueuedRows()
         colCount = model.columnCount()
         rawData = []
         for row in range(model.rowCount()):
@@ -432,19 +428,14 @@ class Toolbox():
     @staticmethod
     def isHexString(hexString):
         """
-        Checks if a hexString is a valid hex string of base 16
+        Checks if a hexString only consists of hex characters. Prefixes, signs and whitespace
+        (which ``int(hexString, 16)`` would accept) are rejected.
 
         :param hexString: The hex string
-        :return: Boolean value indicating the correctness of the hex string
+        :return: Boolean value indicating the correctness of the hex string. An empty string is valid
         """
 
-        if len(hexString) == 0:
-            return True
-        try:
-            int(hexString, 16)
-            return True
-        except ValueError:
-            return False
+        return re.fullmatch("[A-Fa-f0-9]*", hexString) is not None
 
     @staticmethod
     def checkProjectIsNone(project=-1):
@@ -21,7 +21,6 @@ Created on February 13, 2020
 @author: pschmied
 """
 
-from multiprocessing import Pipe
 import Globals
 import Strings
 import re
@@ -34,6 +33,7 @@ import MainTab
 from CANData import CANData
 import SenderThread
 from ItemAdderThread import ItemAdderThread
+from FrameTransport import FrameTransport
 
 
 class UDSTab(AbstractTab):
@@ -48,7 +48,8 @@ class UDSTab(AbstractTab):
             Strings.UDSTabLoggerName, [2, 3, 4],
             Strings.UDSTabPacketViewName,
             Strings.UDSTabLabelInterfaceValueName,
-            allowTablePaste=False)
+            allowTablePaste=False,
+            useColumnarStore=True)
 
         self.active = False
 
@@ -56,6 +57,8 @@ class UDSTab(AbstractTab):
         self.UDSSenderThread = None
         #: Adding items also takes place in a separate thread to avoid blocking the GUI thread
         self.itemAdderThread = None
+        #: Receives the sent frames for the ItemAdderThread
+        self.frameReceiver = None
 
         #: These values will be available in the fuzzing mode ComboBox
         self.UDSModeComboBoxValuePairs = [("Read Data By ID", 0),
@@ -183,19 +186,20 @@ class UDSTab(AbstractTab):
             # in ms
             sleepTime = self.doubleSpinBoxUDSPacketGap.value() / 1000
 
-            UDSReceivePipe, UDSSendPipe = Pipe()
+            frameSender, self.frameReceiver = FrameTransport.create()
 
             # Start the Threads
             # First start the ItemAdderThread...
             self.itemAdderThread = ItemAdderThread(
-                UDSReceivePipe, self.packetTableModel, self.rawData)
+                self.frameReceiver, self.packetTableModel, self.rawData,
+                emitRecords=True)
 
-            self.itemAdderThread.appendRow.connect(self.addPacket)
+            self.itemAdderThread.appendRecords.connect(self.addRecords)
             self.itemAdderThread.start()
 
             # ... then start the fuzzing thread
             self.UDSSenderThread = SenderThread.UDSSenderThread(
-                self, sleepTime, UDSSendPipe, self.CANData, self.loggerName)
+                self, sleepTime, frameSender, self.CANData, self.loggerName)
             self.UDSSenderThread.start()
             self.logger.info(Strings.UDSTabUDSThreadStarted)
 
@@ -216,6 +220,7 @@ class UDSTab(AbstractTab):
             # Stop the fuzzer
             if self.UDSSenderThread is not None:
                 self.UDSSenderThread.disable()
+                self.UDSSenderThread.wait()
                 self.UDSSenderThread.quit()
 
             # Stop the ItemAdder
@@ -224,6 +229,13 @@ class UDSTab(AbstractTab):
             self.itemAdderThread.quit()
             self.logger.debug(Strings.itemAdderThreadTerminated)
 
+            droppedCount = self.frameReceiver.getDroppedCount()
+            if droppedCount > 0:
+                self.logger.warn(Strings.framesDropped + " " +
+                                 str(droppedCount))
+            self.frameReceiver.close()
+            self.frameReceiver = None
+
             self.active = False
             self.CANData.active = False
             self.buttonUDSInterfaceSettings.setEnabled(True)
@@ -239,6 +251,8 @@ class UDSTab(AbstractTab):
 
     def prepareUI(self):
         AbstractTab.prepareUI(self)
+        # Rows are added to the GUI in batches to stay responsive at high packet rates
+        self.packetTableModel.setQueuedInserts(True)
 
         # Prepare the combobox
         self.comboBoxUDSMode.clear()
@@ -267,6 +281,14 @@ class UDSTab(AbstractTab):
         # Also update the label
         self.labelUDSCountValue.setText(str(len(self.rawData)))
 
+    def addRecords(self, records):
+        """
+        Override the parents class method to update the counter label
+        """
+
+        AbstractTab.addRecords(self, records)
+        self.labelUDSCountValue.setText(str(len(self.rawData)))
+
     def clear(self, returnOldPackets=False):
         """
         Clear the currently displayed data on the GUI and in the rawData list
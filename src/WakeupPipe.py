@@ -0,0 +1,86 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#  This file is part of CANalyzat0r.
+#
+#  CANalyzat0r is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  CANalyzat0r is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with CANalyzat0r.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Created on Oct 17, 2026
+
+@author: pschmied
+"""
+
+import os
+
+
+class WakeupPipe():
+    """
+    A self-pipe to wake up a thread or process that waits in ``select`` on sockets or pipes.
+    This allows waiting without a timeout: Stopping a loop doesn't have to wait for the
+    next timeout and idle loops don't wake up periodically.
+
+    The pipe has to be created before the process that waits on it is started.
+    """
+
+    def __init__(self):
+        """
+        Create the non-blocking pipe.
+        """
+
+        self.readFD, self.writeFD = os.pipe()
+        os.set_blocking(self.readFD, False)
+        os.set_blocking(self.writeFD, False)
+
+    def fileno(self):
+        """
+        :return: The file descriptor to wait on, e.g. using ``select``
+        """
+
+        return self.readFD
+
+    def wake(self):
+        """
+        Make the pipe readable, so waiting threads and processes wake up.
+        """
+
+        try:
+            os.write(self.writeFD, b"\0")
+        except BlockingIOError:
+            # The pipe is full, so it's readable anyway
+            pass
+
+    def clear(self):
+        """
+        Read all pending wakeups.
+        """
+
+        try:
+            while len(os.read(self.readFD, 4096)) > 0:
+                pass
+        except BlockingIOError:
+            pass
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Close both ends of the pipe.
+        """
+
+        if self.readFD is not None:
+            os.close(self.readFD)
+            os.close(self.writeFD)
+            self.readFD = None
+            self.writeFD = None
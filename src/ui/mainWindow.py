@@ -495,6 +495,9 @@ class Ui_CANalyzatorMainWindow(object):
         self.buttonFilterInterfaceSettings = QtGui.QPushButton(self.layoutWidget6)
         self.buttonFilterInterfaceSettings.setObjectName("buttonFilterInterfaceSettings")
         self.gridLayoutFilter.addWidget(self.buttonFilterInterfaceSettings, 4, 0, 1, 3)
+        self.buttonFilterIDFilter = QtGui.QPushButton(self.layoutWidget6)
+        self.buttonFilterIDFilter.setObjectName("buttonFilterIDFilter")
+        self.gridLayoutFilter.addWidget(self.buttonFilterIDFilter, 5, 0, 1, 3)
         spacerItem9 = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
         self.gridLayoutFilter.addItem(spacerItem9, 11, 0, 1, 1)
         spacerItem10 = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
@@ -1030,6 +1033,7 @@ class Ui_CANalyzatorMainWindow(object):
         self.labelFilterNoiseCollectSeconds.setText(QtGui.QApplication.translate("CANalyzatorMainWindow", "Noise collect time (s)", None, QtGui.QApplication.UnicodeUTF8))
         self.labelFilterSampleAmount.setText(QtGui.QApplication.translate("CANalyzatorMainWindow", "Sample amount", None, QtGui.QApplication.UnicodeUTF8))
         self.buttonFilterInterfaceSettings.setText(QtGui.QApplication.translate("CANalyzatorMainWindow", "Interface settings", None, QtGui.QApplication.UnicodeUTF8))
+        self.buttonFilterIDFilter.setText(QtGui.QApplication.translate("CANalyzatorMainWindow", "CAN ID filter", None, QtGui.QApplication.UnicodeUTF8))
         self.labelFilterInterfaceValue.setText(QtGui.QApplication.translate("CANalyzatorMainWindow", "None", None, QtGui.QApplication.UnicodeUTF8))
         self.tabWidgetMain.setTabText(self.tabWidgetMain.indexOf(self.tabFilter), QtGui.QApplication.translate("CANalyzatorMainWindow", "Filter", None, QtGui.QApplication.UnicodeUTF8))
         self.comboBoxUDSMode.setItemText(0, QtGui.QApplication.translate("CANalyzatorMainWindow", "User specificed mask", None, QtGui.QApplication.UnicodeUTF8))